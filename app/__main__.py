@@ -8,36 +8,80 @@
 # | Internal Imports |-------------------------------------------------------------------------------------------------|
 from core.multicore_simulation import MultiCore
 from data.concatenate_bin_simulations import concat_simulations
+from log.metrics import METRICS
+from bin.run_cache import RunCache
+from generator.barriers import Barriers
+from generator.lattice import is_vector_space
 # |--------------------------------------------------------------------------------------------------------------------|
 
 
 # VARS |-------------------------------------------------------|
 SAMPlES     : int           = 200
-STATES      : list[int]     = [-1, 1]
+STATES      : list[int]     = [-1, 1]  # or lattice steps, e.g. generator.lattice.lattice_steps(2) with PROB [0.25]*4
 PROB        : list[float]   = [0.5, 0.5]
 SIMULATIONS : int           = 10000
 ACUMULATE   : bool          = True
+SEED        : int | None    = None
 
 CPU_OFF     : int           = 1
+IN_MEMORY   : bool          = True
+MOMENTS     : bool          = True
+QUANTILES   : bool          = True      # quantile bands per time step, merged from the workers (fan charts)
+EXACT       : bool          = True
+CACHE_BYTES : int | None    = 2 * 1024**3   # size bound of the run cache in app/bin/cache, None to disable
+TRAJ_MODE   : str           = "lines"   # "lines" or "density" (every simulation as a 2D histogram)
+EVENTS_FILE : str | None    = None      # e.g. "app/bin/events.jsonl" to record the run metrics
+CODEC       : str           = "raw"     # "packed" stores the shards as bit-packed steps (1 bit per step for [-1, 1])
+BARRIERS    : Barriers | None = None    # e.g. Barriers(-10, 10) or Barriers(0, 20, ("reflecting", "absorbing"))
 # |------------------------------------------------------------|
 
 
 # Multiprocessing Simulation
-multicore: MultiCore = MultiCore(cpu_offs=CPU_OFF)
-multicore.coinflip_args(SAMPlES, STATES, PROB, SIMULATIONS, ACUMULATE)
-multicore.run()
+if EVENTS_FILE is not None:
+    METRICS.enable(EVENTS_FILE, echo=False)
 
+cache: RunCache | None = RunCache(max_bytes=CACHE_BYTES) if CACHE_BYTES is not None else None
+multicore: MultiCore = MultiCore(
+    cpu_offs=CPU_OFF, in_memory=IN_MEMORY, moments=MOMENTS, seed=SEED, cache=cache, barriers=BARRIERS,
+    codec=CODEC, quantiles=QUANTILES
+)
+multicore.coinflip_args(SAMPlES, STATES, PROB, SIMULATIONS, ACUMULATE)
+shared_data = multicore.run()
+multicore.close()
 
 # Graphs and analysis
 import numpy as np
 import matplotlib.pyplot as plt
 
-data: np.ndarray = concat_simulations()
+data: np.ndarray = shared_data if shared_data is not None else concat_simulations()
+
+# After the shards are opened, so the summary counts the bytes read by disk runs
+if METRICS.enabled:
+    METRICS.disable()
+    print(METRICS.summary())
 
 from graph.all_trajectories import Graph_AllTrajectories
 from graph.distribution import Distribution, DistAnalysis
+from analysis.exact import ExactDistribution
+from analysis.context import AnalysisContext
+from graph.first_passage import Graph_FirstPassage
+from graph.lattice import Graph_Lattice
 
-Graph_AllTrajectories(data, STATES, PROB).plot()
-Distribution(data, STATES, PROB).plot()
-DistAnalysis(data, STATES, PROB).plot()
+if is_vector_space(STATES):
+    # Walks on a lattice: MSD(t) and distance to the origin instead of the distribution of the positions
+    Graph_Lattice(data, STATES, PROB, multicore.running_moments, multicore.radial).plot()
+else:
+    exact = ExactDistribution(STATES, PROB) if EXACT and ACUMULATE and BARRIERS is None else None
+    # Every statistic (moments, endpoint KDE, gaussian fit, ...) is computed once and shared by the three graphs
+    # Horizons longer than a figure is wide are drawn from the stored level-of-detail summaries
+    context = AnalysisContext(
+        data, STATES, PROB, multicore.running_moments, exact, lod=multicore.level_of_detail(),
+        quantiles=multicore.quantile_sketch
+    )
+    
+    Graph_AllTrajectories(context, mode=TRAJ_MODE).plot()
+    Distribution(context, mode=TRAJ_MODE).plot()
+    DistAnalysis(context).plot()
+if multicore.first_passage is not None:
+    Graph_FirstPassage(multicore.first_passage, BARRIERS).plot()
 plt.show()
\ No newline at end of file
@@ -0,0 +1,246 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                           app/analysis/context.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis.moments   import RunningMoments
+from analysis.quantiles import QuantileSketch
+from analysis.exact     import ExactDistribution
+from analysis.kde       import binned_kde, normal_pdf
+from analysis.streaming import StreamingAnalysis, iter_chunks
+from analysis.streaming import EndpointHistogram
+from graph.trajectories import trajectory_histogram
+from bin.lod_store      import LevelOfDetail, LOD_MAX_BUCKETS
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from functools          import cached_property
+from typing             import Iterable, Optional, Union
+import numpy            as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+class AnalysisContext(object):
+    def __init__(self, data: Union[np.ndarray, Iterable[np.ndarray]], sample_space: list[int], prob: list[float],
+                 moments: Optional[RunningMoments] = None, exact: Optional[ExactDistribution] = None,
+                 bw_method: Union[str, float] = 0.25, block: int = 10000, trajectories: int = 5000,
+                 lod: Optional[LevelOfDetail] = None, quantiles: Optional[QuantileSketch] = None) -> None:
+        """
+        Lazily evaluated, memoized statistics of one dataset, shared by the graph classes. The moments, the
+        endpoint histogram and the trajectories drawn as lines are gathered in a single streaming pass over the
+        data (see StreamingAnalysis), so the memory does not grow with the number of simulations.
+        Args:
+            data (Union[np.ndarray, Iterable[np.ndarray]]): (simulations, samples) trajectories: ndarray, memmap,
+                                                            ShardedArray or any iterable of shards (read once;
+                                                            the density plots need an indexable dataset).
+            sample_space (list[int]): List of sample space values.
+            prob (list[float]): List of probabilities.
+            moments (Optional[RunningMoments]): Precomputed moments per time step (e.g. from MultiCore).
+            exact (Optional[ExactDistribution]): Exact distribution overlaid on the numerical pdf.
+            bw_method (Union[str, float]): KDE bandwidth, "scott", "silverman" or a fixed factor.
+            block (int): Rows read at a time.
+            trajectories (int): Trajectories sampled for the line plots.
+            lod (Optional[LevelOfDetail]): Stored level-of-detail summaries of the data (e.g. from
+                                           MultiCore.level_of_detail()). Long horizons are then drawn and
+                                           their endpoints counted from the summaries, without reading the
+                                           trajectories. Without it they are summarized in one pass when needed.
+            quantiles (Optional[QuantileSketch]): Quantile sketch of the positions per time step (e.g. from
+                                                  MultiCore.quantile_sketch) for the fan charts. Without it an
+                                                  indexable dataset is sketched in one pass when needed.
+        """
+        self.data           : Union[np.ndarray, Iterable[np.ndarray]] = data
+        self.sample_space   : list[int]                     = sample_space
+        self.prob           : list[float]                   = prob
+        self.exact          : Optional[ExactDistribution]   = exact
+        self.bw_method      : Union[str, float]             = bw_method
+        self.block          : int                           = block
+        self.n_trajectories : int                           = trajectories
+        self._moments       : Optional[RunningMoments]      = moments
+        self._lod           : Optional[LevelOfDetail]       = lod
+        self._quantiles     : Optional[QuantileSketch]      = quantiles
+        self._lod_histograms: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+    
+    @cached_property
+    def stream(self) -> StreamingAnalysis:
+        """
+        The single pass over the data, block by block (the moments are skipped if they were given).
+        """
+        analysis: StreamingAnalysis = StreamingAnalysis(self._moments is None, trajectories=self.n_trajectories)
+        return analysis.consume(iter_chunks(self.data, self.block))
+    
+    @property
+    def indexable(self) -> bool:
+        """
+        Whether the data can be indexed (and read again), as opposed to a one-shot iterable of shards.
+        """
+        return hasattr(self.data, "shape") and hasattr(self.data, "__getitem__")
+    
+    @property
+    def shape(self) -> tuple[int, int]:
+        """
+        (simulations, samples) of the data.
+        """
+        if self.indexable:
+            return tuple(self.data.shape)
+        return (self.stream.count, self.stream.samples)
+    
+    @property
+    def samples(self) -> int:
+        return self.shape[1]
+    
+    @property
+    def moments(self) -> RunningMoments:
+        """
+        Moments per time step, from the streaming pass if they were not given.
+        """
+        return self.stream.moments if self._moments is None else self._moments
+    
+    @property
+    def mean(self) -> np.ndarray:
+        return self.moments.mean
+    
+    @property
+    def std(self) -> np.ndarray:
+        return self.moments.std
+    
+    @cached_property
+    def endpoints(self) -> EndpointHistogram:
+        """
+        Histogram of the endpoints, from the stored level of detail if there is one (it holds the exact last
+        column), from the streaming pass otherwise.
+        """
+        if self._lod is None:
+            return self.stream.endpoints
+        histogram: EndpointHistogram = EndpointHistogram()
+        for values in self._lod.endpoints(self.block):
+            histogram.update(values)
+        return histogram
+    
+    @property
+    def endpoint_histogram(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Distinct endpoint values (data[:, -1]) and their counts.
+        """
+        return self.endpoints.values, self.endpoints.counts
+    
+    def quantile(self, q: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """
+        Quantiles of the endpoints (exact for integer walks, see EndpointHistogram).
+        """
+        return self.endpoints.quantile(q)
+    
+    @cached_property
+    def quantile_sketch(self) -> Optional[QuantileSketch]:
+        """
+        Quantile bands per time step: the given sketch, or one sketched in a pass over an indexable dataset of
+        scalar walks. None otherwise (one-shot iterables, step vectors).
+        """
+        if self._quantiles is not None:
+            return self._quantiles
+        if self.indexable == False or len(self.data.shape) != 2:
+            return None
+        sketch: QuantileSketch = QuantileSketch(self.samples)
+        for chunk in iter_chunks(self.data, self.block):
+            sketch.update(chunk)
+        return sketch
+    
+    @cached_property
+    def lod(self) -> Optional[LevelOfDetail]:
+        """
+        Level-of-detail summaries of the data: the stored ones, or built in one pass over an indexable dataset
+        longer than LOD_MAX_BUCKETS steps. None for shorter walks, which are drawn as they are.
+        """
+        if self._lod is not None:
+            return self._lod
+        if self.indexable == False or len(self.data.shape) != 2 or self.samples <= LOD_MAX_BUCKETS:
+            return None
+        return LevelOfDetail.build(self.data, self.block)
+    
+    def lod_width(self, pixels: int) -> Optional[int]:
+        """
+        Bucket width of the level of detail to draw on `pixels` pixels, None to draw the trajectories themselves
+        (short walks, or a one-shot iterable without stored summaries).
+        """
+        if self.samples <= pixels or self.lod is None:
+            return None
+        return self.lod.level(pixels)
+    
+    def lod_histogram(self, width: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        trajectory_histogram of the trajectories subsampled at one level of detail, for the density plots.
+        """
+        if width not in self._lod_histograms:
+            self._lod_histograms[width] = trajectory_histogram(self.lod.subsample(width), block=self.block)
+        return self._lod_histograms[width]
+    
+    @property
+    def trajectories(self) -> np.ndarray:
+        """
+        Uniform sample of the trajectories (in simulation order) for the line plots.
+        """
+        return self.stream.trajectories
+    
+    @cached_property
+    def x(self) -> np.ndarray:
+        """
+        Evaluation grid of the endpoint pdfs: every integer from min to max (max excluded, as the plots always did).
+        """
+        values, _ = self.endpoint_histogram
+        return np.arange(values[0], values[-1])
+    
+    @cached_property
+    def kde(self) -> np.ndarray:
+        """
+        Binned Gaussian KDE of the endpoints over self.x, computed from their histogram.
+        """
+        values, counts = self.endpoint_histogram
+        return binned_kde(values, self.x, self.bw_method, weights=counts)
+    
+    @cached_property
+    def gaussian(self) -> np.ndarray:
+        """
+        Normal pdf with the final mu and sigma over self.x.
+        """
+        return normal_pdf(self.x, self.mean[-1], self.std[-1])
+    
+    @cached_property
+    def exact_density(self) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """
+        Exact density of the endpoints inside the simulated range, None without an ExactDistribution.
+        """
+        if self.exact is None:
+            return None
+        values, _ = self.endpoint_histogram
+        return self.exact.density(self.samples, (values[0], values[-1]))
+    
+    @cached_property
+    def trajectory_histogram(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (position, t) histogram of every trajectory, for the density plots.
+        """
+        if self.indexable == False:
+            raise TypeError("the trajectory histogram reads the data twice, it needs an array, not an iterable")
+        return trajectory_histogram(self.data, block=self.block)
+
+
+def as_context(data: Union[np.ndarray, Iterable[np.ndarray], AnalysisContext], sample_space: Optional[list[int]],
+               prob: Optional[list[float]], moments: Optional[RunningMoments] = None,
+               exact: Optional[ExactDistribution] = None,
+               bw_method: Optional[Union[str, float]] = None) -> AnalysisContext:
+    """
+    Returns data itself if it is already an AnalysisContext, otherwise a new context over the data (bw_method
+    0.25 if None).
+    Raises:
+        ValueError: A context is given together with arguments it already holds, they would be ignored.
+    """
+    if isinstance(data, AnalysisContext):
+        given: list[str] = [
+            name for name, value in (("sample_space", sample_space), ("prob", prob), ("moments", moments),
+                                     ("exact", exact), ("bw_method", bw_method)) if value is not None
+        ]
+        if len(given) > 0:
+            raise ValueError(f"{', '.join(given)} must be set on the analysis context, not next to it")
+        return data
+    return AnalysisContext(data, sample_space, prob, moments, exact, 0.25 if bw_method is None else bw_method)
@@ -0,0 +1,148 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                             app/analysis/exact.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from generator.dtypes   import is_integer_space
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from scipy.fft          import rfft, irfft, next_fast_len
+from scipy.stats        import binom
+from typing             import Union, Optional
+from math               import gcd
+import numpy            as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# Most cells of ExactDistribution.table (float64, 256 MiB)
+TABLE_MAX_CELLS: int = 1 << 25
+
+
+class ExactDistribution(object):
+    def __init__(self, sample_space: list[int], prob: list[float]) -> None:
+        """
+        Exact distribution P(E, t) of the cumulative walk, computed as the t-fold convolution of the step PMF
+        (binomial closed form for two states, FFT otherwise) instead of Monte Carlo.
+        Args:
+            sample_space (list[int]): Possible values for each random sample. Must be integers.
+            prob (list[float]): Probability of each value of the sample space.
+        """
+        if not is_integer_space(sample_space):
+            raise ValueError("the exact distribution needs an integer sample space")
+        if len(sample_space) != len(prob):
+            raise ValueError("sample_space and prob must have the same length")
+        
+        values  : np.ndarray = np.asarray(sample_space, dtype=np.int64)
+        prob    : np.ndarray = np.asarray(prob, dtype=np.float64)
+        
+        self.sample_space   : list[int]     = sample_space
+        self.prob           : list[float]   = prob.tolist()
+        self.low            : int           = int(values.min())
+        # Positions reachable after t steps are t*low + lattice*k, k = 0, ..., t*width
+        self.lattice        : int           = max(gcd(*[int(v - self.low) for v in values]), 1)
+        self.width          : int           = int(values.max() - self.low) // self.lattice
+        
+        self.step_pmf       : np.ndarray    = np.zeros(self.width + 1)
+        np.add.at(self.step_pmf, (values - self.low) // self.lattice, prob)
+        
+        self.step_mean      : float         = float(np.sum(prob * values))
+        self.step_std       : float         = float(np.sqrt(np.sum(prob * (values - self.step_mean) ** 2)))
+    
+    def mean(self, t: Union[int, np.ndarray]) -> Union[float, np.ndarray]:
+        """
+        mu(t) = t * E[step]
+        """
+        return np.asarray(t) * self.step_mean
+    
+    def std(self, t: Union[int, np.ndarray]) -> Union[float, np.ndarray]:
+        """
+        sigma(t) = sqrt(t) * std[step]
+        """
+        return np.sqrt(np.asarray(t)) * self.step_std
+    
+    def mean_std(self, samples: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        mu(t) and sigma(t) for t = 1, ..., samples, aligned with the columns of a cumulative simulation array.
+        Args:
+            samples (int): Quantity of samples in the simulation.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (mean, std)
+        """
+        t: np.ndarray = np.arange(1, samples + 1)
+        return self.mean(t), self.std(t)
+    
+    def positions(self, t: int) -> np.ndarray:
+        """
+        Every position reachable after t steps.
+        """
+        return t * self.low + self.lattice * np.arange(t * self.width + 1)
+    
+    def pmf(self, t: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Exact probability of each position after t steps.
+        Args:
+            t (int): Number of steps.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (positions, probabilities)
+        """
+        if t == 0:
+            return np.zeros(1, dtype=np.int64), np.ones(1)
+        
+        if self.width == 1:
+            p: np.ndarray = binom.pmf(np.arange(t + 1), t, self.step_pmf[1])
+        elif self.width == 0:
+            p: np.ndarray = np.ones(1)
+        else:
+            n       : int = t * self.width + 1
+            n_fft   : int = next_fast_len(n, real=True)
+            p: np.ndarray = irfft(rfft(self.step_pmf, n_fft) ** t, n_fft)[:n]
+            np.clip(p, 0, None, out=p)
+        return self.positions(t), p
+    
+    def density(self, t: int, window: Optional[tuple[float, float]] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Exact PMF divided by the lattice spacing, comparable with a KDE density over the simulated endpoints.
+        Args:
+            t (int): Number of steps.
+            window (Optional[tuple[float, float]]): If given, only the positions inside [low, high] are returned.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (positions, density)
+        """
+        x, p = self.pmf(t)
+        if window is not None:
+            inside: np.ndarray = (x >= window[0]) & (x <= window[1])
+            x, p = x[inside], p[inside]
+        return x, p / self.lattice
+    
+    def table(self, samples: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Full P(E, t) table for t = 1, ..., samples on one grid of unit-spaced positions covering every row (from
+        min(low, samples*low) to max(high, samples*high)): row t-1 holds pmf(t) at positions(t) and zeros at the
+        positions not reachable at t (e.g. the odd ones at even t for [-1, 1]). Every row comes from pmf(t), the
+        binomial closed form or the FFT.
+        The table has samples x (range of the grid) cells and is limited to TABLE_MAX_CELLS of them (256 MiB);
+        for very long horizons use pmf(t) at the needed t, which takes milliseconds at t = 10^5.
+        Args:
+            samples (int): Quantity of samples in the simulation.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (grid positions, table of shape (samples, len(positions)))
+        Raises:
+            ValueError: The table would hold more than TABLE_MAX_CELLS cells.
+        """
+        high    : int = self.low + self.lattice * self.width
+        first   : int = min(self.low, samples * self.low)
+        last    : int = max(high, samples * high)
+        if samples * (last - first + 1) > TABLE_MAX_CELLS:
+            raise ValueError(
+                f"the table of {samples} steps holds {samples * (last - first + 1)} cells, more than "
+                f"{TABLE_MAX_CELLS}: use pmf(t) at the needed t"
+            )
+        
+        x       : np.ndarray = np.arange(first, last + 1)
+        table   : np.ndarray = np.zeros((samples, x.size))
+        for t in range(1, samples + 1):
+            positions, p = self.pmf(t)
+            table[t - 1, positions - first] = p
+        return x, table
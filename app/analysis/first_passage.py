@@ -0,0 +1,100 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                     app/analysis/first_passage.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from typing import Optional
+import numpy as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+class FirstPassage(object):
+    def __init__(self, samples: int) -> None:
+        """
+        Mergeable first-passage-time counts of walks between absorbing barriers: how many walks were absorbed at
+        each time step, on each side. Only O(samples) memory is kept, no matter how many walks are counted.
+        Args:
+            samples (int): Horizon of the walks.
+        """
+        self.samples    : int           = samples
+        self.count      : int           = 0
+        self.lower      : np.ndarray    = np.zeros(samples + 1, dtype=np.int64)
+        self.upper      : np.ndarray    = np.zeros(samples + 1, dtype=np.int64)
+    
+    @classmethod
+    def from_hits(cls, hit_time: np.ndarray, hit_side: np.ndarray, samples: int) -> "FirstPassage":
+        """
+        Counts the hits of a set of walks.
+        Args:
+            hit_time (np.ndarray): Steps until absorption of each walk, -1 if it survived.
+            hit_side (np.ndarray): -1 lower, 1 upper, 0 survived.
+            samples (int): Horizon of the walks.
+        Returns:
+            FirstPassage: The counts.
+        """
+        passage: FirstPassage = cls(samples)
+        passage.update(hit_time, hit_side)
+        return passage
+    
+    def update(self, hit_time: np.ndarray, hit_side: np.ndarray) -> None:
+        """
+        Adds the hits of a set of walks (see from_hits).
+        """
+        hit_time, hit_side = np.asarray(hit_time), np.asarray(hit_side)
+        self.count += hit_time.size
+        self.lower += np.bincount(hit_time[hit_side == -1], minlength=self.samples + 1)
+        self.upper += np.bincount(hit_time[hit_side == 1], minlength=self.samples + 1)
+    
+    def merge(self, other: "FirstPassage") -> "FirstPassage":
+        """
+        Adds the counts of another set of walks with the same horizon.
+        Returns:
+            FirstPassage: self
+        """
+        if other.samples != self.samples:
+            raise ValueError(f"cannot merge first passages of {other.samples} samples into {self.samples} samples")
+        self.count += other.count
+        self.lower += other.lower
+        self.upper += other.upper
+        return self
+    
+    def hits(self, side: Optional[int] = None) -> np.ndarray:
+        """
+        Walks absorbed at each time step 0..samples (0 is always empty), on one side (-1 lower, 1 upper) or both.
+        """
+        if side is None:
+            return self.lower + self.upper
+        return self.lower if side == -1 else self.upper
+    
+    def pdf(self, side: Optional[int] = None) -> np.ndarray:
+        """
+        First-passage-time distribution P(tau = t) for t = 0..samples, on one side or both. It sums to the
+        absorbed fraction, not to 1, when some walks survive the horizon.
+        """
+        return self.hits(side) / max(self.count, 1)
+    
+    @property
+    def survival(self) -> np.ndarray:
+        """
+        Survival curve S(t) = P(tau > t) for t = 0..samples.
+        """
+        return 1 - np.cumsum(self.hits()) / max(self.count, 1)
+    
+    @property
+    def absorbed(self) -> int:
+        return int(self.hits().sum())
+    
+    @property
+    def survived(self) -> int:
+        return self.count - self.absorbed
+    
+    def mean_time(self, side: Optional[int] = None) -> float:
+        """
+        Mean first-passage time of the absorbed walks (on one side or both), nan if none was absorbed.
+        """
+        hits: np.ndarray = self.hits(side)
+        total: int = int(hits.sum())
+        return float(np.arange(self.samples + 1) @ hits / total) if total > 0 else float("nan")
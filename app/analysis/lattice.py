@@ -0,0 +1,99 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                            app/analysis/lattice.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis.moments   import RunningMoments
+from analysis.streaming import EndpointHistogram
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from typing import Optional
+import numpy as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+def squared_distance(positions: np.ndarray) -> np.ndarray:
+    """
+    Squared distance to the origin of (..., dim) positions, exact (int64) on integer lattices.
+    Args:
+        positions (np.ndarray): Positions, the coordinates on the last axis.
+    Returns:
+        np.ndarray: |r|^2 of every position.
+    """
+    positions: np.ndarray = np.asarray(positions)
+    work: np.dtype = np.dtype(np.int64) if positions.dtype.kind in "iub" else np.dtype(np.float64)
+    return np.square(positions, dtype=work).sum(axis=-1)
+
+
+def msd(moments: RunningMoments) -> np.ndarray:
+    """
+    Mean squared displacement MSD(t) = E[|r(t)|^2] of walks started at the origin, from the per-coordinate moments
+    of a (simulations, samples, dim) run: the sum over the axes of var + mean^2. Scalar walks give E[x(t)^2].
+    Args:
+        moments (RunningMoments): Moments of the positions.
+    Returns:
+        np.ndarray: MSD(t) for every time step.
+    """
+    second: np.ndarray = moments.var + moments.mean**2
+    return second.sum(axis=-1) if second.ndim == 2 else second
+
+
+def drift_free_msd(moments: RunningMoments) -> np.ndarray:
+    """
+    Mean squared displacement around the mean position, E[|r(t) - E[r(t)]|^2] (the trace of the covariance).
+    """
+    return moments.var.sum(axis=-1) if moments.var.ndim == 2 else moments.var
+
+
+class RadialDistribution(EndpointHistogram):
+    def __init__(self) -> None:
+        """
+        Mergeable distribution of the distance to the origin of a set of positions (e.g. the endpoints of
+        lattice walks). The squared distances are counted, which are integers on integer lattices, so the counts
+        are exact and the memory grows with the range of the distances only.
+        """
+        super().__init__()
+    
+    def update(self, positions: np.ndarray) -> None:
+        """
+        Counts the distances of a chunk of (rows, dim) positions.
+        """
+        super().update(squared_distance(positions))
+    
+    @property
+    def radii(self) -> np.ndarray:
+        """
+        Distinct distances to the origin, increasing.
+        """
+        return np.sqrt(self.values) if self.values is not None else np.zeros(0)
+    
+    @property
+    def pdf(self) -> np.ndarray:
+        """
+        Probability of each distance of self.radii.
+        """
+        return self.counts / max(self.count, 1)
+    
+    @property
+    def mean_squared(self) -> float:
+        """
+        E[|r|^2] of the counted positions (the MSD at their time step).
+        """
+        return float(self.values @ self.counts / self.count) if self.count > 0 else float("nan")
+    
+    def shell_density(self, bins: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Radial density: probability per unit of distance in shells [r_k, r_k+1), the 1D analog of the radial
+        distribution function (divide by the shell area or volume for the density per site).
+        Args:
+            bins (Optional[np.ndarray]): Shell edges. Defaults to unit shells from 0 to the largest distance.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The shell edges and the density of each shell.
+        """
+        if bins is None:
+            bins = np.arange(0, np.ceil(self.radii.max() if self.radii.size else 0) + 2)
+        weights, edges = np.histogram(self.radii, bins=bins, weights=self.pdf)
+        return edges, weights / np.diff(edges)
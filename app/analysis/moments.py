@@ -0,0 +1,189 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                           app/analysis/moments.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib import PosixPath
+from typing import Optional
+import numpy as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+class RunningMoments(object):
+    def __init__(self, samples: int, higher: bool = False) -> None:
+        """
+        Mergeable running moments per time step (Welford/Chan, with Pébay's update for the 3rd and 4th moments).
+        Only O(samples) memory is kept, no matter how many simulations are accumulated. Walks over step vectors
+        ((simulations, samples, dim) chunks) get the moments of each coordinate, as (samples, dim) arrays.
+        Args:
+            samples (int): Quantity of time steps of each simulation.
+            higher (bool): Whether the 3rd and 4th central moments (skewness/kurtosis) are also tracked.
+        """
+        self.samples    : int                   = samples
+        self.higher     : bool                  = higher
+        self.count      : int                   = 0
+        self.mean_      : np.ndarray            = np.zeros(samples)
+        self.m2         : np.ndarray            = np.zeros(samples)
+        self.m3         : Optional[np.ndarray]  = np.zeros(samples) if higher else None
+        self.m4         : Optional[np.ndarray]  = np.zeros(samples) if higher else None
+    
+    @classmethod
+    def from_chunk(cls, chunk: np.ndarray, higher: bool = False) -> "RunningMoments":
+        """
+        Builds the moments of a (simulations, samples) chunk.
+        Args:
+            chunk (np.ndarray): The simulations, one per row.
+            higher (bool): Whether the 3rd and 4th central moments are also computed.
+        Returns:
+            RunningMoments: The moments of the chunk.
+        """
+        moments: RunningMoments = cls(chunk.shape[1], higher)
+        if chunk.shape[0] == 0:
+            return moments
+        
+        chunk: np.ndarray = np.asarray(chunk, dtype=np.float64)
+        moments.count   = chunk.shape[0]
+        moments.mean_   = chunk.mean(axis=0)
+        centered: np.ndarray = chunk - moments.mean_
+        sq: np.ndarray = centered ** 2
+        moments.m2      = sq.sum(axis=0)
+        if higher:
+            moments.m3  = (sq * centered).sum(axis=0)
+            moments.m4  = (sq * sq).sum(axis=0)
+        return moments
+    
+    def update(self, chunk: np.ndarray) -> None:
+        """
+        Accumulates a (simulations, samples) chunk.
+        Args:
+            chunk (np.ndarray): The simulations, one per row.
+        """
+        self.merge(RunningMoments.from_chunk(chunk, self.higher))
+    
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        """
+        Merges the moments of another set of simulations into this one (parallel algorithm of Chan et al.).
+        Args:
+            other (RunningMoments): Moments over the same time steps.
+        Returns:
+            RunningMoments: self
+        """
+        if other.samples != self.samples:
+            raise ValueError(f"cannot merge moments of {other.samples} samples into {self.samples} samples")
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean_, self.m2 = other.count, other.mean_.copy(), other.m2.copy()
+            if self.higher:
+                self.m3, self.m4 = other.m3.copy(), other.m4.copy()
+            return self
+        
+        na, nb  = float(self.count), float(other.count)
+        n       : float         = na + nb
+        delta   : np.ndarray    = other.mean_ - self.mean_
+        
+        mean    : np.ndarray    = self.mean_ + delta * nb / n
+        m2      : np.ndarray    = self.m2 + other.m2 + delta**2 * na * nb / n
+        if self.higher:
+            m3: np.ndarray = (
+                self.m3 + other.m3 + delta**3 * na * nb * (na - nb) / n**2
+                + 3 * delta * (na * other.m2 - nb * self.m2) / n
+            )
+            m4: np.ndarray = (
+                self.m4 + other.m4 + delta**4 * na * nb * (na**2 - na * nb + nb**2) / n**3
+                + 6 * delta**2 * (na**2 * other.m2 + nb**2 * self.m2) / n**2
+                + 4 * delta * (na * other.m3 - nb * self.m3) / n
+            )
+            self.m3, self.m4 = m3, m4
+        
+        self.count, self.mean_, self.m2 = int(n), mean, m2
+        return self
+    
+    def append_columns(self, other: "RunningMoments") -> "RunningMoments":
+        """
+        Appends the moments of later time steps of the same simulations (a run extended in time).
+        Args:
+            other (RunningMoments): Moments of the new time steps, over the same simulations.
+        Returns:
+            RunningMoments: self
+        """
+        if other.count != self.count:
+            raise ValueError(f"cannot append moments of {other.count} simulations to {self.count} simulations")
+        if other.higher != self.higher:
+            raise ValueError("cannot append moments with and without the higher moments")
+        
+        self.samples    += other.samples
+        self.mean_      = np.concatenate([self.mean_, other.mean_])
+        self.m2         = np.concatenate([self.m2, other.m2])
+        if self.higher:
+            self.m3     = np.concatenate([self.m3, other.m3])
+            self.m4     = np.concatenate([self.m4, other.m4])
+        return self
+    
+    @property
+    def mean(self) -> np.ndarray:
+        """
+        mu(t) for every time step.
+        """
+        return self.mean_
+    
+    @property
+    def var(self) -> np.ndarray:
+        """
+        Population variance (ddof=0, as np.var) for every time step.
+        """
+        return self.m2 / self.count
+    
+    @property
+    def std(self) -> np.ndarray:
+        """
+        sigma(t) for every time step (ddof=0, as np.std).
+        """
+        return np.sqrt(self.var)
+    
+    @property
+    def skew(self) -> np.ndarray:
+        """
+        Skewness for every time step (nan where the variance is 0).
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt(self.count) * self.m3 / self.m2**1.5
+    
+    @property
+    def kurtosis(self) -> np.ndarray:
+        """
+        Excess kurtosis for every time step (nan where the variance is 0).
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.count * self.m4 / self.m2**2 - 3
+    
+    def save(self, path_: PosixPath) -> None:
+        """
+        Saves the moments in a .npz file.
+        Args:
+            path_ (PosixPath): Path of the file.
+        """
+        arrays: dict[str, np.ndarray] = {"count": np.array(self.count), "mean": self.mean_, "m2": self.m2}
+        if self.higher:
+            arrays.update({"m3": self.m3, "m4": self.m4})
+        with open(path_, "wb") as f:
+            np.savez(f, **arrays)
+    
+    @classmethod
+    def load(cls, path_: PosixPath) -> "RunningMoments":
+        """
+        Loads moments saved with save().
+        Args:
+            path_ (PosixPath): Path of the file.
+        Returns:
+            RunningMoments: The loaded moments.
+        """
+        with np.load(path_) as arrays:
+            moments: RunningMoments = cls(arrays["mean"].shape[0], "m3" in arrays)
+            moments.count, moments.mean_, moments.m2 = int(arrays["count"]), arrays["mean"], arrays["m2"]
+            if moments.higher:
+                moments.m3, moments.m4 = arrays["m3"], arrays["m4"]
+        return moments
@@ -0,0 +1,290 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                         app/analysis/quantiles.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib import PosixPath
+from typing import Any, Optional, Sequence
+import numpy as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# Levels of the bands drawn by the fan charts
+QUANTILE_LEVELS : tuple[float, ...] = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+# Time steps tracked by a sketch (evenly spaced above it, the last step always included)
+MAX_COLUMNS     : int               = 1024
+# Widest position range of the exact histograms, wider ones are compressed into digests
+MAX_EXACT_BINS  : int               = 1024
+# Centroids per time step of a digest
+COMPRESSION     : int               = 200
+# Tracked positions buffered by update() before they are counted: one histogram per few million positions instead
+# of one per chunk (a write_batch sub-chunk or a moments_batch block)
+UPDATE_VALUES   : int               = 1 << 22
+
+
+def quantile_columns(samples: int, max_columns: int = MAX_COLUMNS) -> np.ndarray:
+    """
+    Time steps tracked by the sketches of walks of `samples` steps: all of them up to max_columns, evenly spaced
+    ones beyond, always with the first and the last step.
+    """
+    if samples <= max_columns:
+        return np.arange(samples)
+    return np.unique(np.round(np.linspace(0, samples - 1, max_columns)).astype(np.int64))
+
+
+class QuantileSketch(object):
+    def __init__(self, samples: int, columns: Optional[np.ndarray] = None, compression: int = COMPRESSION,
+                 max_bins: int = MAX_EXACT_BINS) -> None:
+        """
+        Mergeable sketch of the distribution of the positions at every tracked time step, for quantile bands
+        without the Gaussian assumption of mu(t) +- k sigma(t). Integer walks are counted exactly, one histogram
+        per time step over the positions reached (quantiles as EndpointHistogram.quantile). Real-valued walks, and
+        histograms wider than max_bins positions, are kept as digests: `compression` centroids (mean, weight) per
+        time step, grouped with the arcsine scale of the t-digest so the tails keep the finest resolution.
+        The memory is bounded by the columns times max_bins or compression, whatever the number of simulations.
+        Workers sketch their units and the parent merges the sketches, like RunningMoments. update() buffers
+        UPDATE_VALUES positions before counting them, merge, quantile, save and pickling flush the buffer.
+        Args:
+            samples (int): Time steps of the walks.
+            columns (Optional[np.ndarray]): Tracked time steps. Defaults to quantile_columns(samples).
+            compression (int): Centroids per time step of a digest.
+            max_bins (int): Widest position range counted exactly.
+        """
+        self.samples        : int                   = samples
+        self.columns        : np.ndarray            = quantile_columns(samples) if columns is None else columns
+        self.compression    : int                   = compression
+        self.max_bins       : int                   = max_bins
+        self.count          : int                   = 0
+        self.low            : Optional[np.ndarray]  = None
+        self.high           : Optional[np.ndarray]  = None
+        self.offset         : Optional[np.ndarray]  = None
+        self.counts         : Optional[np.ndarray]  = None
+        self.means          : Optional[np.ndarray]  = None
+        self.weights        : Optional[np.ndarray]  = None
+        self.pending        : list[np.ndarray]      = []
+    
+    def __getstate__(self) -> dict[str, Any]:
+        # Sketches travel from the workers to the parent pickled, with their buffer counted
+        self.flush()
+        return self.__dict__
+    
+    @property
+    def exact(self) -> bool:
+        """
+        Whether the sketch holds exact histograms (False once compressed into digests).
+        """
+        return self.flush().means is None
+    
+    @classmethod
+    def from_chunk(cls, chunk: np.ndarray, columns: Optional[np.ndarray] = None, compression: int = COMPRESSION,
+                   max_bins: int = MAX_EXACT_BINS) -> "QuantileSketch":
+        """
+        Builds the sketch of a (simulations, samples) chunk.
+        Args:
+            chunk (np.ndarray): The simulations, one per row.
+            columns (Optional[np.ndarray]): Tracked time steps. Defaults to quantile_columns(samples).
+            compression (int): Centroids per time step of a digest.
+            max_bins (int): Widest position range counted exactly.
+        Returns:
+            QuantileSketch: The sketch of the chunk.
+        """
+        sketch: QuantileSketch = cls(chunk.shape[1], columns, compression, max_bins)
+        sketch._fill(np.asarray(chunk)[:, sketch.columns])
+        return sketch
+    
+    def _fill(self, values: np.ndarray) -> None:
+        """
+        Counts the (simulations, columns) tracked positions into this empty sketch.
+        """
+        if values.shape[0] == 0:
+            return
+        self.count = values.shape[0]
+        self.low, self.high = values.min(axis=0).astype(np.float64), values.max(axis=0).astype(np.float64)
+        if np.issubdtype(values.dtype, np.integer) and (self.high - self.low).max() < self.max_bins:
+            self.offset = values.min(axis=0).astype(np.int64)
+            width: int = int((self.high - self.low).max()) + 1
+            index: np.ndarray = (values - self.offset) + np.arange(values.shape[1]) * width
+            self.counts = np.bincount(index.ravel(), minlength=values.shape[1] * width).reshape(-1, width)
+        else:
+            self.means, self.weights = self._compress(
+                values.T.astype(np.float64), np.ones(values.T.shape, dtype=np.float64)
+            )
+    
+    def update(self, chunk: np.ndarray) -> None:
+        """
+        Accumulates a (simulations, samples) chunk. Its tracked positions are buffered and counted once
+        UPDATE_VALUES of them are waiting (see flush).
+        """
+        values: np.ndarray = np.asarray(chunk)[:, self.columns]
+        if values.shape[0] > 0:
+            self.pending.append(values)
+        if sum(pending.size for pending in self.pending) >= UPDATE_VALUES:
+            self.flush()
+    
+    def flush(self) -> "QuantileSketch":
+        """
+        Counts the positions buffered by update(), in one histogram (or digest) merged into the sketch.
+        Returns:
+            QuantileSketch: self
+        """
+        if len(self.pending) == 0:
+            return self
+        values: np.ndarray = np.concatenate(self.pending)
+        self.pending = []
+        chunk: QuantileSketch = QuantileSketch(self.samples, self.columns, self.compression, self.max_bins)
+        chunk._fill(values)
+        return self.merge(chunk)
+    
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Groups weighted points into `compression` centroids per time step: sorted by value, every point goes to
+        the bucket of the arcsine scale at the middle of its cumulative weight, so the buckets are narrow near the
+        quantiles 0 and 1 and wide around the median.
+        Args:
+            means (np.ndarray): (columns, points) values.
+            weights (np.ndarray): (columns, points) weights (0 for padding).
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (columns, compression) means and weights of the centroids.
+        """
+        order   : np.ndarray = np.argsort(means, axis=1, kind="stable")
+        means   = np.take_along_axis(means, order, axis=1)
+        weights = np.take_along_axis(weights, order, axis=1)
+        total   : np.ndarray = weights.sum(axis=1, keepdims=True)
+        q       : np.ndarray = (np.cumsum(weights, axis=1) - weights / 2) / np.maximum(total, 1)
+        bucket  : np.ndarray = np.clip(
+            np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5)), 0, self.compression - 1
+        ).astype(np.int64)
+        index   : np.ndarray = (bucket + np.arange(means.shape[0])[:, None] * self.compression).ravel()
+        size    : int        = means.shape[0] * self.compression
+        
+        weight  : np.ndarray = np.bincount(index, weights=weights.ravel(), minlength=size).reshape(-1, self.compression)
+        moment  : np.ndarray = np.bincount(
+            index, weights=(weights * means).ravel(), minlength=size
+        ).reshape(-1, self.compression)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(weight > 0, moment / weight, 0.0), weight
+    
+    def _as_digest(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Centroids of the sketch: the digest itself, or one centroid per position of the exact histograms.
+        """
+        if self.exact == False:
+            return self.means, self.weights
+        grid: np.ndarray = (self.offset[:, None] + np.arange(self.counts.shape[1])).astype(np.float64)
+        return grid, self.counts.astype(np.float64)
+    
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Merges the sketch of another set of simulations into this one. Exact histograms stay exact while their
+        positions fit in max_bins, otherwise both sides are compressed into one digest.
+        Args:
+            other (QuantileSketch): Sketch of the same time steps.
+        Returns:
+            QuantileSketch: self
+        """
+        if other.samples != self.samples or np.array_equal(other.columns, self.columns) == False:
+            raise ValueError(f"cannot merge a sketch of {other.samples} samples into {self.samples} samples")
+        self.flush()
+        other.flush()
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.low, self.high = other.count, other.low.copy(), other.high.copy()
+            self.offset, self.counts = other.offset, other.counts
+            self.means, self.weights = other.means, other.weights
+            return self
+        
+        self.count  += other.count
+        self.low    = np.minimum(self.low, other.low)
+        self.high   = np.maximum(self.high, other.high)
+        if self.exact == True and other.exact == True and (self.high - self.low).max() < self.max_bins:
+            # Rows narrower than the widest one end with zeros, the sum is trimmed back to the widest range
+            offset  : np.ndarray = np.minimum(self.offset, other.offset)
+            padded  : int        = max(int((s.offset - offset).max()) + s.counts.shape[1] for s in (self, other))
+            counts  : np.ndarray = np.zeros((self.columns.size, padded), dtype=np.int64)
+            rows    : np.ndarray = np.arange(self.columns.size)[:, None]
+            for sketch in (self, other):
+                counts[rows, (sketch.offset - offset)[:, None] + np.arange(sketch.counts.shape[1])] += sketch.counts
+            self.offset, self.counts = offset, counts[:, :int((self.high - self.low).max()) + 1]
+            return self
+        
+        (means_a, weights_a), (means_b, weights_b) = self._as_digest(), other._as_digest()
+        self.means, self.weights = self._compress(
+            np.concatenate([means_a, means_b], axis=1), np.concatenate([weights_a, weights_b], axis=1)
+        )
+        self.offset, self.counts = None, None
+        return self
+    
+    def quantile(self, q: Sequence[float]) -> np.ndarray:
+        """
+        Quantiles of the positions at every tracked time step. Exact histograms give the smallest position
+        whose cumulative frequency reaches q, digests interpolate between the centroids (and the exact min and
+        max at the ends).
+        Args:
+            q (Sequence[float]): Probabilities in [0, 1].
+        Returns:
+            np.ndarray: (len(q), columns) quantiles.
+        """
+        if self.flush().count == 0:
+            raise ValueError("the sketch is empty")
+        rank: np.ndarray = np.asarray(q, dtype=np.float64) * self.count
+        if self.exact == True:
+            cumulative: np.ndarray = np.cumsum(self.counts, axis=1)
+            index: np.ndarray = (cumulative[None, :, :] < rank[:, None, None]).sum(axis=2)
+            return (self.offset + np.minimum(index, self.counts.shape[1] - 1)).astype(np.float64)
+        
+        bands: np.ndarray = np.empty((rank.size, self.columns.size))
+        for n in range(self.columns.size):
+            kept        : np.ndarray = self.weights[n] > 0
+            weights     : np.ndarray = self.weights[n][kept]
+            centers     : np.ndarray = np.cumsum(weights) - weights / 2
+            bands[:, n] = np.interp(
+                rank, np.r_[0, centers, self.count], np.r_[self.low[n], self.means[n][kept], self.high[n]]
+            )
+        return bands
+    
+    def bands(self, levels: Sequence[float] = QUANTILE_LEVELS) -> dict[float, np.ndarray]:
+        """
+        Quantile bands by level, e.g. {0.05: q_0.05(t), ...}, over the time steps of self.columns.
+        """
+        return dict(zip(levels, self.quantile(levels)))
+    
+    def save(self, path_: PosixPath) -> None:
+        """
+        Saves the sketch in a .npz file.
+        Args:
+            path_ (PosixPath): Path of the file.
+        """
+        self.flush()
+        arrays: dict[str, np.ndarray] = {
+            "samples": np.array(self.samples), "columns": self.columns, "count": np.array(self.count),
+            "compression": np.array(self.compression), "max_bins": np.array(self.max_bins)
+        }
+        if self.count > 0:
+            arrays.update({"low": self.low, "high": self.high})
+            arrays.update(
+                {"offset": self.offset, "counts": self.counts} if self.exact else
+                {"means": self.means, "weights": self.weights}
+            )
+        with open(path_, "wb") as f:
+            np.savez(f, **arrays)
+    
+    @classmethod
+    def load(cls, path_: PosixPath) -> "QuantileSketch":
+        """
+        Loads a sketch saved with save().
+        Args:
+            path_ (PosixPath): Path of the file.
+        Returns:
+            QuantileSketch: The loaded sketch.
+        """
+        with np.load(path_) as arrays:
+            sketch: QuantileSketch = cls(
+                int(arrays["samples"]), arrays["columns"], int(arrays["compression"]), int(arrays["max_bins"])
+            )
+            sketch.count = int(arrays["count"])
+            for name in ("low", "high", "offset", "counts", "means", "weights"):
+                setattr(sketch, name, arrays[name] if name in arrays else None)
+        return sketch
@@ -0,0 +1,226 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                         app/analysis/streaming.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis.moments import RunningMoments
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from typing import Any, Iterable, Iterator, Optional, Union
+import numpy as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# Distinct real values an EndpointHistogram keeps before it puts them on a grid
+MAX_DISTINCT: int = 1 << 16
+
+
+def iter_chunks(data: Union[np.ndarray, Iterable[np.ndarray]], block: int = 10000) -> Iterator[np.ndarray]:
+    """
+    Yields (rows, samples) chunks of at most `block` rows, loaded one at a time.
+    Args:
+        data (Union[np.ndarray, Iterable[np.ndarray]]): An array (ndarray or memmap), a ShardedArray (read shard by
+                                                       shard) or any iterable of shards.
+        block (int): Maximum rows of a chunk.
+    """
+    if hasattr(data, "iter_shards"):
+        shards: Iterable[Any] = data.iter_shards()
+    elif isinstance(data, np.ndarray):
+        shards: Iterable[Any] = [data]
+    else:
+        shards: Iterable[Any] = data
+    
+    for shard in shards:
+        for start in range(0, shard.shape[0], block):
+            yield np.asarray(shard[start:start + block])
+
+
+class EndpointHistogram(object):
+    def __init__(self, max_distinct: int = MAX_DISTINCT) -> None:
+        """
+        Counts of the distinct values of a stream (e.g. the endpoints of the walks). The values of an integer walk
+        sit on a lattice, so the memory grows with the range of the positions, not with the number of simulations,
+        and the counts are exact. Real-valued walks have no lattice: once they hold more than max_distinct values
+        they are snapped on a grid of self.resolution (a power of 2, so the grids of two histograms nest and
+        they still merge), which bounds the memory and makes the counts and quantiles approximate to it.
+        Args:
+            max_distinct (int): Most distinct real values kept before they are put on a grid.
+        """
+        self.values         : Optional[np.ndarray]  = None
+        self.counts         : np.ndarray            = np.zeros(0, dtype=np.int64)
+        self.max_distinct   : int                   = max_distinct
+        self.resolution     : Optional[float]       = None
+    
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+    
+    def add(self, values: np.ndarray, counts: np.ndarray) -> "EndpointHistogram":
+        """
+        Adds counts of (not necessarily distinct) values.
+        Args:
+            values (np.ndarray): The values.
+            counts (np.ndarray): Occurrences of each value.
+        Returns:
+            EndpointHistogram: self
+        """
+        if self.values is not None:
+            values: np.ndarray = np.concatenate([self.values, values])
+            counts: np.ndarray = np.concatenate([self.counts, counts])
+        self._count(values, counts)
+        while self.values.dtype.kind == "f" and self.values.size > self.max_distinct:
+            # No lattice: the grid is coarsened until the values fit
+            span: float = float(self.values[-1] - self.values[0])
+            self.resolution = max(2.0 ** np.ceil(np.log2(span / self.max_distinct)), 2 * (self.resolution or 0))
+            self._count(self.values, self.counts)
+        return self
+    
+    def _count(self, values: np.ndarray, counts: np.ndarray) -> None:
+        if self.resolution is not None:
+            values = np.round(values / self.resolution) * self.resolution
+        self.values, inverse = np.unique(values, return_inverse=True)
+        self.counts = np.bincount(inverse.ravel(), weights=counts, minlength=self.values.size).astype(np.int64)
+    
+    def update(self, y: np.ndarray) -> None:
+        """
+        Counts the values of a chunk.
+        """
+        values, counts = np.unique(np.asarray(y), return_counts=True)
+        self.add(values, counts)
+    
+    def merge(self, other: "EndpointHistogram") -> "EndpointHistogram":
+        """
+        Adds the counts of another histogram.
+        """
+        if other.values is None:
+            return self
+        if other.resolution is not None and (self.resolution is None or other.resolution > self.resolution):
+            self.resolution = other.resolution
+        return self.add(other.values, other.counts)
+    
+    def quantile(self, q: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """
+        Quantiles of the counted values, exact unless they were put on a grid (the "inverted_cdf" method of
+        np.quantile: the smallest value whose cumulative frequency reaches q).
+        Args:
+            q (Union[float, np.ndarray]): Probabilities in [0, 1].
+        Returns:
+            Union[float, np.ndarray]: The quantiles.
+        """
+        if self.values is None or self.count == 0:
+            raise ValueError("the histogram is empty")
+        cumulative  : np.ndarray = np.cumsum(self.counts)
+        rank        : np.ndarray = np.asarray(q, dtype=np.float64) * cumulative[-1]
+        index       : np.ndarray = np.minimum(np.searchsorted(cumulative, rank, side="left"), self.values.size - 1)
+        return self.values[index]
+
+
+class ReservoirSample(object):
+    def __init__(self, size: int, seed: int = 0) -> None:
+        """
+        Uniform sample of `size` rows of a stream, kept in bounded memory. Every row gets a random key and the
+        rows with the smallest keys are kept, so the sample does not depend on how the stream is chunked.
+        Args:
+            size (int): Rows kept.
+            seed (int): Seed of the keys.
+        """
+        self.size   : int                   = size
+        self.rng    : np.random.Generator   = np.random.default_rng(seed)
+        self.seen   : int                   = 0
+        self.keys   : np.ndarray            = np.zeros(0)
+        self.index  : np.ndarray            = np.zeros(0, dtype=np.int64)
+        self.rows   : Optional[np.ndarray]  = None
+    
+    def update(self, chunk: np.ndarray) -> None:
+        """
+        Offers the rows of a chunk to the sample.
+        """
+        keys    : np.ndarray = self.rng.random(chunk.shape[0])
+        index   : np.ndarray = np.arange(self.seen, self.seen + chunk.shape[0])
+        self.seen += chunk.shape[0]
+        if self.size == 0:
+            return
+        if self.rows is None:
+            self.rows = np.asarray(chunk[:0])
+        
+        # Only rows that beat the largest key kept can enter a full sample
+        if self.keys.size == self.size:
+            enter: np.ndarray = keys < self.keys.max()
+            keys, index, chunk = keys[enter], index[enter], chunk[enter]
+        if keys.size > self.size:
+            best: np.ndarray = np.argpartition(keys, self.size - 1)[:self.size]
+            keys, index, chunk = keys[best], index[best], chunk[best]
+        
+        keys    = np.concatenate([self.keys, keys])
+        index   = np.concatenate([self.index, index])
+        rows    : np.ndarray = np.concatenate([self.rows, chunk])
+        if keys.size > self.size:
+            best: np.ndarray = np.argpartition(keys, self.size - 1)[:self.size]
+            keys, index, rows = keys[best], index[best], rows[best]
+        self.keys, self.index, self.rows = keys, index, rows
+    
+    @property
+    def sample(self) -> np.ndarray:
+        """
+        The sampled rows in stream order.
+        """
+        return self.rows[np.argsort(self.index)]
+
+
+class StreamingAnalysis(object):
+    def __init__(self, moments: bool = True, higher: bool = False, trajectories: int = 5000, seed: int = 0) -> None:
+        """
+        Statistics of a dataset gathered in a single pass over its chunks, with memory bounded by the number of
+        time steps, the range of the endpoints and the number of sampled trajectories (not by the simulations).
+        Args:
+            moments (bool): Whether the moments per time step are computed (skip them if they are known).
+            higher (bool): Whether the skewness and kurtosis are also tracked.
+            trajectories (int): Trajectories sampled for display.
+            seed (int): Seed of the trajectory sample.
+        """
+        self.track_moments  : bool                      = moments
+        self.higher         : bool                      = higher
+        self.count          : int                       = 0
+        self.samples        : Optional[int]             = None
+        self.moments        : Optional[RunningMoments]  = None
+        self.endpoints      : EndpointHistogram         = EndpointHistogram()
+        self.reservoir      : ReservoirSample           = ReservoirSample(trajectories, seed)
+    
+    def update(self, chunk: np.ndarray) -> None:
+        """
+        Accumulates a (simulations, samples) chunk.
+        """
+        chunk: np.ndarray = np.asarray(chunk)
+        if self.samples is None:
+            self.samples = chunk.shape[1]
+            self.moments = RunningMoments(self.samples, self.higher) if self.track_moments else None
+        if self.moments is not None:
+            self.moments.update(chunk)
+        self.endpoints.update(chunk[:, -1])
+        self.reservoir.update(chunk)
+        self.count += chunk.shape[0]
+    
+    def consume(self, chunks: Iterable[np.ndarray]) -> "StreamingAnalysis":
+        """
+        Accumulates every chunk of an iterable (see iter_chunks).
+        Returns:
+            StreamingAnalysis: self
+        """
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+    
+    def quantile(self, q: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """
+        Quantiles of the endpoints (exact for integer walks, see EndpointHistogram).
+        """
+        return self.endpoints.quantile(q)
+    
+    @property
+    def trajectories(self) -> np.ndarray:
+        """
+        Uniformly sampled trajectories, in simulation order.
+        """
+        return self.reservoir.sample
@@ -0,0 +1,54 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                          app/benchmark/__main__.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib import Path
+import argparse
+import json
+import sys
+
+# "python app/benchmark" only puts app/benchmark on the path, the app modules live one level up.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from benchmark.suite import BenchmarkSuite, compare
+from benchmark.cases import CASES
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+# VARS |-------------------------------------------------------|
+SAMPlES     : list[int]     = [100, 1000]
+SIMULATIONS : list[int]     = [1000, 10000]
+STATES      : list[int]     = [-1, 1]
+PROB        : list[float]   = [0.5, 0.5]
+# |------------------------------------------------------------|
+
+
+parser = argparse.ArgumentParser(prog="python app/benchmark", description="Random walk benchmark suite")
+parser.add_argument("--samples", type=int, nargs="+", default=SAMPlES)
+parser.add_argument("--simulations", type=int, nargs="+", default=SIMULATIONS)
+parser.add_argument("--cases", nargs="+", choices=list(CASES), default=None)
+parser.add_argument("--repeat", type=int, default=3)
+parser.add_argument("--max-cores", type=int, default=None)
+parser.add_argument("--output", type=Path, default=None, help="JSON file of the results")
+parser.add_argument("--compare", type=Path, default=None, help="JSON file of a previous run to compare with")
+parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown reported as a regression")
+args = parser.parse_args()
+
+suite = BenchmarkSuite(
+    args.samples, args.simulations, STATES, PROB, cases=args.cases, repeat=args.repeat, max_cores=args.max_cores
+)
+suite.run()
+
+if args.output is not None:
+    suite.save(args.output)
+
+if args.compare is not None:
+    with open(args.compare) as f:
+        regressions: list[str] = compare(json.load(f), suite.report(), args.tolerance)
+    print(*(regressions or ["no regressions"]), sep="\n")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,161 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                            app/benchmark/cases.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from generator.coinflip                 import GeneratorRandomWalk
+from generator.coinflip_chunk           import coinflip_simulations
+from core.multicore_simulation          import MultiCore
+from bin.binary_manager                 import BinManager
+from data.concatenate_bin_simulations   import concat_simulations
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                            import Path
+from typing                             import Callable
+import tempfile
+import time
+import contextlib
+import io
+import multiprocessing                  as mp
+import numpy                            as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# Every case takes (samples, simulations, sample_space, prob, **extra), runs its own setup and returns the seconds
+# of the timed section only. The logs of the timed code are silenced, they would dominate small cases.
+SEED: int = 0
+
+
+def _chunk(samples: int, simulations: int, sample_space: list[int], prob: list[float]) -> np.ndarray:
+    return coinflip_simulations(samples, prob, simulations, True, sample_space, rng=np.random.default_rng(SEED))
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0: float = time.perf_counter()
+        fn()
+        return time.perf_counter() - t0
+
+
+def generator_run(samples: int, simulations: int, sample_space: list[int], prob: list[float]) -> float:
+    """
+    GeneratorRandomWalk.run (per-step path), once per simulation.
+    """
+    generator: GeneratorRandomWalk = GeneratorRandomWalk(samples, prob, sample_space, np.random.default_rng(SEED))
+    
+    def run() -> None:
+        for _ in range(simulations):
+            generator.run()
+            generator.get_cum_array()
+    return _timed(run)
+
+
+def coinflip_batch(samples: int, simulations: int, sample_space: list[int], prob: list[float]) -> float:
+    """
+    coinflip_simulations with the vectorized batch path.
+    """
+    return _timed(lambda: _chunk(samples, simulations, sample_space, prob))
+
+
+def multicore_run(samples: int, simulations: int, sample_space: list[int], prob: list[float], cores: int) -> float:
+    """
+    MultiCore.run in the in-memory mode with the given number of cores (pool start-up included).
+    """
+    multicore: MultiCore = MultiCore(
+        cpu_offs=mp.cpu_count() - cores, in_memory=True, seed=SEED, unit_size=max(simulations // (4*cores), 1)
+    )
+    multicore.coinflip_args(samples, sample_space, prob, simulations, True)
+    
+    def run() -> None:
+        multicore.run()
+        multicore.close()
+    return _timed(run)
+
+
+def bin_post(samples: int, simulations: int, sample_space: list[int], prob: list[float]) -> float:
+    """
+    BinManager.post of one (simulations, samples) array.
+    """
+    data: np.ndarray = _chunk(samples, simulations, sample_space, prob)
+    with tempfile.TemporaryDirectory() as tmp:
+        return _timed(lambda: BinManager(Path(tmp)).post("Shard000000", data))
+
+
+def bin_get(samples: int, simulations: int, sample_space: list[int], prob: list[float]) -> float:
+    """
+    BinManager.get of one (simulations, samples) array, read in full.
+    """
+    data: np.ndarray = _chunk(samples, simulations, sample_space, prob)
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            BinManager(Path(tmp)).post("Shard000000", data)
+        return _timed(lambda: np.array(BinManager(Path(tmp)).get("Shard000000")))
+
+
+def concat(samples: int, simulations: int, sample_space: list[int], prob: list[float], shards: int = 8) -> float:
+    """
+    concat_simulations over a number of shards, lazy view plus a full read of the last column.
+    """
+    data: np.ndarray = _chunk(samples, simulations, sample_space, prob)
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for n, part in enumerate(np.array_split(data, shards)):
+                BinManager(Path(tmp)).post(f"Shard{n:06d}", part)
+        return _timed(lambda: concat_simulations(path_=Path(tmp))[:, -1])
+
+
+def _graph(graph: str, samples: int, simulations: int, sample_space: list[int], prob: list[float]) -> float:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from graph.all_trajectories import Graph_AllTrajectories
+    from graph.distribution     import Distribution, DistAnalysis
+    
+    classes: dict[str, type] = {
+        "all_trajectories": Graph_AllTrajectories, "distribution": Distribution, "dist_analysis": DistAnalysis
+    }
+    data: np.ndarray = _chunk(samples, simulations, sample_space, prob)
+    
+    def run() -> None:
+        classes[graph](data, sample_space, prob).plot()
+        for n in plt.get_fignums():
+            plt.figure(n).canvas.draw()
+        plt.close("all")
+    return _timed(run)
+
+
+def graph_all_trajectories(samples: int, simulations: int, sample_space: list[int], prob: list[float]) -> float:
+    """
+    Graph_AllTrajectories.plot plus rendering of the figure.
+    """
+    return _graph("all_trajectories", samples, simulations, sample_space, prob)
+
+
+def graph_distribution(samples: int, simulations: int, sample_space: list[int], prob: list[float]) -> float:
+    """
+    Distribution.plot plus rendering of the figure.
+    """
+    return _graph("distribution", samples, simulations, sample_space, prob)
+
+
+def graph_dist_analysis(samples: int, simulations: int, sample_space: list[int], prob: list[float]) -> float:
+    """
+    DistAnalysis.plot plus rendering of the figure.
+    """
+    return _graph("dist_analysis", samples, simulations, sample_space, prob)
+
+
+# name -> case. The per-step generator is capped (see benchmark/suite.py), it is ~400x slower than the batch path.
+CASES: dict[str, Callable[..., float]] = {
+    "generator_run": generator_run,
+    "coinflip_batch": coinflip_batch,
+    "multicore_run": multicore_run,
+    "bin_post": bin_post,
+    "bin_get": bin_get,
+    "concat_simulations": concat,
+    "graph_all_trajectories": graph_all_trajectories,
+    "graph_distribution": graph_distribution,
+    "graph_dist_analysis": graph_dist_analysis,
+}
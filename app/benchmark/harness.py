@@ -0,0 +1,77 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                          app/benchmark/harness.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from multiprocessing.connection import Connection
+from typing                     import Any, Callable, Optional
+import multiprocessing          as mp
+import sys
+
+try:
+    import resource
+except ImportError:     # Windows: no getrusage, peak RSS is not reported
+    resource = None
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process and of its finished children, in MB.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale: float = 1 / 1024**2 if sys.platform == "darwin" else 1 / 1024
+    return max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    ) * scale
+
+
+def _child(conn: Connection, case: Callable[..., float], kwargs: dict[str, Any]) -> None:
+    """
+    Runs one repetition of a case in a fresh process, so the peak RSS belongs to that case only.
+    """
+    try:
+        seconds: float = case(**kwargs)
+        conn.send({"seconds": seconds, "peak_rss_mb": _peak_rss_mb()})
+    except Exception as error:
+        conn.send({"error": f"{type(error).__name__}: {error}"})
+    finally:
+        conn.close()
+
+
+def measure(case: Callable[..., float], kwargs: dict[str, Any], repeat: int) -> dict[str, Any]:
+    """
+    Measures a benchmark case. A case runs its own setup and returns the seconds of the timed section.
+    Args:
+        case (Callable[..., float]): The benchmark case.
+        kwargs (dict[str, Any]): Arguments of the case.
+        repeat (int): Number of repetitions, each in a new process. The best time and the largest peak RSS
+                      are kept.
+    Returns:
+        dict[str, Any]: seconds, peak_rss_mb (None if not available) or error.
+    """
+    best    : float             = float("inf")
+    peak    : Optional[float]   = None
+    for _ in range(repeat):
+        parent_conn, child_conn = mp.Pipe(duplex=False)
+        process: mp.Process = mp.Process(target=_child, args=(child_conn, case, kwargs))
+        process.start()
+        child_conn.close()
+        try:
+            result: dict[str, Any] = parent_conn.recv()
+        except EOFError:
+            result: dict[str, Any] = {"error": f"process exited with code {process.exitcode}"}
+        process.join()
+        
+        if "error" in result:
+            return result
+        best = min(best, result["seconds"])
+        if result["peak_rss_mb"] is not None:
+            peak = max(peak or 0.0, result["peak_rss_mb"])
+    
+    return {"seconds": best, "peak_rss_mb": peak}
@@ -0,0 +1,193 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                            app/benchmark/suite.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from benchmark.cases    import CASES
+from benchmark.harness  import measure
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib            import Path, PosixPath
+from typing             import Any, Optional
+import multiprocessing  as mp
+import subprocess
+import platform
+import datetime
+import json
+import numpy            as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+def _revision() -> Optional[str]:
+    """
+    Git revision of the working tree, None outside of a repository.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def core_counts(max_cores: int) -> list[int]:
+    """
+    1, 2, 4, ... up to max_cores (max_cores itself always included).
+    """
+    counts: list[int] = []
+    n: int = 1
+    while n < max_cores:
+        counts.append(n)
+        n *= 2
+    return counts + [max_cores]
+
+
+class BenchmarkSuite(object):
+    def __init__(self, samples: list[int], simulations: list[int], sample_space: list[int], prob: list[float],
+                 cases: Optional[list[str]] = None, repeat: int = 3, per_step_limit: int = 200,
+                 max_cores: Optional[int] = None) -> None:
+        """
+        Initializes the BenchmarkSuite object.
+        Args:
+            samples (list[int]): Grid of samples.
+            simulations (list[int]): Grid of simulations.
+            sample_space (list[int]): Possible values for each random sample.
+            prob (list[float]): Probability of each value of the sample space.
+            cases (Optional[list[str]]): Names of the cases to run (see benchmark/cases.py). All if None.
+            repeat (int): Repetitions of each measure, the best time is kept.
+            per_step_limit (int): Largest number of simulations of the per-step generator case.
+            max_cores (Optional[int]): Largest number of cores of the multicore case. All cores if None.
+        """
+        self.samples        : list[int]         = samples
+        self.simulations    : list[int]         = simulations
+        self.sample_space   : list[int]         = sample_space
+        self.prob           : list[float]       = prob
+        self.cases          : list[str]         = list(CASES) if cases is None else cases
+        self.repeat         : int               = repeat
+        self.per_step_limit : int               = per_step_limit
+        self.max_cores      : int               = mp.cpu_count() if max_cores is None else max_cores
+        
+        self.results        : list[dict[str, Any]] = []
+    
+    def _variants(self, case: str) -> list[dict[str, Any]]:
+        """
+        Extra arguments of each run of a case.
+        """
+        if case == "multicore_run":
+            return [{"cores": n} for n in core_counts(self.max_cores)]
+        return [{}]
+    
+    def _record(self, case: str, samples: int, simulations: int, extra: dict[str, Any]) -> dict[str, Any]:
+        if case == "generator_run":
+            simulations = min(simulations, self.per_step_limit)
+        kwargs: dict[str, Any] = {
+            "samples": samples, "simulations": simulations, "sample_space": self.sample_space, "prob": self.prob,
+            **extra
+        }
+        result: dict[str, Any] = measure(CASES[case], kwargs, self.repeat)
+        record: dict[str, Any] = {"case": case, "samples": samples, "simulations": simulations, **extra, **result}
+        if "seconds" in result:
+            record["steps_per_sec"] = samples * simulations / result["seconds"] if result["seconds"] > 0 else None
+        return record
+    
+    @staticmethod
+    def _scaling(records: list[dict[str, Any]]) -> None:
+        """
+        Adds the scaling efficiency T(1) / (n * T(n)) to the multicore records of the same grid point.
+        """
+        base: dict[tuple[int, int], float] = {
+            (r["samples"], r["simulations"]): r["seconds"]
+            for r in records if r["case"] == "multicore_run" and r.get("cores") == 1 and "seconds" in r
+        }
+        for r in records:
+            key: tuple[int, int] = (r["samples"], r["simulations"])
+            if r["case"] == "multicore_run" and "seconds" in r and key in base:
+                r["scaling_efficiency"] = base[key] / (r["cores"] * r["seconds"])
+    
+    def run(self, verbose: bool = True) -> list[dict[str, Any]]:
+        """
+        Runs every case over the samples x simulations grid.
+        Args:
+            verbose (bool): Whether each record is printed as soon as it is measured.
+        Returns:
+            list[dict[str, Any]]: One record per measure.
+        """
+        self.results = []
+        for case in self.cases:
+            for samples in self.samples:
+                for simulations in self.simulations:
+                    for extra in self._variants(case):
+                        record: dict[str, Any] = self._record(case, samples, simulations, extra)
+                        self.results.append(record)
+                        if verbose:
+                            print(format_record(record))
+        self._scaling(self.results)
+        return self.results
+    
+    def report(self) -> dict[str, Any]:
+        """
+        Results with the metadata needed to compare revisions.
+        """
+        return {
+            "revision": _revision(), "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "numpy": np.__version__, "cpu_count": mp.cpu_count(),
+            "sample_space": self.sample_space, "prob": self.prob, "repeat": self.repeat, "results": self.results
+        }
+    
+    def save(self, path_: PosixPath) -> None:
+        """
+        Writes the report as JSON.
+        """
+        Path(path_).parent.mkdir(parents=True, exist_ok=True)
+        with open(path_, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def format_record(record: dict[str, Any]) -> str:
+    """
+    One line summary of a record.
+    """
+    name: str = record["case"] + (f"[{record['cores']}]" if "cores" in record else "")
+    head: str = f"{name:<26} t={record['samples']:<7} sim={record['simulations']:<8}"
+    if "error" in record:
+        return f"{head} ERROR {record['error']}"
+    rss: str = f"{record['peak_rss_mb']:8.1f} MB" if record["peak_rss_mb"] is not None else "       - MB"
+    # steps_per_sec is None when the timed section was too short to be measured
+    rate: str = f"{record['steps_per_sec']:14.0f}" if record["steps_per_sec"] is not None else f"{'-':>14}"
+    return f"{head} {record['seconds']:10.4f} s | {rate} steps/s | {rss}"
+
+
+def _key(record: dict[str, Any]) -> tuple:
+    return (record["case"], record["samples"], record["simulations"], record.get("cores"))
+
+
+def compare(old: dict[str, Any], new: dict[str, Any], tolerance: float = 0.1) -> list[str]:
+    """
+    Compares two reports and lists the measures that got slower than old * (1 + tolerance). A measure of the
+    baseline that errors in the new report, or is missing from it, is a regression too.
+    Args:
+        old (dict[str, Any]): Baseline report.
+        new (dict[str, Any]): Report of the revision under test.
+        tolerance (float): Allowed relative slowdown.
+    Returns:
+        list[str]: One line per regression, in baseline order.
+    """
+    current: dict[tuple, dict[str, Any]] = {_key(r): r for r in new["results"]}
+    regressions: list[str] = []
+    for before in old["results"]:
+        if "seconds" not in before:
+            continue
+        record: Optional[dict[str, Any]] = current.get(_key(before))
+        if record is None:
+            regressions.append(f"{format_record(before)} | missing from the new report")
+            continue
+        if "seconds" not in record:
+            regressions.append(f"{format_record(record)} | was measured in {old.get('revision')}")
+            continue
+        ratio: float = record["seconds"] / before["seconds"] if before["seconds"] > 0 else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append(f"{format_record(record)} | {ratio:5.2f}x slower than {old.get('revision')}")
+    return regressions
@@ -0,0 +1,192 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                            app/bin/array_format.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib    import Path, PosixPath
+from typing     import Any, Callable, Optional
+import numpy    as np
+import struct
+import json
+import os
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# Layout of a native array file:
+#   MAGIC | uint32 little-endian header size | JSON header (space padded) | raw little-endian array data
+# The data offset is aligned to ALIGN bytes so it can be memory-mapped directly. Bit-packed step files (see
+# bin/packed_format.py) share the layout with PACKED_MAGIC and their own sections after the header.
+MAGIC           : bytes = b"\x93RWARRAY"
+PACKED_MAGIC    : bytes = b"\x93RWPACKD"
+ALIGN           : int   = 64
+
+
+def file_magic(path_: PosixPath) -> bytes:
+    """
+    First bytes of a binary file: MAGIC, PACKED_MAGIC or anything else for a pickle.
+    """
+    with open(path_, "rb") as f:
+        return f.read(len(MAGIC))
+
+
+def is_array_file(path_: PosixPath) -> bool:
+    """
+    Checks if the file was written in the native array format (and not with pickle).
+    Args:
+        path_ (PosixPath): Path of the binary file.
+    Returns:
+        bool: True if the file starts with the native array magic.
+    """
+    return file_magic(path_) == MAGIC
+
+
+def is_packed_file(path_: PosixPath) -> bool:
+    """
+    Checks if the file was written in the bit-packed step format.
+    """
+    return file_magic(path_) == PACKED_MAGIC
+
+
+def partial_path(path_: PosixPath) -> PosixPath:
+    """
+    Path a file is written to until it is complete, then renamed to path_. It is unique to the writing process
+    and is not listed as a binary file, so a killed writer never leaves a truncated file under the final name.
+    """
+    path_: PosixPath = Path(path_)
+    return path_.with_name(f"{path_.stem}.{os.getpid()}.part")
+
+
+def header_bytes(magic: bytes, header: dict[str, Any]) -> bytes:
+    """
+    Magic, size and JSON header, space padded so the data that follows starts on an ALIGN boundary.
+    Args:
+        magic (bytes): MAGIC or PACKED_MAGIC.
+        header (dict[str, Any]): JSON serializable header.
+    Returns:
+        bytes: The prefix of the file.
+    """
+    encoded     : bytes = json.dumps(header).encode("utf-8")
+    prefix_size : int   = len(magic) + 4
+    encoded    += b" " * (-(prefix_size + len(encoded)) % ALIGN)
+    return magic + struct.pack("<I", len(encoded)) + encoded
+
+
+class ArrayWriter(object):
+    def __init__(self, path_: PosixPath, shape: tuple[int, ...], dtype: np.dtype,
+                 params: Optional[dict[str, Any]] = None, on_close: Optional[Callable[[], None]] = None) -> None:
+        """
+        Writes an array in the native format block by block: the header holds the final shape, then the rows are
+        appended in order. The whole array never has to be in memory. The rows go to partial_path(path_), which
+        is renamed to path_ when the writer is closed, so the file appears complete or not at all.
+        Args:
+            path_ (PosixPath): Path of the binary file.
+            shape (tuple[int, ...]): Shape of the complete array.
+            dtype (np.dtype): dtype of the array.
+            params (Optional[dict[str, Any]]): JSON serializable simulation parameters kept in the header.
+            on_close (Optional[Callable[[], None]]): Called once the file is complete.
+        """
+        self.path_      : PosixPath                     = path_
+        self.partial    : PosixPath                     = partial_path(path_)
+        self.shape      : tuple[int, ...]               = tuple(shape)
+        self.dtype      : np.dtype                      = np.dtype(dtype).newbyteorder("<")
+        self.rows       : int                           = 0
+        self.on_close   : Optional[Callable[[], None]]  = on_close
+        
+        self.file = open(self.partial, "wb")
+        self.file.write(
+            header_bytes(MAGIC, {"dtype": self.dtype.str, "shape": list(self.shape), "params": params or {}})
+        )
+    
+    def write(self, block: np.ndarray, origin: Optional[np.ndarray] = None) -> None:
+        """
+        Appends the next rows of the array.
+        Args:
+            block (np.ndarray): Rows with the trailing shape of the array.
+            origin (Optional[np.ndarray]): Unused, raw files hold the positions themselves (see PackedWriter).
+        """
+        if tuple(block.shape[1:]) != self.shape[1:] or self.rows + block.shape[0] > self.shape[0]:
+            raise ValueError(f"a {block.shape} block does not fit rows {self.rows}.. of a {self.shape} array")
+        np.ascontiguousarray(block, dtype=self.dtype).tofile(self.file)
+        self.rows += block.shape[0]
+    
+    def close(self) -> None:
+        """
+        Closes the file, which must hold every row of the array, and renames it to its final path.
+        """
+        self.file.close()
+        commit_file(self.partial, self.path_, self.rows, self.shape[0])
+        if self.on_close is not None:
+            self.on_close()
+    
+    def abort(self) -> None:
+        """
+        Closes and deletes the incomplete file.
+        """
+        self.file.close()
+        if os.path.exists(self.partial):
+            os.remove(self.partial)
+
+
+def commit_file(partial: PosixPath, path_: PosixPath, rows: int, expected: int) -> None:
+    """
+    Renames a file written aside (see partial_path) to its final path, atomically, once it holds every row of its
+    header. An incomplete file is deleted.
+    Args:
+        partial (PosixPath): Path the file was written to.
+        path_ (PosixPath): Final path of the file.
+        rows (int): Rows written.
+        expected (int): Rows of the header.
+    """
+    if rows != expected:
+        os.remove(partial)
+        raise ValueError(f"{path_} holds {rows} of the {expected} rows of its header")
+    os.replace(partial, path_)
+
+
+def write_array(path_: PosixPath, array: np.ndarray, params: Optional[dict[str, Any]] = None) -> None:
+    """
+    Writes the array in the native format: header with dtype, shape and simulation parameters followed by the raw
+    little-endian data.
+    Args:
+        path_ (PosixPath): Path of the binary file.
+        array (np.ndarray): Array to be stored.
+        params (Optional[dict[str, Any]]): JSON serializable simulation parameters kept in the header.
+    """
+    writer: ArrayWriter = ArrayWriter(path_, array.shape, array.dtype, params)
+    writer.write(array)
+    writer.close()
+
+
+def read_header(path_: PosixPath) -> tuple[dict[str, Any], int]:
+    """
+    Reads the header of a native array file (raw or bit-packed).
+    Args:
+        path_ (PosixPath): Path of the binary file.
+    Returns:
+        tuple[dict[str, Any], int]: The header and the byte offset of the array data.
+    """
+    with open(path_, "rb") as f:
+        if f.read(len(MAGIC)) not in (MAGIC, PACKED_MAGIC):
+            raise ValueError(f"{path_} is not a native array file")
+        size    : int               = struct.unpack("<I", f.read(4))[0]
+        header  : dict[str, Any]    = json.loads(f.read(size).decode("utf-8"))
+    return header, len(MAGIC) + 4 + size
+
+
+def open_memmap(path_: PosixPath) -> np.ndarray:
+    """
+    Memory-maps the array of a native array file (read-only). Nothing is loaded until it is sliced.
+    Args:
+        path_ (PosixPath): Path of the binary file.
+    Returns:
+        np.ndarray: np.memmap over the file (or an empty array if the stored array has no elements).
+    """
+    header, offset = read_header(path_)
+    dtype: np.dtype = np.dtype(header["dtype"])
+    shape: tuple[int, ...] = tuple(header["shape"])
+    
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path_, dtype=dtype, mode="r", offset=offset, shape=shape)
@@ -0,0 +1,67 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                     app/bin/background_writer.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from typing import Any, Callable, Optional
+import threading
+import queue
+import time
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+class BackgroundWriter(object):
+    def __init__(self, depth: int = 2) -> None:
+        """
+        Runs write tasks on a background thread, in submission order, so the caller computes the next block while
+        the previous one is written (NumPy and file writes release the GIL). The queue is bounded: submit() blocks
+        while `depth` tasks are pending, which caps the memory held by blocks waiting to be written. self.waited
+        holds the seconds submit() spent blocked on a full queue: the time the compute waited for the I/O.
+        Args:
+            depth (int): Maximum pending tasks.
+        """
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.queue  : queue.Queue               = queue.Queue(maxsize=depth)
+        self.error  : Optional[BaseException]   = None
+        self.waited : float                     = 0.0
+        self.thread : threading.Thread          = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+    
+    def _loop(self) -> None:
+        while True:
+            task: Optional[tuple[Callable[..., Any], tuple]] = self.queue.get()
+            if task is None:
+                return
+            if self.error is None:
+                try:
+                    task[0](*task[1])
+                except BaseException as error:
+                    # Kept for the caller, the remaining tasks are dropped but still taken off the queue
+                    self.error = error
+    
+    def submit(self, fn: Callable[..., Any], *args: Any) -> None:
+        """
+        Queues fn(*args), waiting for a free slot if the queue is full.
+        Raises:
+            The error of a previous task, if one failed.
+        """
+        if self.error is not None:
+            raise self.error
+        start: float = time.perf_counter()
+        self.queue.put((fn, args))
+        self.waited += time.perf_counter() - start
+    
+    def close(self) -> None:
+        """
+        Waits for every pending task and stops the thread.
+        Raises:
+            The error of a task, if one failed.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
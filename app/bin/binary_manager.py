@@ -7,20 +7,26 @@
 
 # | External Imports |-------------------------------------------------------------------------------------------------|
 from pathlib    import Path, PosixPath
-from typing     import Any
+from typing     import Any, Optional, Union
+import numpy    as np
 import pickle
 import os
 # | Internal Imports |-------------------------------------------------------------------------------------------------|
-from log.genlog import bin_manager_log
+from log.genlog         import bin_manager_log
+from bin.array_format   import (file_magic, write_array, read_header, open_memmap, partial_path, ArrayWriter, MAGIC,
+                                PACKED_MAGIC)
+from bin.packed_format  import PackedCodec, PackedWriter, PackedArray, write_packed
 # |--------------------------------------------------------------------------------------------------------------------|
 
 class BinManager(object):
-    def __init__(self) -> None:
+    def __init__(self, path_: Optional[PosixPath] = None) -> None:
         """
         Initializes the BinManager object.
+        Args:
+            path_ (Optional[PosixPath]): Directory of the binary files. Defaults to app/bin.
         """
         self.ext    : str       = ".bin"
-        self.path_  : PosixPath = Path("app", "bin")
+        self.path_  : PosixPath = Path("app", "bin") if path_ is None else Path(path_)
     
     def _path_conversor(self, name: str) -> PosixPath:
         """
@@ -39,12 +45,12 @@ class BinManager(object):
             list[str]: List of binary file names.
         """
         bin_files: list[str] = []
-
+        
         for f in os.listdir(self.path_):
             f_split: list[str] = f.split(".")
             if len(f_split) >= 2:
                 bin_files.append(f_split[0]) if f_split[1] == self.ext[1::] else None
-                    
+        
         return bin_files
     
     def bin_exists(self, name: str) -> bool:
@@ -58,6 +64,16 @@ class BinManager(object):
         """
         return os.path.exists(self._path_conversor(name))
     
+    def bin_size(self, name: str) -> int:
+        """
+        Size in bytes of the binary file with the given name.
+        Args:
+            name (str): The name of the binary file.
+        Returns:
+            int: The size of the file.
+        """
+        return os.path.getsize(self._path_conversor(name))
+    
     def delete(self, name: str) -> None:
         """
         Deletes the binary file with the given name.
@@ -67,35 +83,110 @@ class BinManager(object):
         path_: PosixPath = self._path_conversor(name)
         os.remove(path_)
         bin_manager_log(path_, "delete")
-        
-    def post(self, name: str, obj: Any) -> None:
+    
+    def clear_partials(self) -> None:
+        """
+        Deletes the files left half written by killed writers (see array_format.partial_path), also in the
+        subdirectories (level-of-detail summaries, see bin/lod_store.py).
+        """
+        for root, _, files in os.walk(self.path_):
+            for f in files:
+                if f.endswith(".part"):
+                    os.remove(Path(root, f))
+    
+    def post(self, name: str, obj: Any, params: Optional[dict[str, Any]] = None, codec: Optional[PackedCodec] = None,
+             origin: Optional[np.ndarray] = None) -> None:
         """
-        Stores the object in a binary file with the given name.
+        Stores the object in a binary file with the given name. NumPy arrays are written in the native array
+        format (see bin/array_format.py), or bit-packed with a codec (see bin/packed_format.py), any other object
+        is pickled.
         Args:
             name (str): The name of the binary file.
             obj (Any): The object to store.
+            params (Optional[dict[str, Any]]): Simulation parameters kept in the header of an array file.
+            codec (Optional[PackedCodec]): Stores the walks of an array as bit-packed steps.
+            origin (Optional[np.ndarray]): Positions before the first column of bit-packed walks (0 if None).
         """
         if self.bin_exists(name):
             self.delete(name)
         
         path_: PosixPath = self._path_conversor(name)
         
-        with open(path_, "wb") as f:
-            pickle.dump(obj, f)
-            f.close()
+        if isinstance(obj, np.ndarray) and codec is not None:
+            write_packed(path_, obj, codec, params, origin)
+        elif isinstance(obj, np.ndarray):
+            write_array(path_, obj, params)
+        else:
+            with open(partial_path(path_), "wb") as f:
+                pickle.dump(obj, f)
+            os.replace(partial_path(path_), path_)
         bin_manager_log(path_, "post")
     
+    def post_bytes(self, name: str, content: bytes) -> None:
+        """
+        Stores a binary file received as is, e.g. a shard written on another node. The file is written aside
+        and renamed, like the shards written here.
+        Args:
+            name (str): The name of the binary file, may be in a subdirectory ("lod/w0000064/Shard000001").
+            content (bytes): The whole file.
+        """
+        path_: PosixPath = self._path_conversor(name)
+        path_.parent.mkdir(parents=True, exist_ok=True)
+        with open(partial_path(path_), "wb") as f:
+            f.write(content)
+        os.replace(partial_path(path_), path_)
+        bin_manager_log(path_, "post")
+    
+    def post_stream(self, name: str, shape: tuple[int, ...], dtype: np.dtype, params: Optional[dict[str, Any]] = None,
+                    codec: Optional[PackedCodec] = None) -> Union[ArrayWriter, PackedWriter]:
+        """
+        Opens the binary file with the given name to be written row block by row block (see ArrayWriter). The
+        file is logged as posted when the writer is closed.
+        Args:
+            name (str): The name of the binary file.
+            shape (tuple[int, ...]): Shape of the complete array.
+            dtype (np.dtype): dtype of the array.
+            params (Optional[dict[str, Any]]): Simulation parameters kept in the header.
+            codec (Optional[PackedCodec]): Stores the walks as bit-packed steps (see PackedWriter).
+        Returns:
+            Union[ArrayWriter, PackedWriter]: The writer, to be closed once every row is written.
+        """
+        if self.bin_exists(name):
+            self.delete(name)
+        path_: PosixPath = self._path_conversor(name)
+        if codec is not None:
+            return PackedWriter(path_, shape, dtype, codec, params, on_close=lambda: bin_manager_log(path_, "post"))
+        return ArrayWriter(path_, shape, dtype, params, on_close=lambda: bin_manager_log(path_, "post"))
+    
     def get(self, name: str) -> Any:
         """
         Retrieves the object stored in the binary file with the given name.
         Args:
             name (str): The name of the binary file.
         Returns:
-            Any: The object stored in the binary file.
+            Any: np.memmap for native array files, a PackedArray (decoded on indexing) for bit-packed files, the
+                 unpickled object otherwise.
         """
         path_: PosixPath = self._path_conversor(name)
-        with open(path_, "rb") as f:
-            file: Any = pickle.load(f)
+        magic: bytes = file_magic(path_)
+        if magic == MAGIC:
+            file: Any = open_memmap(path_)
+        elif magic == PACKED_MAGIC:
+            file: Any = PackedArray(path_)
+        else:
+            with open(path_, "rb") as f:
+                file: Any = pickle.load(f)
         
         bin_manager_log(path_, "get")
         return file
+    
+    def get_header(self, name: str) -> Optional[dict[str, Any]]:
+        """
+        Retrieves the header (dtype, shape and simulation parameters) of a native array file, raw or bit-packed.
+        Args:
+            name (str): The name of the binary file.
+        Returns:
+            Optional[dict[str, Any]]: The header, or None if the file is a pickle.
+        """
+        path_: PosixPath = self._path_conversor(name)
+        return read_header(path_)[0] if file_magic(path_) in (MAGIC, PACKED_MAGIC) else None
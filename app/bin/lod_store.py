@@ -0,0 +1,305 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                               app/bin/lod_store.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from bin.binary_manager import BinManager
+from data.concatenate_bin_simulations import concat_simulations
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib    import Path, PosixPath
+from typing     import Any, Iterator, Optional
+import numpy    as np
+import os
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# Level-of-detail summaries of the walks, for the plots of long horizons. The columns are split in buckets of
+# `width` time steps and every walk keeps, per bucket, the CHANNELS below (in summary_dtype of the walks, so min,
+# max and last are exact). The widths are powers of
+# LOD_FACTOR, so the buckets of a level are whole groups of the buckets of the finer one, and only the levels
+# with LOD_MIN_BUCKETS..LOD_MAX_BUCKETS buckets are kept: runs of LOD_MAX_BUCKETS steps or less have none, the
+# plots draw them as they are.
+# On disk, next to the shards of a run: lod/w0001024/Shard000042.bin holds the (count, buckets, 4) summary of
+# the walks of unit 42 at width 1024, so concat_simulations() reads a level as one memory-mapped dataset.
+CHANNELS        : tuple[str, ...]   = ("min", "max", "mean", "last")
+LOD_FACTOR      : int               = 4
+LOD_MAX_BUCKETS : int               = 4096
+LOD_MIN_BUCKETS : int               = 64
+
+
+def lod_widths(samples: int) -> list[int]:
+    """
+    Bucket widths of the levels of a run, finest first.
+    Args:
+        samples (int): Time steps of the walks.
+    Returns:
+        list[int]: The widths, empty if the walks are short enough to be drawn as they are.
+    """
+    widths: list[int] = []
+    width: int = LOD_FACTOR
+    while -(-samples // width) >= LOD_MIN_BUCKETS:
+        if -(-samples // width) <= LOD_MAX_BUCKETS:
+            widths.append(width)
+        width *= LOD_FACTOR
+    return widths if samples > LOD_MAX_BUCKETS else []
+
+
+def summary_dtype(dtype: np.dtype) -> np.dtype:
+    """
+    dtype of the summaries of walks of `dtype`: float32 if it holds every value of the walks exactly (up to 16-bit
+    integers and float32 walks), float64 otherwise (int32 walks may go beyond 2**24, where float32 rounds).
+    """
+    dtype = np.dtype(dtype)
+    if (dtype.kind in "iub" and dtype.itemsize <= 2) or (dtype.kind == "f" and dtype.itemsize <= 4):
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def lod_path(path_: PosixPath, width: int) -> PosixPath:
+    """
+    Directory of the summaries of one level of the run stored in path_.
+    """
+    return Path(path_, "lod", f"w{width:07d}")
+
+
+def bucket_summary(block: np.ndarray, widths: list[int]) -> list[np.ndarray]:
+    """
+    Summaries of a block of walks at every level. The finest level is reduced from the walks, each coarser one
+    from the previous level, so the walks are read once.
+    Args:
+        block (np.ndarray): (rows, samples) walks.
+        widths (list[int]): Bucket widths, finest first, each a multiple of the previous one (see lod_widths).
+    Returns:
+        list[np.ndarray]: The (rows, buckets, 4) summary of every level (see CHANNELS and summary_dtype).
+    """
+    samples : int           = block.shape[1]
+    starts  : np.ndarray    = np.arange(0, samples, widths[0])
+    mins    : np.ndarray    = np.minimum.reduceat(block, starts, axis=1)
+    maxs    : np.ndarray    = np.maximum.reduceat(block, starts, axis=1)
+    sums    : np.ndarray    = np.add.reduceat(block, starts, axis=1, dtype=np.float64)
+    counts  : np.ndarray    = np.diff(np.r_[starts, samples])
+    last    : np.ndarray    = block[:, np.r_[starts[1:], samples] - 1]
+    
+    levels: list[np.ndarray] = []
+    for width in widths:
+        if width != widths[0]:
+            groups: np.ndarray = np.arange(0, mins.shape[1], LOD_FACTOR)
+            mins    = np.minimum.reduceat(mins, groups, axis=1)
+            maxs    = np.maximum.reduceat(maxs, groups, axis=1)
+            sums    = np.add.reduceat(sums, groups, axis=1)
+            counts  = np.add.reduceat(counts, groups)
+            last    = last[:, np.r_[groups[1:], last.shape[1]] - 1]
+        levels.append(np.stack([mins, maxs, sums / counts, last], axis=-1).astype(summary_dtype(block.dtype)))
+    return levels
+
+
+def post_lod(path_: PosixPath, name: str, block: np.ndarray, params: Optional[dict[str, Any]] = None) -> None:
+    """
+    Stores the summaries of the walks of one shard next to it (nothing for short walks).
+    Args:
+        path_ (PosixPath): Directory of the run.
+        name (str): Name of the shard.
+        block (np.ndarray): (rows, samples) walks of the shard.
+        params (Optional[dict[str, Any]]): Simulation parameters kept in the headers.
+    """
+    widths: list[int] = lod_widths(block.shape[1])
+    for width, level in zip(widths, bucket_summary(block, widths) if widths else []):
+        lod_path(path_, width).mkdir(parents=True, exist_ok=True)
+        BinManager(lod_path(path_, width)).post(name, level, lod_params(params, block.shape[1], width, block.dtype))
+
+
+def lod_params(params: Optional[dict[str, Any]], samples: int, width: int, dtype: np.dtype) -> dict[str, Any]:
+    """
+    Header of a summary file: the simulation parameters plus the level and the dtype of the walks.
+    """
+    return {**(params or {}), "lod_samples": samples, "lod_width": width, "lod_dtype": np.dtype(dtype).str}
+
+
+class LevelOfDetail(object):
+    def __init__(self, samples: int, dtype: np.dtype, levels: dict[int, Any]) -> None:
+        """
+        Multi-resolution view of a set of walks: the plots ask for the level matching their width in pixels and
+        read its summaries instead of the walks (a few thousand buckets instead of 10^6 time steps).
+        Args:
+            samples (int): Time steps of the walks.
+            dtype (np.dtype): dtype of the walks (the min, max and last channels are exact in it).
+            levels (dict[int, Any]): (simulations, buckets, 4) summaries by bucket width, ndarray or memory-mapped
+                                     ShardedArray.
+        """
+        self.samples    : int               = samples
+        self.dtype      : np.dtype          = np.dtype(dtype)
+        self.levels     : dict[int, Any]    = levels
+        self._envelopes : dict[int, dict[str, np.ndarray]] = {}
+    
+    @classmethod
+    def open(cls, path_: PosixPath, simulations: Optional[int] = None) -> Optional["LevelOfDetail"]:
+        """
+        Memory-maps the summaries stored next to the shards of a run.
+        Args:
+            path_ (PosixPath): Directory of the run.
+            simulations (Optional[int]): Expected walks, a level with another count is not used.
+        Returns:
+            Optional[LevelOfDetail]: The levels, None if the run has none.
+        """
+        root: PosixPath = Path(path_, "lod")
+        if not os.path.isdir(root):
+            return None
+        levels: dict[int, Any] = {}
+        header: Optional[dict[str, Any]] = None
+        for directory in sorted(root.iterdir()):
+            names: list[str] = sorted(BinManager(directory).bin_files_list()) if directory.is_dir() else []
+            if len(names) == 0:
+                continue
+            data: Any = concat_simulations(path_=directory)
+            if simulations is None or len(data) == simulations:
+                header = BinManager(directory).get_header(names[0])["params"]
+                levels[header["lod_width"]] = data
+        if header is None:
+            return None
+        return cls(header["lod_samples"], np.dtype(header["lod_dtype"]), levels)
+    
+    @classmethod
+    def build(cls, data: Any, block: int = 10000) -> Optional["LevelOfDetail"]:
+        """
+        Summarizes walks that were stored without their levels (in-memory runs, runs extended in time), in one
+        pass of `block` rows at a time.
+        Args:
+            data (Any): (simulations, samples) walks, ndarray, memmap or ShardedArray.
+            block (int): Rows read at a time.
+        Returns:
+            Optional[LevelOfDetail]: The levels in memory, None if the walks are short enough.
+        """
+        widths: list[int] = lod_widths(data.shape[1])
+        if len(widths) == 0:
+            return None
+        levels: dict[int, np.ndarray] = {
+            width: np.empty(
+                (data.shape[0], -(-data.shape[1] // width), len(CHANNELS)), dtype=summary_dtype(data.dtype)
+            )
+            for width in widths
+        }
+        for start in range(0, data.shape[0], block):
+            for width, level in zip(widths, bucket_summary(np.asarray(data[start:start + block]), widths)):
+                levels[width][start:start + level.shape[0]] = level
+        return cls(data.shape[1], data.dtype, levels)
+    
+    @property
+    def widths(self) -> list[int]:
+        """
+        Bucket widths of the available levels, finest first.
+        """
+        return sorted(self.levels)
+    
+    def __len__(self) -> int:
+        return len(self.levels[self.widths[0]])
+    
+    def level(self, pixels: int) -> int:
+        """
+        Coarsest level with at least one bucket per pixel, the finest one if none has that many.
+        Args:
+            pixels (int): Width of the plot in pixels.
+        Returns:
+            int: The bucket width of the level.
+        """
+        enough: list[int] = [width for width in self.widths if -(-self.samples // width) >= pixels]
+        return max(enough) if enough else self.widths[0]
+    
+    def columns(self, width: int) -> np.ndarray:
+        """
+        Last time step of every bucket: the columns of the walks held by the "last" channel.
+        """
+        return np.r_[np.arange(width, self.samples, width), self.samples] - 1
+    
+    def centers(self, width: int) -> np.ndarray:
+        """
+        Middle of every bucket, in time steps.
+        """
+        starts: np.ndarray = np.arange(0, self.samples, width)
+        return (starts + np.r_[starts[1:], self.samples] - 1) / 2
+    
+    def strided(self, width: int, rows: Any = slice(None)) -> np.ndarray:
+        """
+        The walks subsampled at the last step of every bucket (exact values).
+        Args:
+            width (int): Bucket width of the level.
+            rows (Any): Rows to read.
+        Returns:
+            np.ndarray: (rows, buckets) positions in the dtype of the walks.
+        """
+        return np.asarray(self.levels[width][rows])[..., CHANNELS.index("last")].astype(self.dtype)
+    
+    def subsample(self, width: int) -> "StridedLevel":
+        """
+        The walks subsampled at one level as a (simulations, buckets) dataset read `rows` at a time, e.g. by
+        graph/trajectories.trajectory_histogram.
+        """
+        return StridedLevel(self, width)
+    
+    def lines(self, width: int, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Polylines of some walks going through the min and the max of every bucket, which draw the same pixels as
+        the walks at this level.
+        Args:
+            width (int): Bucket width of the level.
+            rows (np.ndarray): Rows to draw.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: x and y of shape (rows, 2 * buckets).
+        """
+        summary: np.ndarray = np.asarray(self.levels[width][rows])
+        y: np.ndarray = np.empty(summary.shape[:2] + (2,), dtype=summary.dtype)
+        y[..., 0] = summary[..., CHANNELS.index("min")]
+        y[..., 1] = summary[..., CHANNELS.index("max")]
+        x: np.ndarray = np.repeat(self.centers(width), 2)
+        return np.broadcast_to(x, (y.shape[0], x.size)), y.reshape(y.shape[0], -1)
+    
+    def _blocks(self, width: int, block: int) -> Iterator[np.ndarray]:
+        for start in range(0, len(self), block):
+            yield np.asarray(self.levels[width][start:start + block])
+    
+    def envelope(self, width: int, block: int = 10000) -> dict[str, np.ndarray]:
+        """
+        Envelopes of every walk per bucket: min, max and mean over the walks and the steps of the bucket.
+        Args:
+            width (int): Bucket width of the level.
+            block (int): Rows read at a time.
+        Returns:
+            dict[str, np.ndarray]: "min", "max" and "mean" of every bucket.
+        """
+        if width not in self._envelopes:
+            buckets : int           = -(-self.samples // width)
+            low     : np.ndarray    = np.full(buckets, np.inf)
+            high    : np.ndarray    = np.full(buckets, -np.inf)
+            total   : np.ndarray    = np.zeros(buckets)
+            for summary in self._blocks(width, block):
+                low     = np.minimum(low, summary[..., CHANNELS.index("min")].min(axis=0))
+                high    = np.maximum(high, summary[..., CHANNELS.index("max")].max(axis=0))
+                total   += summary[..., CHANNELS.index("mean")].sum(axis=0, dtype=np.float64)
+            self._envelopes[width] = {"min": low, "max": high, "mean": total / len(self)}
+        return self._envelopes[width]
+    
+    def endpoints(self, block: int = 10000) -> Iterator[np.ndarray]:
+        """
+        Final positions of the walks (exact), `block` rows at a time.
+        """
+        for summary in self._blocks(self.widths[-1], block):
+            yield summary[:, -1, CHANNELS.index("last")].astype(self.dtype)
+
+
+class StridedLevel(object):
+    def __init__(self, lod: LevelOfDetail, width: int) -> None:
+        """
+        Row-indexable view of LevelOfDetail.strided(width): only the rows read are loaded.
+        """
+        self.lod    : LevelOfDetail         = lod
+        self.width  : int                   = width
+        self.dtype  : np.dtype              = lod.dtype
+        self.shape  : tuple[int, int]       = (len(lod), -(-lod.samples // width))
+    
+    def __len__(self) -> int:
+        return self.shape[0]
+    
+    def __getitem__(self, rows: Any) -> np.ndarray:
+        return self.lod.strided(self.width, rows)
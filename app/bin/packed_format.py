@@ -0,0 +1,362 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                           app/bin/packed_format.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib    import PosixPath
+from typing     import Any, Callable, Iterator, Optional, Union
+import numpy    as np
+import math
+import os
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from bin.array_format import PACKED_MAGIC, ALIGN, header_bytes, read_header, partial_path, commit_file
+from generator.dtypes import is_integer_space
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# Layout of a bit-packed step file:
+#   PACKED_MAGIC | uint32 header size | JSON header | packed steps | index
+# Every walk is stored as the indices of its steps in the sample space, ceil(log2 |E|) bits each (1 bit for
+# [-1, 1]), in a row of row_bytes bytes, so row i starts at a fixed offset. The index of a cumulative file holds the
+# position of every walk before each block of `checkpoint` steps: a time window is decoded from the closest
+# checkpoint, without the steps before it. Both sections start on an ALIGN boundary.
+
+
+def index_start(rows: int, row_bytes: int) -> int:
+    """
+    Offset of the index from the packed steps: after every row, on an ALIGN boundary.
+    """
+    return rows * row_bytes + (-(rows * row_bytes) % ALIGN)
+
+
+class PackedCodec(object):
+    def __init__(self, sample_space: list[Union[float, int, list[Union[float, int]]]], cumulative: bool,
+                 checkpoint: int = 256) -> None:
+        """
+        Codec of walks made of the steps of a sample space (scalars or step vectors).
+        Args:
+            sample_space (list[Union[float, int, list[Union[float, int]]]]): Possible values for each step.
+            cumulative (bool): Whether the arrays hold positions (rebuilt from the steps on read) or steps.
+                               Positions need an integer sample space: real-valued positions rebuilt as a
+                               checkpoint plus a cumsum of steps round differently from the stored walk.
+            checkpoint (int): Steps between two positions of the index.
+        """
+        self.sample_space   : list[Any]     = np.asarray(sample_space).tolist()
+        self.space          : np.ndarray    = np.asarray(sample_space)
+        self.cumulative     : bool          = cumulative
+        self.checkpoint     : int           = checkpoint
+        self.bits           : int           = max(1, math.ceil(math.log2(max(len(self.space), 1))))
+        if self.bits > 16:
+            raise ValueError("the packed codec stores at most 2**16 distinct steps")
+        if checkpoint < 1:
+            raise ValueError("checkpoint must be at least 1")
+        if cumulative == True and is_integer_space(self.space.ravel()) == False:
+            raise ValueError("packed positions are only bit-identical for integer sample spaces, use codec='raw'")
+    
+    def to_dict(self) -> dict[str, Any]:
+        return {"sample_space": self.sample_space, "cumulative": self.cumulative, "checkpoint": self.checkpoint}
+    
+    @classmethod
+    def from_dict(cls, params: dict[str, Any]) -> "PackedCodec":
+        return cls(params["sample_space"], params["cumulative"], params["checkpoint"])
+    
+    def row_bytes(self, samples: int) -> int:
+        return (samples * self.bits + 7) // 8
+    
+    def checkpoints(self, samples: int) -> int:
+        """
+        Positions of the index per walk (0 for step files).
+        """
+        return (samples + self.checkpoint - 1) // self.checkpoint if self.cumulative == True else 0
+    
+    def symbols(self, steps: np.ndarray) -> np.ndarray:
+        """
+        Index in the sample space of every step of a (rows, samples[, dim]) block.
+        """
+        space   : np.ndarray = self.space.reshape(len(self.space), -1)
+        values  : np.ndarray = steps.reshape(steps.shape[:2] + (-1,))
+        symbols : np.ndarray = np.zeros(steps.shape[:2], dtype=np.uint8 if self.bits <= 8 else np.uint16)
+        if values.dtype.kind in "iub" and space.dtype.kind in "iub":
+            # Every step (vector) gets a mixed radix key over the box of the sample space, mapped to its symbol by
+            # a lookup table: one pass over the steps whatever the size of the sample space
+            low     : np.ndarray = space.min(axis=0)
+            span    : np.ndarray = space.max(axis=0) - low + 1
+            radix   : np.ndarray = np.concatenate([np.cumprod(span[::-1])[::-1][1:], [1]]).astype(np.int64)
+            table   : np.ndarray = np.full(int(np.prod(span)), -1, dtype=np.int32)
+            table[(space - low) @ radix] = np.arange(len(space))
+            
+            inside: np.ndarray = ((values >= low) & (values < low + span)).all(axis=-1)
+            if values.shape[-1] == 1:
+                keys: np.ndarray = values[..., 0].astype(np.int64) - low[0]
+            else:
+                keys: np.ndarray = (values.astype(np.int64) - low) @ radix
+            found: np.ndarray = table[np.where(inside, keys, 0)]
+            exact: bool = bool(inside.all() and (found >= 0).all())
+            symbols[...] = found
+        else:
+            # Positions of non-integer walks carry rounding: each step is matched to the nearest value
+            best: np.ndarray = np.full(steps.shape[:2], np.inf)
+            for n, value in enumerate(space.astype(np.float64)):
+                distance: np.ndarray = np.abs(values - value).max(axis=-1)
+                closer: np.ndarray = distance < best
+                symbols[closer], best[closer] = n, distance[closer]
+            exact: bool = bool(np.all(best <= 1e-6 * max(float(np.abs(space).max()), 1.0)))
+        if exact == False:
+            raise ValueError("the block holds steps outside the sample space, it cannot be bit-packed")
+        return symbols
+    
+    def encode(self, block: np.ndarray,
+               origin: Optional[np.ndarray] = None) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Packs a (rows, samples[, dim]) block of positions (or steps).
+        Args:
+            block (np.ndarray): The walks.
+            origin (Optional[np.ndarray]): Position of each walk before its first step (0 if None), for the column
+                                           segments of a run extended in time.
+        Returns:
+            tuple[np.ndarray, Optional[np.ndarray]]: The (rows, row_bytes) packed steps and the (rows, checkpoints
+                                                     [, dim]) index (None for step files).
+        """
+        block: np.ndarray = np.asarray(block)
+        index: Optional[np.ndarray] = None
+        if self.cumulative == True:
+            start: np.ndarray = np.zeros((block.shape[0],) + block.shape[2:], dtype=block.dtype)
+            if origin is not None:
+                start[...] = origin
+            steps: np.ndarray = np.diff(block, axis=1, prepend=start[:, None])
+            # Position before the steps 0, checkpoint, 2*checkpoint, ...
+            index = np.concatenate(
+                [start[:, None], block[:, self.checkpoint - 1:block.shape[1] - 1:self.checkpoint]], axis=1
+            )
+        else:
+            steps: np.ndarray = block
+        
+        symbols: np.ndarray = self.symbols(steps)
+        if self.bits == 8:
+            return symbols, index
+        if self.bits == 1:
+            return np.packbits(symbols, axis=1), index
+        if 8 % self.bits == 0:
+            # 2 or 4 bits: whole symbols per byte, the first one in the high bits
+            per: int = 8 // self.bits
+            padded: np.ndarray = np.zeros((symbols.shape[0], -(-symbols.shape[1] // per) * per), dtype=np.uint8)
+            padded[:, :symbols.shape[1]] = symbols
+            shifts: np.ndarray = np.arange(8 - self.bits, -1, -self.bits, dtype=np.uint8)
+            grouped: np.ndarray = padded.reshape(symbols.shape[0], -1, per) << shifts
+            return np.bitwise_or.reduce(grouped, axis=-1).astype(np.uint8), index
+        planes: np.ndarray = (symbols[..., None] >> np.arange(self.bits - 1, -1, -1)) & 1
+        return np.packbits(planes.astype(np.uint8).reshape(symbols.shape[0], -1), axis=1), index
+    
+    def decode_symbols(self, rows: np.ndarray, first: int, stop: int) -> np.ndarray:
+        """
+        Symbols of the steps [first, stop) of packed rows.
+        Args:
+            rows (np.ndarray): (rows, row_bytes) packed steps.
+            first (int): First step.
+            stop (int): Last step + 1.
+        Returns:
+            np.ndarray: (rows, stop - first) symbols.
+        """
+        lo, hi = first * self.bits, stop * self.bits
+        raw: np.ndarray = np.asarray(rows[:, lo // 8:(hi + 7) // 8])
+        if self.bits == 8:
+            return raw
+        if self.bits in (2, 4):
+            shifts: np.ndarray = np.arange(8 - self.bits, -1, -self.bits, dtype=np.uint8)
+            symbols: np.ndarray = ((raw[..., None] >> shifts) & ((1 << self.bits) - 1)).reshape(raw.shape[0], -1)
+            return symbols[:, (lo % 8) // self.bits:(lo % 8) // self.bits + stop - first]
+        bits: np.ndarray = np.unpackbits(raw, axis=1)[:, lo % 8:lo % 8 + hi - lo]
+        if self.bits == 1:
+            return bits
+        weights: np.ndarray = 1 << np.arange(self.bits - 1, -1, -1, dtype=np.uint16)
+        return bits.reshape(bits.shape[0], -1, self.bits) @ weights
+
+
+class PackedWriter(object):
+    def __init__(self, path_: PosixPath, shape: tuple[int, ...], dtype: np.dtype, codec: PackedCodec,
+                 params: Optional[dict[str, Any]] = None, on_close: Optional[Callable[[], None]] = None) -> None:
+        """
+        Writes a bit-packed step file block by block, like ArrayWriter: the rows are packed as they come and the
+        packed steps and the index are written at their fixed offsets of partial_path(path_), renamed to path_
+        when the writer is closed.
+        Args:
+            path_ (PosixPath): Path of the binary file.
+            shape (tuple[int, ...]): Shape of the complete array of positions (or steps).
+            dtype (np.dtype): dtype of the decoded array.
+            codec (PackedCodec): Sample space of the steps.
+            params (Optional[dict[str, Any]]): JSON serializable simulation parameters kept in the header.
+            on_close (Optional[Callable[[], None]]): Called once the file is complete.
+        """
+        self.path_      : PosixPath                     = path_
+        self.partial    : PosixPath                     = partial_path(path_)
+        self.shape      : tuple[int, ...]               = tuple(shape)
+        self.dtype      : np.dtype                      = np.dtype(dtype).newbyteorder("<")
+        self.codec      : PackedCodec                   = codec
+        self.rows       : int                           = 0
+        self.on_close   : Optional[Callable[[], None]]  = on_close
+        
+        self.row_bytes      : int = codec.row_bytes(self.shape[1])
+        self.index_shape    : tuple[int, ...] = (self.shape[0], codec.checkpoints(self.shape[1])) + self.shape[2:]
+        self.index_row_bytes: int = int(np.prod(self.index_shape[1:])) * self.dtype.itemsize
+        
+        prefix: bytes = header_bytes(PACKED_MAGIC, {
+            "dtype": self.dtype.str, "shape": list(self.shape), "params": params or {}, "codec": codec.to_dict(),
+            "row_bytes": self.row_bytes
+        })
+        self.data_offset    : int = len(prefix)
+        self.index_offset   : int = self.data_offset + index_start(self.shape[0], self.row_bytes)
+        
+        self.file = open(self.partial, "wb")
+        self.file.write(prefix)
+    
+    def write(self, block: np.ndarray, origin: Optional[np.ndarray] = None) -> None:
+        """
+        Packs and writes the next rows.
+        Args:
+            block (np.ndarray): Rows of positions (or steps) with the trailing shape of the array.
+            origin (Optional[np.ndarray]): Position of each walk before its first step (see PackedCodec.encode).
+        """
+        if tuple(block.shape[1:]) != self.shape[1:] or self.rows + block.shape[0] > self.shape[0]:
+            raise ValueError(f"a {block.shape} block does not fit rows {self.rows}.. of a {self.shape} array")
+        packed, index = self.codec.encode(block, origin)
+        self.file.seek(self.data_offset + self.rows * self.row_bytes)
+        self.file.write(np.ascontiguousarray(packed).tobytes())
+        if index is not None:
+            self.file.seek(self.index_offset + self.rows * self.index_row_bytes)
+            self.file.write(np.ascontiguousarray(index, dtype=self.dtype).tobytes())
+        self.rows += block.shape[0]
+    
+    def close(self) -> None:
+        """
+        Closes the file, which must hold every row of the array, and renames it to its final path.
+        """
+        self.file.seek(self.index_offset + self.shape[0] * self.index_row_bytes)
+        self.file.truncate()
+        self.file.close()
+        commit_file(self.partial, self.path_, self.rows, self.shape[0])
+        if self.on_close is not None:
+            self.on_close()
+    
+    def abort(self) -> None:
+        """
+        Closes and deletes the incomplete file.
+        """
+        self.file.close()
+        if os.path.exists(self.partial):
+            os.remove(self.partial)
+
+
+def write_packed(path_: PosixPath, array: np.ndarray, codec: PackedCodec, params: Optional[dict[str, Any]] = None,
+                 origin: Optional[np.ndarray] = None) -> None:
+    """
+    Writes a whole array of walks as a bit-packed step file (see PackedWriter).
+    """
+    writer: PackedWriter = PackedWriter(path_, array.shape, array.dtype, codec, params)
+    writer.write(array, origin)
+    writer.close()
+
+
+class PackedArray(object):
+    def __init__(self, path_: PosixPath) -> None:
+        """
+        Read-only array view over a bit-packed step file. The packed steps and the index are memory-mapped and
+        decoded on indexing: a walk or a time window only reads its own bytes (from the checkpoint before the
+        window), and the positions are rebuilt with a cumulative sum.
+        Args:
+            path_ (PosixPath): Path of the binary file.
+        """
+        header, offset = read_header(path_)
+        self.path_      : PosixPath         = path_
+        self.header     : dict[str, Any]    = header
+        self.shape      : tuple[int, ...]   = tuple(header["shape"])
+        self.dtype      : np.dtype          = np.dtype(header["dtype"])
+        self.codec      : PackedCodec       = PackedCodec.from_dict(header["codec"])
+        self.space      : np.ndarray        = np.asarray(self.codec.sample_space).astype(self.dtype)
+        
+        rows: int = self.shape[0]
+        index_shape: tuple[int, ...] = (rows, self.codec.checkpoints(self.shape[1])) + self.shape[2:]
+        if rows * header["row_bytes"] == 0:
+            self.packed: np.ndarray = np.zeros((rows, header["row_bytes"]), dtype=np.uint8)
+            self.index: np.ndarray = np.zeros(index_shape, dtype=self.dtype)
+            return
+        self.packed: np.ndarray = np.memmap(
+            path_, dtype=np.uint8, mode="r", offset=offset, shape=(rows, header["row_bytes"])
+        )
+        self.index: np.ndarray = (
+            np.memmap(
+                path_, dtype=self.dtype, mode="r", offset=offset + index_start(rows, header["row_bytes"]),
+                shape=index_shape
+            )
+            if self.codec.cumulative == True else np.zeros(index_shape, dtype=self.dtype)
+        )
+    
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+    
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+    
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes of the decoded array (the file holds packed_nbytes).
+        """
+        return self.size * self.dtype.itemsize
+    
+    @property
+    def packed_nbytes(self) -> int:
+        return self.packed.nbytes + self.index.nbytes
+    
+    def __len__(self) -> int:
+        return self.shape[0]
+    
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for row in range(self.shape[0]):
+            yield self[row]
+    
+    def __array__(self, dtype: Optional[np.dtype] = None, copy: Optional[bool] = None) -> np.ndarray:
+        data: np.ndarray = self._decode(slice(None), 0, self.shape[1])
+        return data if dtype is None else data.astype(dtype, copy=False)
+    
+    def _decode(self, rows: Union[slice, np.ndarray], first: int, stop: int) -> np.ndarray:
+        """
+        Columns [first, stop) of the selected rows.
+        """
+        if self.codec.cumulative == False:
+            return self.space[self.codec.decode_symbols(self.packed[rows], first, stop)]
+        k: int = first // self.codec.checkpoint
+        start: int = k * self.codec.checkpoint
+        steps: np.ndarray = self.space[self.codec.decode_symbols(self.packed[rows], start, stop)]
+        positions: np.ndarray = np.cumsum(steps, axis=1, dtype=self.dtype)
+        positions += np.asarray(self.index[rows, k])[:, None]
+        return positions[:, first - start:]
+    
+    def __getitem__(self, key: Any) -> np.ndarray:
+        key     : tuple = key if isinstance(key, tuple) else (key,)
+        rows    : Any   = key[0] if len(key) > 0 else slice(None)
+        cols    : Any   = key[1] if len(key) > 1 else slice(None)
+        rest    : tuple = key[2:]
+        
+        # Rows and columns are selected independently (outer indexing), as in ColumnStackedArray
+        row_index: np.ndarray = np.arange(self.shape[0])[rows]
+        col_index: np.ndarray = np.arange(self.shape[1])[cols]
+        flat_rows: Union[slice, np.ndarray] = (
+            rows if isinstance(rows, slice) and rows.step in (None, 1) else np.atleast_1d(row_index)
+        )
+        flat_cols: np.ndarray = np.atleast_1d(col_index)
+        if flat_cols.size == 0 or np.atleast_1d(row_index).size == 0:
+            result: np.ndarray = np.zeros(
+                (np.atleast_1d(row_index).size, flat_cols.size) + self.shape[2:], dtype=self.dtype
+            )
+        else:
+            first, stop = int(flat_cols.min()), int(flat_cols.max()) + 1
+            result: np.ndarray = self._decode(flat_rows, first, stop)[:, flat_cols - first]
+        
+        result = result[(slice(None), slice(None)) + rest]
+        if col_index.ndim == 0:
+            result = result[:, 0]
+        return result[0] if row_index.ndim == 0 else result
@@ -0,0 +1,194 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                              app/bin/run_cache.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from data.concatenate_bin_simulations   import concat_simulations
+from data.sharded_array                 import ShardedArray
+from analysis.moments                   import RunningMoments
+from analysis.quantiles                 import QuantileSketch
+from log.genlog                         import bin_manager_log
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                            import Path, PosixPath
+from typing                             import Any, Optional
+import hashlib
+import shutil
+import json
+import time
+import os
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+class RunCache(object):
+    def __init__(self, path_: Optional[PosixPath] = None, max_bytes: int = 2 * 1024**3) -> None:
+        """
+        Content-addressed cache of simulation runs. Each run lives in its own directory named after the hash of
+        its parameters, and index.json maps the hashes to their size and last access, so a lookup never scans
+        the directories. The least recently used runs are evicted when the cache grows over max_bytes.
+        Args:
+            path_ (Optional[PosixPath]): Root directory of the cache. Defaults to app/bin/cache.
+            max_bytes (int): Maximum total size of the cached runs.
+        """
+        self.path_      : PosixPath = Path("app", "bin", "cache") if path_ is None else Path(path_)
+        self.max_bytes  : int       = max_bytes
+        self.index_path : PosixPath = Path(self.path_, "index.json")
+        self.moments_file: str      = "moments.npz"
+        self.quantiles_file: str    = "quantiles.npz"
+    
+    @staticmethod
+    def key(params: dict[str, Any]) -> str:
+        """
+        Hash of the simulation parameters (and seed) of a run.
+        Args:
+            params (dict[str, Any]): JSON serializable parameters.
+        Returns:
+            str: Hex digest identifying the run.
+        """
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+    
+    def run_path(self, key: str) -> PosixPath:
+        """
+        Directory of the run with the given key.
+        """
+        return Path(self.path_, key)
+    
+    def _load_index(self) -> dict[str, dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as f:
+            return json.load(f)
+    
+    def _save_index(self, index: dict[str, dict[str, Any]]) -> None:
+        # Written aside and renamed, so a crash never leaves a truncated index
+        self.path_.mkdir(parents=True, exist_ok=True)
+        tmp: PosixPath = Path(self.path_, "index.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp, self.index_path)
+    
+    def total_bytes(self) -> int:
+        """
+        Size of every cached run, from the index.
+        """
+        return sum(entry["bytes"] for entry in self._load_index().values())
+    
+    def get(self, params: dict[str, Any]) -> Optional[dict[str, Any]]:
+        """
+        Looks up a run and marks it as recently used.
+        Args:
+            params (dict[str, Any]): Parameters of the run.
+        Returns:
+            Optional[dict[str, Any]]: data (ShardedArray over the memory-mapped shards), moments and quantiles
+                                      sketch (None if they were not stored) and entropy of the run. None on a
+                                      miss.
+        """
+        index: dict[str, dict[str, Any]] = self._load_index()
+        key: str = self.key(params)
+        if key not in index or not os.path.isdir(self.run_path(key)):
+            return None
+        
+        index[key]["last_access"] = time.time()
+        self._save_index(index)
+        
+        moments_path    : PosixPath = Path(self.run_path(key), self.moments_file)
+        quantiles_path  : PosixPath = Path(self.run_path(key), self.quantiles_file)
+        data: ShardedArray = concat_simulations(path_=self.run_path(key))
+        return {
+            "data": data, "entropy": index[key]["entropy"],
+            "moments": RunningMoments.load(moments_path) if os.path.exists(moments_path) else None,
+            "quantiles": QuantileSketch.load(quantiles_path) if os.path.exists(quantiles_path) else None
+        }
+    
+    def prepare(self, params: dict[str, Any]) -> PosixPath:
+        """
+        Creates an empty directory for a new run (a leftover of an interrupted run is removed).
+        Args:
+            params (dict[str, Any]): Parameters of the run.
+        Returns:
+            PosixPath: Directory where the shards of the run must be posted.
+        """
+        path_: PosixPath = self.run_path(self.key(params))
+        if os.path.exists(path_):
+            shutil.rmtree(path_)
+        path_.mkdir(parents=True)
+        return path_
+    
+    def put(self, params: dict[str, Any], entropy: Optional[int], moments: Optional[RunningMoments] = None,
+            quantiles: Optional[QuantileSketch] = None) -> None:
+        """
+        Registers a run whose shards were posted in prepare(params), then evicts the least recently used runs.
+        Args:
+            params (dict[str, Any]): Parameters of the run.
+            entropy (Optional[int]): Root seed entropy of the run.
+            moments (Optional[RunningMoments]): Moments of the run, stored next to the shards.
+            quantiles (Optional[QuantileSketch]): Quantile sketch of the run, stored next to the shards.
+        """
+        key: str = self.key(params)
+        path_: PosixPath = self.run_path(key)
+        if moments is not None:
+            moments.save(Path(path_, self.moments_file))
+        if quantiles is not None:
+            quantiles.save(Path(path_, self.quantiles_file))
+        
+        index: dict[str, dict[str, Any]] = self._load_index()
+        index[key] = {
+            "params": params, "entropy": entropy, "last_access": time.time(),
+            "bytes": sum(f.stat().st_size for f in path_.rglob("*") if f.is_file())
+        }
+        self._save_index(index)
+        self.evict(keep=key)
+    
+    def move(self, params: dict[str, Any], new_params: dict[str, Any]) -> PosixPath:
+        """
+        Re-keys a stored run whose parameters changed in place (a run extended with MultiCore.extend). The stored
+        moments and quantiles are dropped, put(new_params, ...) registers the run again with the new ones.
+        Args:
+            params (dict[str, Any]): Parameters the run was stored with.
+            new_params (dict[str, Any]): Parameters of the run now.
+        Returns:
+            PosixPath: New directory of the run.
+        """
+        path_       : PosixPath = self.run_path(self.key(params))
+        new_path    : PosixPath = self.run_path(self.key(new_params))
+        if os.path.exists(new_path):
+            shutil.rmtree(new_path)
+        os.replace(path_, new_path)
+        for name in (self.moments_file, self.quantiles_file):
+            if os.path.exists(Path(new_path, name)):
+                os.remove(Path(new_path, name))
+        
+        index: dict[str, dict[str, Any]] = self._load_index()
+        index.pop(self.key(params), None)
+        index.pop(self.key(new_params), None)
+        self._save_index(index)
+        return new_path
+    
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Deletes the least recently used runs until the cache fits in max_bytes.
+        Args:
+            keep (Optional[str]): Key that is never evicted (the run just stored). It stays even if it is larger
+                                  than max_bytes on its own.
+        """
+        index: dict[str, dict[str, Any]] = self._load_index()
+        total: int = sum(entry["bytes"] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= index.pop(key)["bytes"]
+            shutil.rmtree(self.run_path(key), ignore_errors=True)
+            bin_manager_log(self.run_path(key), "delete")
+        self._save_index(index)
+    
+    def clear(self) -> None:
+        """
+        Deletes every cached run.
+        """
+        if os.path.exists(self.path_):
+            shutil.rmtree(self.path_)
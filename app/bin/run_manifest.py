@@ -0,0 +1,119 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                            app/bin/run_manifest.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib    import Path, PosixPath
+from typing     import Any, Optional
+import shutil
+import pickle
+import json
+import os
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# Layout of the manifest directory of a run (next to its shards):
+#   manifest/manifest.json      -> parameters, root seed entropy and unit count of the run, indices of the done units
+#   manifest/Unit000042.pkl     -> result of a done unit (moments, histograms, first passages, metrics)
+# Both are written aside and renamed, so a killed run leaves either the previous or the new version of a file.
+
+
+class RunManifest(object):
+    def __init__(self, path_: PosixPath, params: dict[str, Any], entropy: int, units: int) -> None:
+        """
+        Record of the work units of a run that are done, so a run that was killed is resumed from the missing
+        units. A unit is committed once its shards are complete under their final names, so every unit of the
+        manifest can be trusted.
+        Args:
+            path_ (PosixPath): Directory of the run (its shards), the manifest lives in path_/manifest.
+            params (dict[str, Any]): JSON serializable parameters of the run, a resumed run must have the same.
+            entropy (int): Root seed entropy of the run, restored on resume.
+            units (int): Number of work units of the run.
+        """
+        self.path_      : PosixPath         = Path(path_, "manifest")
+        self.params     : dict[str, Any]    = json.loads(json.dumps(params))
+        self.entropy    : int               = entropy
+        self.units      : int               = units
+        self.done       : set[int]          = set()
+    
+    @classmethod
+    def create(cls, path_: PosixPath, params: dict[str, Any], entropy: int, units: int) -> "RunManifest":
+        """
+        Starts the manifest of a new run, replacing the one of any previous run in path_.
+        """
+        manifest: RunManifest = cls(path_, params, entropy, units)
+        if os.path.exists(manifest.path_):
+            shutil.rmtree(manifest.path_)
+        manifest.path_.mkdir(parents=True)
+        manifest._save()
+        return manifest
+    
+    @classmethod
+    def load(cls, path_: PosixPath, params: dict[str, Any]) -> Optional["RunManifest"]:
+        """
+        Manifest of an unfinished run in path_ with the given parameters.
+        Args:
+            path_ (PosixPath): Directory of the run.
+            params (dict[str, Any]): Parameters of the run to resume.
+        Returns:
+            Optional[RunManifest]: The manifest, None if there is none or it belongs to a run with other parameters.
+        """
+        manifest_path: PosixPath = Path(path_, "manifest", "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            stored: dict[str, Any] = json.load(f)
+        if stored["params"] != json.loads(json.dumps(params)):
+            return None
+        
+        manifest: RunManifest = cls(path_, params, stored["entropy"], stored["units"])
+        manifest.done = {index for index in stored["done"] if os.path.exists(manifest._result_path(index))}
+        return manifest
+    
+    def _result_path(self, index: int) -> PosixPath:
+        return Path(self.path_, f"Unit{index:06d}.pkl")
+    
+    def _save(self) -> None:
+        tmp: PosixPath = Path(self.path_, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {"params": self.params, "entropy": self.entropy, "units": self.units, "done": sorted(self.done)}, f
+            )
+        os.replace(tmp, Path(self.path_, "manifest.json"))
+    
+    def commit(self, result: dict[str, Any]) -> None:
+        """
+        Records a done unit with its result (see core/work_unit.run_unit).
+        """
+        tmp: PosixPath = Path(self.path_, f"Unit{result['index']:06d}.pkl.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(result, f)
+        os.replace(tmp, self._result_path(result["index"]))
+        self.done.add(result["index"])
+        self._save()
+    
+    def forget(self, index: int) -> None:
+        """
+        Marks a unit as not done (its shards are missing), it will be run again.
+        """
+        self.done.discard(index)
+        self._save()
+    
+    def results(self) -> list[dict[str, Any]]:
+        """
+        Results of the done units, ordered by index.
+        """
+        results: list[dict[str, Any]] = []
+        for index in sorted(self.done):
+            with open(self._result_path(index), "rb") as f:
+                results.append(pickle.load(f))
+        return results
+    
+    def remove(self) -> None:
+        """
+        Deletes the manifest once the run is complete.
+        """
+        if os.path.exists(self.path_):
+            shutil.rmtree(self.path_)
@@ -0,0 +1,94 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                            app/cluster/__main__.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib import Path
+import argparse
+import os
+import sys
+
+# "python app/cluster" only puts app/cluster on the path, the app modules live one level up.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from cluster.coordinator import ClusterCore
+from cluster.worker import serve_processes
+from bin.run_cache import RunCache
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+# VARS |-------------------------------------------------------|
+ADDRESS     : str           = "127.0.0.1:7117"
+SAMPlES     : int           = 200
+STATES      : str           = "-1,1"
+PROB        : str           = "0.5,0.5"
+SIMULATIONS : int           = 10000
+AUTHKEY_VAR : str           = "RANDOM_WALK_AUTHKEY"
+# |------------------------------------------------------------|
+
+
+def _address(text: str) -> tuple[str, int]:
+    host, port = text.rsplit(":", 1)
+    return host, int(port)
+
+
+def _floats(text: str) -> list[float]:
+    return [float(v) for v in text.split(",")]
+
+
+def _ints(text: str) -> list[int]:
+    return [int(v) for v in text.split(",")]
+
+
+parser = argparse.ArgumentParser(
+    prog="python app/cluster", description="Random walk simulations spread over the worker processes of several nodes",
+    epilog=f"The shared secret of the cluster is read from ${AUTHKEY_VAR}."
+)
+commands = parser.add_subparsers(dest="command", required=True)
+
+coordinator = commands.add_parser("coordinator", help="run a simulation on the connected workers")
+coordinator.add_argument("--address", type=_address, default=_address(ADDRESS), help="host:port to listen on")
+coordinator.add_argument("--samples", type=int, default=SAMPlES)
+coordinator.add_argument("--sample-space", type=_ints, default=_ints(STATES), help="e.g. -1,1 or -1,0,1")
+coordinator.add_argument("--prob", type=_floats, default=_floats(PROB), help="e.g. 0.5,0.5")
+coordinator.add_argument("--simulations", type=int, default=SIMULATIONS)
+coordinator.add_argument("--steps", action="store_true", help="store the steps instead of the cumulative walks")
+coordinator.add_argument("--seed", type=int, default=None)
+coordinator.add_argument("--unit-size", type=int, default=1000)
+coordinator.add_argument("--moments-only", action="store_true", help="only merge the moments, no trajectories")
+coordinator.add_argument("--cache", action="store_true", help="store the trajectories in the run cache")
+coordinator.add_argument("--heartbeat", type=float, default=5.0)
+
+worker = commands.add_parser("worker", help="run work units for a coordinator")
+worker.add_argument("--address", type=_address, default=_address(ADDRESS), help="host:port of the coordinator")
+worker.add_argument("--processes", type=int, default=os.cpu_count())
+worker.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for the coordinator")
+args = parser.parse_args()
+
+if AUTHKEY_VAR not in os.environ:
+    parser.error(f"set the shared secret of the cluster in ${AUTHKEY_VAR}")
+authkey: bytes = os.environ[AUTHKEY_VAR].encode("utf-8")
+
+if args.command == "worker":
+    serve_processes(args.address, authkey, args.processes, args.timeout)
+    sys.exit(0)
+
+cluster = ClusterCore(
+    args.address, authkey, moments=True, keep_data=not args.moments_only, seed=args.seed,
+    unit_size=args.unit_size, cache=RunCache() if args.cache else None, heartbeat=args.heartbeat
+)
+cluster.coinflip_args(args.samples, args.sample_space, args.prob, args.simulations, not args.steps)
+print(f"listening on {cluster.start()}", flush=True)
+try:
+    cluster.run()
+finally:
+    cluster.close()
+
+moments = cluster.running_moments
+print(f"E[X_T] = {moments.mean[-1]:.6f} | Var[X_T] = {moments.var[-1]:.6f} | entropy: {cluster.entropy}")
+if args.moments_only == False:
+    print(f"shards in {cluster._run_path()}")
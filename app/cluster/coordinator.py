@@ -0,0 +1,209 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                         app/cluster/coordinator.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from core.multicore_simulation  import MultiCore
+from log.genlog                 import subprocess_log
+from log.metrics                import METRICS
+from bin.binary_manager         import BinManager
+from bin.run_cache              import RunCache
+from generator.barriers         import Barriers
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from multiprocessing.connection import Listener, Client, Connection
+from multiprocessing            import AuthenticationError
+from typing                     import Any, Iterator, Optional
+import threading
+import queue
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+class ClusterCore(MultiCore):
+    def __init__(self, address: tuple[str, int], authkey: bytes, moments: bool = False, keep_data: bool = True,
+                 higher_moments: bool = False, moments_batch: int = 1000, unit_size: int = 1000,
+                 seed: Optional[int] = None, cache: Optional[RunCache] = None, barriers: Optional[Barriers] = None,
+                 write_batch: int = 250, codec: str = "raw", resume: bool = True, retries: int = 2,
+                 lod: bool = True, quantiles: bool = False, heartbeat: float = 5.0) -> None:
+        """
+        MultiCore whose work units run on worker processes of other nodes (cluster/worker.py) instead of the local
+        pool. The coordinator listens on a TCP address, every connected worker pulls the next unit as soon as it
+        is idle and sends back its result and its shards, which are stored here like the shards of the local
+        pool. Everything else is the MultiCore run: cache, manifest and resume, moments merged in unit order, so a
+        run is bit-identical to the local one with the same seed and unit_size.
+        Workers may join at any time, also in the middle of a run. A worker that disconnects, or misses three
+        heartbeats, is dropped and its unit is requeued. The messages are pickled: the authkey handshake of
+        multiprocessing.connection keeps out the peers without the key, only share it with trusted nodes.
+        Args:
+            address (tuple[str, int]): Host and port to listen on (port 0 picks a free one, see self.address
+                                       after start()).
+            authkey (bytes): Shared secret of the cluster.
+            heartbeat (float): Seconds between two "alive" messages of a worker running a unit.
+            The other arguments are the ones of MultiCore. Runs are on disk (the shards are sent over the
+            network) and runs extended in time are continued by the local pool (the units read the stored
+            shards).
+        """
+        super().__init__(
+            0, False, moments, keep_data, higher_moments, moments_batch, unit_size, seed, cache, barriers,
+            write_batch, codec, resume, retries, lod, quantiles
+        )
+        self.on_cpu     : int                       = 0
+        self.address    : tuple[str, int]           = address
+        self.authkey    : bytes                     = authkey
+        self.heartbeat  : float                     = heartbeat
+        self.listener   : Optional[Listener]        = None
+        self.todo       : queue.Queue               = queue.Queue()
+        self.events     : queue.Queue               = queue.Queue()
+        self.stopping   : threading.Event           = threading.Event()
+        self.handlers   : list[threading.Thread]    = []
+        self.joined     : int                       = 0
+        self.lock       : threading.Lock            = threading.Lock()
+    
+    def start(self) -> tuple[str, int]:
+        """
+        Starts listening for workers (run() does it on its first call). Workers can connect before the run.
+        Returns:
+            tuple[str, int]: The address the coordinator listens on.
+        """
+        if self.listener is None:
+            self.stopping.clear()
+            self.listener = Listener(self.address, authkey=self.authkey)
+            self.address = self.listener.address
+            threading.Thread(target=self._accept, daemon=True).start()
+        return self.address
+    
+    def _accept(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                conn: Connection = self.listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                return
+            if self.stopping.is_set():
+                conn.close()
+                return
+            with self.lock:
+                worker: int = self.joined
+                self.joined += 1
+            handler: threading.Thread = threading.Thread(target=self._serve, args=(conn, worker), daemon=True)
+            self.handlers.append(handler)
+            handler.start()
+    
+    def _serve(self, conn: Connection, worker: int) -> None:
+        """
+        Feeds one worker: takes the next unit of the current run, sends it and waits for its result. A lost
+        connection puts the unit back in the queue for the other workers.
+        """
+        try:
+            _, host, pid = conn.recv()
+            conn.send(("welcome", self.heartbeat))
+        except (EOFError, OSError):
+            conn.close()
+            return
+        subprocess_log(worker, pid, "join")
+        METRICS.event("cluster", worker=worker, host=host, pid=pid, state="join")
+        with self.lock:
+            self.on_cpu += 1
+        
+        try:
+            while not self.stopping.is_set():
+                try:
+                    item: tuple[int, int, dict[str, Any]] = self.todo.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    continue
+                if item[0] != self.dispatches:
+                    continue
+                try:
+                    message: tuple = self._run_remote(conn, item[2])
+                except (EOFError, OSError, TimeoutError) as error:
+                    self.todo.put(item)
+                    METRICS.event("requeue", unit=item[2]["index"], attempt=0, pid=pid, error=repr(error))
+                    return
+                
+                if message[0] == "result":
+                    bin_manager: BinManager = BinManager(item[2]["bin_path"])
+                    for name, content in message[2].items():
+                        bin_manager.post_bytes(name, content)
+                    self.events.put((item[0], item[1], message[1], None))
+                else:
+                    self.events.put((item[0], item[1], None, RuntimeError(f"on worker {host}:{pid}\n{message[1]}")))
+            conn.send(("stop",))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            with self.lock:
+                self.on_cpu -= 1
+            subprocess_log(worker, pid, "left")
+            METRICS.event("cluster", worker=worker, host=host, pid=pid, state="left")
+    
+    def _run_remote(self, conn: Connection, unit: dict[str, Any]) -> tuple:
+        """
+        Sends a unit to a worker and waits for its answer, skipping the heartbeats.
+        Raises:
+            TimeoutError: No message for three heartbeats, the worker is considered lost.
+        """
+        conn.send(("unit", unit))
+        while True:
+            if not conn.poll(3 * self.heartbeat):
+                raise TimeoutError(f"no heartbeat for {3 * self.heartbeat} s")
+            message: tuple = conn.recv()
+            if message[0] != "alive":
+                return message
+    
+    def _dispatch(self, units: list[dict[str, Any]]) -> Iterator[tuple[int, dict[str, Any]]]:
+        """
+        Queues the work units for the workers and yields their results as they complete. A unit that raises is
+        requeued up to self.retries times. The run waits for workers as long as there are units left.
+        Args:
+            units (list[dict[str, Any]]): The work units.
+        Returns:
+            Iterator[tuple[int, dict[str, Any]]]: Position of the unit in units and its result (see run_unit).
+        """
+        if any(unit["first_segment"] > 0 for unit in units):
+            yield from super()._dispatch(units)
+            return
+        
+        self.start()
+        self.dispatches += 1
+        attempts: list[int] = [1] * len(units)
+        finished: set[int] = set()
+        for n, unit in enumerate(units):
+            self.todo.put((self.dispatches, n, unit))
+        
+        while len(finished) < len(units):
+            dispatch, n, result, error = self.events.get()
+            if dispatch != self.dispatches or n in finished:
+                continue
+            if error is not None:
+                METRICS.event("requeue", unit=units[n]["index"], attempt=attempts[n], pid=None, error=repr(error))
+                if attempts[n] > self.retries:
+                    raise RuntimeError(f"unit {units[n]['index']} failed {attempts[n]} times") from error
+                attempts[n] += 1
+                self.todo.put((dispatch, n, units[n]))
+                continue
+            finished.add(n)
+            yield n, result
+    
+    def close(self) -> None:
+        """
+        Stops the workers (they exit once their current unit is done) and the listener, and the local pool of
+        the runs extended in time.
+        """
+        if self.listener is not None:
+            self.stopping.set()
+            try:
+                # Wakes up the accept() of the listener thread
+                Client(self.address, authkey=self.authkey).close()
+            except OSError:
+                pass
+            self.listener.close()
+            self.listener = None
+            for handler in self.handlers:
+                handler.join(2 * self.heartbeat)
+            self.handlers = []
+        super().close()
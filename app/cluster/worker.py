@@ -0,0 +1,125 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                              app/cluster/worker.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from core.work_unit             import run_unit
+from bin.binary_manager         import BinManager
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from multiprocessing.connection import Client, Connection
+from pathlib                    import Path
+from typing                     import Any
+import multiprocessing          as mp
+import traceback
+import threading
+import tempfile
+import socket
+import time
+import os
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# Messages between the coordinator (cluster/coordinator.py) and a worker, pickled tuples over one connection:
+#   worker      -> ("hello", hostname, pid)
+#   coordinator -> ("welcome", heartbeat)
+#   coordinator -> ("unit", unit)                   the unit to run (see core/work_unit.py)
+#   worker      -> ("alive",)                       every heartbeat seconds while the unit runs
+#   worker      -> ("result", result, files)        result of run_unit and the files of the unit {name: bytes}, shards
+#                                                   and level-of-detail summaries (names relative to the run dir)
+#   worker      -> ("error", traceback)             the unit raised
+#   coordinator -> ("stop",)                        the coordinator is closing
+
+
+def connect(address: tuple[str, int], authkey: bytes, timeout: float = 30.0) -> Connection:
+    """
+    Connects to a coordinator, retrying while it is not listening yet.
+    Args:
+        address (tuple[str, int]): Host and port of the coordinator.
+        authkey (bytes): Shared secret of the cluster (HMAC handshake of multiprocessing.connection).
+        timeout (float): Seconds to keep retrying.
+    Returns:
+        Connection: The connection to the coordinator.
+    """
+    deadline: float = time.perf_counter() + timeout
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except ConnectionRefusedError:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def _run_local(unit: dict[str, Any], outcome: dict[str, Any]) -> None:
+    try:
+        outcome["result"] = run_unit(unit)
+    except BaseException:
+        outcome["error"] = traceback.format_exc()
+
+
+def serve(address: tuple[str, int], authkey: bytes, timeout: float = 30.0) -> int:
+    """
+    Runs work units for a coordinator until it stops or the connection is lost. The shards of every unit are
+    written to a local temporary directory, sent back and deleted, so a worker needs no shared file system.
+    Args:
+        address (tuple[str, int]): Host and port of the coordinator.
+        authkey (bytes): Shared secret of the cluster.
+        timeout (float): Seconds to wait for the coordinator to listen.
+    Returns:
+        int: Units run.
+    """
+    conn: Connection = connect(address, authkey, timeout)
+    units: int = 0
+    try:
+        conn.send(("hello", socket.gethostname(), os.getpid()))
+        heartbeat: float = conn.recv()[1]
+        with tempfile.TemporaryDirectory() as tmp:
+            bin_manager: BinManager = BinManager(tmp)
+            while True:
+                message: tuple = conn.recv()
+                if message[0] == "stop":
+                    break
+                
+                outcome: dict[str, Any] = {}
+                thread: threading.Thread = threading.Thread(
+                    target=_run_local, args=(dict(message[1], bin_path=tmp, shm_name=None), outcome), daemon=True
+                )
+                thread.start()
+                thread.join(heartbeat)
+                while thread.is_alive():
+                    conn.send(("alive",))
+                    thread.join(heartbeat)
+                
+                files: dict[str, bytes] = {}
+                for path_ in sorted(Path(tmp).rglob(f"*{bin_manager.ext}")):
+                    name: str = str(path_.relative_to(tmp))[:-len(bin_manager.ext)]
+                    with open(path_, "rb") as f:
+                        files[name] = f.read()
+                    os.remove(path_)
+                if "error" in outcome:
+                    conn.send(("error", outcome["error"]))
+                    continue
+                conn.send(("result", outcome["result"], files))
+                units += 1
+    except (EOFError, OSError):
+        # The coordinator closed or dropped this worker (missed heartbeats): its unit was requeued
+        pass
+    finally:
+        conn.close()
+    return units
+
+
+def serve_processes(address: tuple[str, int], authkey: bytes, processes: int, timeout: float = 30.0) -> None:
+    """
+    Runs `processes` workers on this node, each with its own connection to the coordinator.
+    """
+    workers: list[mp.Process] = [
+        mp.Process(target=serve, args=(address, authkey, timeout)) for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
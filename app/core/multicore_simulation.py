@@ -6,86 +6,784 @@
 # |--------------------------------------------------------------------------------------------------------------------|
 
 # | Internal Imports |-------------------------------------------------------------------------------------------------|
-from generator.coinflip_chunk   import coinflip_simulations
-from log.genlog                 import subprocess_log
+from core.work_unit             import (run_unit, split_units, shard_name, segment_name, segment_rngs,
+                                        generate_segments, generate_unit, unit_codec, segment_origins, init_worker,
+                                        MAX_SEGMENT)
+from log.genlog                 import subprocess_log, unit_log
+from log.metrics                import METRICS
 from bin.binary_manager         import BinManager
+from bin.run_cache              import RunCache
+from bin.run_manifest           import RunManifest
+from data.concatenate_bin_simulations import concat_simulations
+from data.sharded_array         import ShardedArray
+from generator.dtypes           import step_dtype, path_dtype, is_integer_space
+from analysis.moments           import RunningMoments
+from analysis.quantiles         import QuantileSketch
+from analysis.first_passage     import FirstPassage
+from generator.barriers         import Barriers
+from generator.lattice          import step_dim, is_vector_space
+from bin.packed_format          import PackedCodec
+from bin.lod_store              import LevelOfDetail, post_lod
+from analysis.lattice           import RadialDistribution
 
 # | External Imports |-------------------------------------------------------------------------------------------------|
-from typing                     import Union
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.pool       import Pool
+from multiprocessing.queues     import SimpleQueue
+from multiprocessing            import resource_tracker
+from pathlib                    import Path, PosixPath
+from typing                     import Union, Optional, Any, Iterator
 import multiprocessing          as mp
 import numpy                    as np
+import shutil
+import queue
+import time
 # |--------------------------------------------------------------------------------------------------------------------|
 
+CODECS: tuple[str, ...] = ("raw", "packed")
+
+# Seconds between two checks of the worker processes while the results of the units are awaited
+WATCH_INTERVAL: float = 0.2
+
 
 class MultiCore(BinManager):
-    def __init__(self, cpu_offs: int) -> None:
+    def __init__(self, cpu_offs: int, in_memory: bool = False, moments: bool = False, keep_data: bool = True,
+                 higher_moments: bool = False, moments_batch: int = 1000, unit_size: int = 1000,
+                 seed: Optional[int] = None, cache: Optional[RunCache] = None,
+                 barriers: Optional[Barriers] = None, write_batch: int = 250, codec: str = "raw",
+                 resume: bool = True, retries: int = 2, lod: bool = True, quantiles: bool = False) -> None:
         """
         Initializes the MultiCore object.
-
+        
         Args:
             cpu_offs (int): Number of CPU cores to offset from the total available cores.
+            in_memory (bool): Whether the workers write their units into one shared memory block instead of
+                              posting them to app/bin. In this mode run() returns the assembled array.
+            moments (bool): Whether each worker computes running moments per time step, merged by the parent
+                            into self.running_moments.
+            keep_data (bool): Whether the trajectories are kept (posted or written in shared memory). With
+                              moments=True and keep_data=False only the moments are produced.
+            higher_moments (bool): Whether the skewness and kurtosis are also tracked.
+            moments_batch (int): Simulations generated at a time when the trajectories are not kept.
+            unit_size (int): Simulations of each work unit. Idle workers pick up the next unit, so smaller units
+                             balance better and larger units have less overhead.
+            seed (Optional[int]): Root seed. Every work unit draws from its own stream spawned from it, so a run
+                                  is bit-identical for the same seed and unit_size whatever the core count.
+                                  If None, fresh entropy is drawn at each run (kept in self.entropy).
+            cache (Optional[RunCache]): Cache of runs keyed by their parameters and seed. A seeded run already in
+                                        the cache is returned without simulating anything. Unseeded runs skip
+                                        the cache (no lookup, nothing written to it): every run without a seed
+                                        draws new walks and is kept like a run without cache.
+            barriers (Optional[Barriers]): Absorbing or reflecting bounds of the walks. The absorbed walks stop
+                                           drawing steps and their first passages are merged into
+                                           self.first_passage. Without keep_data and moments, only the first
+                                           passages are produced.
+            write_batch (int): Simulations generated at a time when the trajectories are kept. Each sub-chunk
+                               of a unit is handed to a background writer thread while the next one is
+                               generated, so compute and I/O overlap and a worker holds a few sub-chunks instead
+                               of a whole unit. It does not change the data.
+            codec (str): "raw" shards (memory-mapped as they are) or "packed": every walk is stored as the
+                         indices of its steps in the sample space, ceil(log2 |E|) bits per step (1 bit for
+                         [-1, 1]), with an index of positions so one walk or a time window is decoded alone
+                         (see bin/packed_format.py). It does not change the data. Walks (cum=True) of a
+                         real-valued sample space need "raw": their positions would not round-trip exactly.
+            resume (bool): Whether the units of an on-disk run are committed to a manifest next to the shards as
+                           they complete (see bin/run_manifest.py). A run that was killed is then resumed by the
+                           next run() with the same parameters: the done units are skipped and their results
+                           are read back, only the missing units are generated.
+            retries (int): Times a unit is requeued when it raises or its worker process dies, before the run
+                           fails.
+            lod (bool): Whether the shards of walks longer than a plot can show get their level-of-detail
+                        summaries, written by the units with the shards (see bin/lod_store.py and
+                        level_of_detail()). It does not change the data.
+            quantiles (bool): Whether each worker sketches the quantiles of the positions per time step (exact
+                              histograms for integer walks, digests otherwise, see analysis/quantiles.py),
+                              merged by the parent into self.quantile_sketch, in bounded memory like the moments.
         """
-        self.on_cpu: int = mp.cpu_count() - cpu_offs
-
-        super().__init__()
+        if codec not in CODECS:
+            raise ValueError(f"codec must be one of {CODECS}")
+        self.on_cpu         : int                       = mp.cpu_count() - cpu_offs
+        self.in_memory      : bool                      = in_memory
+        self.shm            : Optional[SharedMemory]    = None
+        self.moments        : bool                      = moments
+        self.keep_data      : bool                      = keep_data
+        self.higher_moments : bool                      = higher_moments
+        self.moments_batch  : int                       = moments_batch
+        self.unit_size      : int                       = unit_size
+        self.pool           : Optional[Pool]            = None
+        self.seed           : Optional[int]             = seed
+        self.entropy        : Optional[int]             = None
+        self.cache          : Optional[RunCache]        = cache
+        self.barriers       : Optional[Barriers]        = barriers
+        self.write_batch    : int                       = write_batch
+        self.codec          : str                       = codec
+        self.resume         : bool                      = resume
+        self.retries        : int                       = retries
+        self.lod            : bool                      = lod
+        self.quantiles      : bool                      = quantiles
+        self.started        : Optional[SimpleQueue]     = None
+        self.workers        : dict[int, mp.Process]     = {}
+        self.dispatches     : int                       = 0
+        self.lost_workers   : int                       = 0
         
+        self.running_moments: Optional[RunningMoments]      = None
+        self.quantile_sketch: Optional[QuantileSketch]      = None
+        self.first_passage  : Optional[FirstPassage]        = None
+        self.radial         : Optional[RadialDistribution]  = None
+        
+        super().__init__()
+    
     def coinflip_args(self, samples: int, sample_space: Union[float, int], prob: list[float], simulations: int,
                       cum: bool) -> None:
         """
         Set up parameters for coin flip simulations.
-
+        
         Args:
             samples (int): Quantity of samples in the simulation.
-            sample_space: (list[Union[float, int]]): Possible values for each random sample
+            sample_space: (list[Union[float, int]]): Possible values for each random sample, or step vectors for
+                                                     walks on a lattice (see generator/lattice.py): the run is
+                                                     then (simulations, samples, dim) and the distances of the
+                                                     endpoints to the origin are kept in self.radial.
             prob (list[float]): if sample_space = [-1, 1] -> probability of each sample 
                                 being -1 or 1. In the list [p(-1), p(1)]
-            simulations (int): The number of simulations to be run.
+            simulations (int): The number of simulations to be run (all of them, not per core).
             cum (bool): Whether the simulation results will be accumulated or not.
         """
         self.samples        : int               = samples
         self.sample_space   : Union[float, int] = sample_space
         self.prob           : list[float]       = prob
-        self.simulations    : int               = int(simulations/self.on_cpu)
+        self.simulations    : int               = simulations
         self.cumulative     : bool              = cum
+        self.segments       : list[int]         = [samples]
+    
+    def _params(self, count: int) -> dict:
+        """
+        Simulation parameters stored in the header of every posted shard.
+        Args:
+            count (int): Simulations of the shard.
+        Returns:
+            dict: samples, sample_space, prob, simulations (of the shard), total_simulations, cumulative,
+                  seed entropy, unit_size, the horizons of the column segments, the barriers and the codec.
+        """
+        return {
+            "samples": self.samples, "sample_space": np.asarray(self.sample_space).tolist(),
+            "prob": np.asarray(self.prob).tolist(), "simulations": count, "total_simulations": self.simulations,
+            "cumulative": self.cumulative, "entropy": self.entropy, "unit_size": self.unit_size,
+            "segments": list(self.segments), "barriers": self.barriers.to_dict() if self.barriers is not None else None,
+            "codec": self.codec
+        }
+    
+    def _cache_params(self) -> dict[str, Any]:
+        """
+        Everything that determines the trajectories of a run: the key of the run in the cache.
+        Returns:
+            dict[str, Any]: samples, sample_space, prob, simulations, cumulative, seed and unit_size, plus the
+                            horizons of the column segments of a run extended in time (they change the draws).
+        """
+        params: dict[str, Any] = {
+            "samples": self.samples, "sample_space": np.asarray(self.sample_space).tolist(),
+            "prob": np.asarray(self.prob).tolist(), "simulations": self.simulations, "cumulative": self.cumulative,
+            "seed": self.seed, "unit_size": self.unit_size
+        }
+        if len(self.segments) > 1:
+            params["segments"] = list(self.segments)
+        if self.barriers is not None:
+            params["barriers"] = self.barriers.to_dict()
+        return params
+    
+    def _cached(self) -> bool:
+        """
+        Whether the run goes through the cache: seeded runs only, an unseeded run can never be a hit so it is
+        stored like a run without cache (shared memory or self.path_).
+        """
+        return self.cache is not None and self.seed is not None
+    
+    def _from_cache(self) -> Optional[ShardedArray]:
+        """
+        Looks up the run in the cache. On a hit the moments, the quantile sketch and the entropy of the stored run
+        are restored.
+        Returns:
+            Optional[ShardedArray]: The stored dataset, None on a miss (always for unseeded runs).
+        """
+        if self.seed is None:
+            return None
+        cached: Optional[dict[str, Any]] = self.cache.get(self._cache_params())
+        if cached is None:
+            return None
+        
+        self.entropy = cached["entropy"]
+        self.running_moments = cached["moments"]
+        if self.moments == True and self.running_moments is None:
+            self.running_moments = self._moments_of(cached["data"])
+        self.quantile_sketch = cached["quantiles"]
+        if self._sketched() and self.quantile_sketch is None:
+            self.quantile_sketch = self._quantiles_of(cached["data"])
+        if self.barriers is not None:
+            self.first_passage = self._passage_of(cached["data"])
+        if is_vector_space(self.sample_space):
+            self.radial = self._radial_of(cached["data"])
+        return cached["data"]
+    
+    def _moments_of(self, data: ShardedArray) -> RunningMoments:
+        """
+        Moments of a stored dataset, read in blocks of self.moments_batch simulations.
+        """
+        moments: RunningMoments = RunningMoments(self.samples, self.higher_moments)
+        for start in range(0, len(data), self.moments_batch):
+            moments.update(np.asarray(data[start:start + self.moments_batch]))
+        return moments
+    
+    def _quantiles_of(self, data: ShardedArray) -> QuantileSketch:
+        """
+        Quantile sketch of a stored dataset, read in blocks of self.moments_batch simulations.
+        """
+        sketch: QuantileSketch = QuantileSketch(self.samples)
+        for start in range(0, len(data), self.moments_batch):
+            sketch.update(np.asarray(data[start:start + self.moments_batch]))
+        return sketch
+    
+    def _sketched(self) -> bool:
+        """
+        Whether the run gets a quantile sketch: requested, and walks of scalar positions.
+        """
+        return self.quantiles == True and is_vector_space(self.sample_space) == False
+    
+    def _radial_of(self, data: ShardedArray) -> RadialDistribution:
+        """
+        Distances to the origin of the endpoints of stored lattice walks.
+        """
+        radial: RadialDistribution = RadialDistribution()
+        for start in range(0, len(data), self.moments_batch):
+            radial.update(np.asarray(data[start:start + self.moments_batch, -1]))
+        return radial
+    
+    def _passage_of(self, data: ShardedArray) -> FirstPassage:
+        """
+        First passages of stored walks between barriers: the first time each walk sits on an absorbing bound.
+        """
+        passage: FirstPassage = FirstPassage(self.samples)
+        for start in range(0, len(data), self.moments_batch):
+            side: np.ndarray = self.barriers.absorbed(np.asarray(data[start:start + self.moments_batch]))
+            hit: np.ndarray = (side != 0).any(axis=1)
+            first: np.ndarray = np.argmax(side != 0, axis=1)
+            passage.update(np.where(hit, first + 1, -1), side[np.arange(side.shape[0]), first] * hit)
+        return passage
+    
+    def _units(self, in_memory: bool, bin_path: Optional[PosixPath] = None,
+               first_segment: int = 0) -> list[dict[str, Any]]:
+        """
+        Builds the work units of the run.
+        Args:
+            in_memory (bool): Whether the units write into the shared memory block.
+            bin_path (Optional[PosixPath]): Directory of the posted shards. Defaults to self.path_.
+            first_segment (int): First column segment generated by the units (later than 0 when the stored walks
+                                 are continued in time).
+        Returns:
+            list[dict[str, Any]]: The work units in order (see core/work_unit.py).
+        """
+        units: list[dict[str, Any]] = []
+        for index, start, count in split_units(self.simulations, self.unit_size):
+            units.append({
+                "index": index, "start": start, "count": count, "entropy": self.entropy,
+                "samples": self.samples, "sample_space": self.sample_space, "prob": self.prob,
+                "cumulative": self.cumulative, "segments": list(self.segments), "first_segment": first_segment,
+                "moments_from": 0, "keep_data": self.keep_data, "moments": self.moments, "quantiles": self.quantiles,
+                "barriers": self.barriers.to_dict() if self.barriers is not None else None,
+                "higher_moments": self.higher_moments, "moments_batch": self.moments_batch,
+                "write_batch": self.write_batch, "codec": self.codec, "lod": self.lod,
+                "shm_name": self.shm.name if in_memory else None,
+                "shm_shape": self._shared_shape(), "shm_dtype": self.shm_dtype.str if in_memory else None,
+                "shard": shard_name(index), "params": self._params(count), "submitted": time.time(),
+                "bin_path": str(self.path_ if bin_path is None else bin_path)
+            })
+        return units
+    
+    def _unit(self, index: int) -> dict[str, Any]:
+        """
+        Work unit of the last run with the given index, to be regenerated on its own.
+        Args:
+            index (int): Index of the work unit.
+        Returns:
+            dict[str, Any]: The work unit.
+        """
+        units: list[dict[str, Any]] = self._units(False)
+        if not 0 <= index < len(units):
+            raise IndexError(f"unit {index} is out of range, the run has {len(units)} units")
+        return units[index]
+    
+    def regenerate_unit(self, index: int, post: bool = False) -> np.ndarray:
+        """
+        Recomputes one work unit of the last run in this process. The result is bit-identical to the unit
+        generated by the pool, so a bad shard can be rebuilt without running everything again.
+        Args:
+            index (int): Index of the work unit.
+            post (bool): Whether the shard of the unit is posted again to app/bin.
+        Returns:
+            np.ndarray: The simulations of the unit.
+        """
+        unit: dict[str, Any] = self._unit(index)
+        if post == False:
+            return generate_unit(unit)
+        
+        rngs: list[np.random.Generator] = segment_rngs(unit["entropy"], index, len(self.segments))
+        parts: list[np.ndarray] = generate_segments(unit, unit["count"], rngs)
+        for j, (part, origin) in enumerate(zip(parts, segment_origins(parts, None))):
+            self.post(segment_name(index, j), part, unit["params"], unit_codec(unit), origin)
+        return np.concatenate(parts, axis=1)
+    
+    def _collect(self, results: list[dict[str, Any]], samples: Optional[int] = None) -> RunningMoments:
+        """
+        Merge the moments of every unit in unit order.
+        Args:
+            results (list[dict[str, Any]]): Results of the units, ordered by index.
+            samples (Optional[int]): Time steps covered by the moments of the units. Defaults to self.samples.
+        Returns:
+            RunningMoments: The merged moments.
+        """
+        moments: RunningMoments = RunningMoments(self.samples if samples is None else samples, self.higher_moments)
+        for result in results:
+            moments.merge(result["moments"])
+        return moments
+    
+    def _collect_quantiles(self, results: list[dict[str, Any]]) -> QuantileSketch:
+        """
+        Merge the quantile sketches of every unit in unit order.
+        """
+        sketch: QuantileSketch = QuantileSketch(self.samples)
+        for result in results:
+            sketch.merge(result["quantiles"])
+        return sketch
+    
+    def _shared_shape(self) -> tuple[int, ...]:
+        """
+        Shape of the assembled result: one row per simulation.
+        Returns:
+            tuple[int, ...]: (simulations, samples), or (simulations, samples, dim) for step vectors.
+        """
+        if is_vector_space(self.sample_space):
+            return (self.simulations, self.samples, step_dim(self.sample_space))
+        return (self.simulations, self.samples)
+    
+    def _allocate_shared(self) -> None:
+        """
+        Allocates the shared memory block that receives the rows of every work unit.
+        """
+        self.release()
+        self.shm_dtype  : np.dtype      = (
+            path_dtype(self.sample_space, self.samples) if self.cumulative == True else step_dtype(self.sample_space)
+        )
+        nbytes          : int           = int(np.prod(self._shared_shape())) * self.shm_dtype.itemsize
+        self.shm        : SharedMemory  = SharedMemory(create=True, size=max(nbytes, 1))
+    
+    def _shared_array(self) -> np.ndarray:
+        """
+        Zero-copy ndarray view over the shared memory block.
+        Returns:
+            np.ndarray: (simulations, samples[, dim]) array backed by self.shm
+        """
+        return np.ndarray(self._shared_shape(), dtype=self.shm_dtype, buffer=self.shm.buf)
+    
+    def release(self) -> None:
+        """
+        Frees the shared memory block of the last in-memory run. Arrays returned by run() must not be used after.
+        """
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
     
-    def _chunk(self, id: int) -> None:
+    def _clear_shards(self) -> None:
         """
-        Run coin flip simulations in chunks.
+        Deletes the shards of a previous run, so concat_simulations() only sees the current one.
+        """
+        for name in self.bin_files_list():
+            if name.startswith("Shard") or name.startswith("Core"):
+                self.delete(name)
+        self.clear_partials()
+        shutil.rmtree(Path(self.path_, "lod"), ignore_errors=True)
+    
+    def persist(self, path_: Optional[PosixPath] = None) -> None:
+        """
+        Posts the in-memory result to app/bin with the same per-unit layout of the disk mode, so
+        concat_simulations() can read it back.
+        Args:
+            path_ (Optional[PosixPath]): Target directory instead of app/bin.
         """
-        data: np.ndarray = coinflip_simulations(
-            self.samples, self.prob, self.simulations, self.cumulative, self.sample_space
+        bin_manager: BinManager = self if path_ is None else BinManager(path_)
+        if path_ is None:
+            self._clear_shards()
+        data: np.ndarray = self._shared_array()
+        codec: Optional[PackedCodec] = (
+            PackedCodec(self.sample_space, self.cumulative) if self.codec == "packed" else None
         )
-        self.post(f"Core{id}", data)
+        for index, start, count in split_units(self.simulations, self.unit_size):
+            bin_manager.post(shard_name(index), data[start:start+count], self._params(count), codec)
+            if self.lod == True and is_vector_space(self.sample_space) == False:
+                post_lod(bin_manager.path_, shard_name(index), data[start:start+count], self._params(count))
     
-    def _generate_subprocess(self) -> None:
+    def _get_pool(self) -> Pool:
         """
-        Generate subprocesses for parallel execution.
+        Starts the worker pool on the first run. The pool is kept for the next runs until close().
+        Returns:
+            Pool: The persistent worker pool.
         """
-        self.process_list: list[mp.Process] = []
-        for n in range(self.on_cpu):
-            self.process_list.append(mp.Process(target=self._chunk, args=(n,)))
+        if self.pool is None:
+            # Forked workers share the resource tracker of this process only if it runs before the fork. A worker
+            # that starts its own unlinks the shared memory block of the run when it is killed.
+            resource_tracker.ensure_running()
+            self.started = mp.SimpleQueue()
+            self.pool = mp.Pool(self.on_cpu, initializer=init_worker, initargs=(self.started,))
+            self.workers = {}
+            self._watch_workers()
+        return self.pool
     
-    def _start_subprocess(self) -> None:
+    def _pool_processes(self) -> list[mp.Process]:
         """
-        Start the generated subprocesses.
+        Worker processes of the pool. Pool has no public accessor for them and the exit codes of the dead ones
+        are only on the Process objects (the pids announced on self.started do not tell a worker died), so this
+        is the one place that reads the private Pool._pool.
         """
-        for n, process in enumerate(self.process_list):
-            process.start()
-            subprocess_log(n, process.pid, "start")
+        return list(self.pool._pool)
     
-    def _join_subprocess(self) -> None:
+    def _watch_workers(self) -> dict[int, int]:
         """
-        Wait for subprocesses to finish and clean up resources.
+        Checks the worker processes of the pool and registers the new ones. The pool replaces a dead worker, but
+        the unit it was running is lost: its result never comes.
+        Returns:
+            dict[int, int]: pid and exit code of every worker that died since the last check.
         """
-        for n, process in enumerate(self.process_list):
-            process.join()
-            subprocess_log(n, process.pid, "close")
-            process.close()
+        dead: dict[int, int] = {}
+        for pid, process in list(self.workers.items()):
+            if process.exitcode is not None:
+                dead[pid] = process.exitcode
+                self.lost_workers += 1
+                subprocess_log(list(self.workers).index(pid), pid, "died")
+                del self.workers[pid]
+        for process in self._pool_processes():
+            if process.pid not in self.workers and process.exitcode is None:
+                self.workers[process.pid] = process
+                subprocess_log(list(self.workers).index(process.pid), process.pid, "start")
+        return dead
+    
+    def close(self) -> None:
+        """
+        Stops the worker pool. A pool that lost a worker is terminated: the dead worker may have held the lock of
+        the task queue and the others would wait for it forever.
+        """
+        if self.pool is not None:
+            pids: list[int] = [process.pid for process in self._pool_processes()]
+            if self.lost_workers > 0:
+                self.pool.terminate()
+            else:
+                self.pool.close()
+            self.pool.join()
+            for n, pid in enumerate(pids):
+                subprocess_log(n, pid, "close")
+            self.pool = None
+            self.workers = {}
+            self.lost_workers = 0
+    
+    def _dispatch(self, units: list[dict[str, Any]]) -> Iterator[tuple[int, dict[str, Any]]]:
+        """
+        Hands the work units to the pool and yields their results as they complete. A unit that raises, or whose
+        worker process dies (the workers announce the unit they start, see work_unit.init_worker), is requeued up
+        to self.retries times. Units are deterministic, so a requeued unit gives the same result.
+        Args:
+            units (list[dict[str, Any]]): The work units.
+        Returns:
+            Iterator[tuple[int, dict[str, Any]]]: Position of the unit in units and its result (see run_unit).
+        """
+        pool        : Pool                      = self._get_pool()
+        events      : queue.Queue               = queue.Queue()
+        attempts    : list[int]                 = [0] * len(units)
+        running     : dict[int, int]            = {}
+        exited      : dict[int, int]            = {}
+        finished    : set[int]                  = set()
+        checked     : float                     = time.perf_counter()
+        self.dispatches += 1
+        
+        def submit(n: int) -> None:
+            attempts[n] += 1
+            pool.apply_async(
+                run_unit, (dict(units[n], task=(self.dispatches, n, attempts[n])),),
+                callback=lambda result: events.put((n, result, None)),
+                error_callback=lambda error: events.put((n, None, error))
+            )
+        
+        def retry(n: int, error: BaseException, pid: Optional[int] = None) -> None:
+            METRICS.event(
+                "requeue", unit=units[n]["index"], attempt=attempts[n], pid=pid, error=repr(error)
+            )
+            if attempts[n] > self.retries:
+                raise RuntimeError(f"unit {units[n]['index']} failed {attempts[n]} times") from error
+            running.pop(n, None)
+            submit(n)
+        
+        for n in range(len(units)):
+            submit(n)
+        while len(finished) < len(units):
+            try:
+                n, result, error = events.get(timeout=WATCH_INTERVAL)
+                if n not in finished and error is not None:
+                    retry(n, error)
+                elif n not in finished:
+                    finished.add(n)
+                    running.pop(n, None)
+                    yield n, result
+            except queue.Empty:
+                pass
+            if time.perf_counter() - checked < WATCH_INTERVAL:
+                continue
             
-    def run(self) -> None:
+            checked = time.perf_counter()
+            exited.update(self._watch_workers())
+            while not self.started.empty():
+                (dispatch, n, attempt), pid = self.started.get()
+                if dispatch == self.dispatches and attempt == attempts[n] and n not in finished:
+                    running[n] = pid
+            for n, pid in list(running.items()):
+                if pid in exited:
+                    retry(n, ChildProcessError(f"worker {pid} exited with code {exited[pid]}"), pid)
+    
+    def _run_units(self, units: list[dict[str, Any]], manifest: Optional[RunManifest] = None) -> list[dict[str, Any]]:
+        """
+        Runs the work units and gathers their results in unit order, whatever the order in which they complete.
+        Args:
+            units (list[dict[str, Any]]): The work units.
+            manifest (Optional[RunManifest]): Manifest where every completed unit is committed.
+        Returns:
+            list[dict[str, Any]]: The results of the units (see run_unit).
+        """
+        total   : int                       = sum(unit["count"] for unit in units)
+        results : dict[int, dict[str, Any]] = {}
+        done    : int                       = 0
+        for n, result in self._dispatch(units):
+            done += result["count"]
+            unit_log(result, done, total)
+            if manifest is not None:
+                manifest.commit(result)
+            results[n] = result
+        return [results[n] for n in range(len(units))]
+    
+    def run(self) -> Optional[Union[np.ndarray, ShardedArray]]:
         """
-        Run the multiprocessing simulation.
+        Run the multiprocessing simulation. The work units are handed to the pool one at a time and their
+        results are gathered in unit order, whatever the order in which they finish. On disk, every completed unit
+        is committed to the manifest of the run, and a run that was killed is resumed from its missing units.
+        Returns:
+            Optional[Union[np.ndarray, ShardedArray]]: In the in-memory mode, a zero-copy view over the shared
+                                  block holding every simulation. With a cache, the dataset of the run (the
+                                  memory-mapped cached shards on a hit or in the disk mode). None in the disk
+                                  mode without cache (the shards are in app/bin) and when the trajectories
+                                  are not kept (see self.running_moments).
         """
-        self._generate_subprocess()
-        self._start_subprocess()
-        self._join_subprocess()
\ No newline at end of file
+        if self.moments == False and self.quantiles == False and self.keep_data == False and self.barriers is None:
+            raise ValueError(
+                "keep_data=False requires moments=True or quantiles=True, otherwise the run produces nothing"
+            )
+        if self.barriers is not None and self.codec == "packed":
+            raise ValueError("walks held or mirrored by barriers are not made of sample space steps, use codec='raw'")
+        if (self.codec == "packed" and self.cumulative == True
+                and is_integer_space(np.ravel(self.sample_space)) == False):
+            raise ValueError("packed positions are only bit-identical for integer sample spaces, use codec='raw'")
+        if self.barriers is not None and (self.cumulative == False or len(self.segments) > 1
+                                          or is_vector_space(self.sample_space)):
+            raise ValueError(
+                "barriers bound the positions of scalar walks: cum=True, scalar steps and a run that was not extended"
+            )
+        
+        use_cache: bool = self._cached() and self.keep_data == True
+        if use_cache:
+            cached: Optional[ShardedArray] = self._from_cache()
+            if cached is not None:
+                METRICS.event("run", state="cached", simulations=self.simulations, samples=self.samples)
+                return cached
+        
+        in_memory   : bool                  = self.in_memory == True and self.keep_data == True
+        run_path    : PosixPath             = self._run_path() if use_cache else self.path_
+        manifest    : Optional[RunManifest] = (
+            self._resumed(run_path) if self.resume == True and in_memory == False else None
+        )
+        bin_path    : Optional[PosixPath]   = run_path if use_cache else None
+        if manifest is None:
+            self.entropy = np.random.SeedSequence(self.seed).entropy
+            if in_memory:
+                self._allocate_shared()
+            elif use_cache:
+                bin_path = self.cache.prepare(self._cache_params())
+            elif self.keep_data == True:
+                self._clear_shards()
+            if self.resume == True and in_memory == False:
+                manifest = RunManifest.create(
+                    run_path, self._manifest_params(), self.entropy, len(split_units(self.simulations, self.unit_size))
+                )
+        
+        units: list[dict[str, Any]] = self._units(in_memory, bin_path)
+        stored: list[dict[str, Any]] = manifest.results() if manifest is not None else []
+        METRICS.event(
+            "run", state="start", simulations=self.simulations, samples=self.samples, workers=self.on_cpu,
+            resumed=len(stored)
+        )
+        done: set[int] = {result["index"] for result in stored}
+        try:
+            results: list[dict[str, Any]] = self._run_units([u for u in units if u["index"] not in done], manifest)
+        except BaseException:
+            # A failed run never returns the block, it would outlive the process
+            if in_memory:
+                self.shm.unlink()
+                self.release()
+            raise
+        results = sorted(stored + results, key=lambda result: result["index"])
+        METRICS.event("run", state="end", simulations=sum(result["count"] for result in results))
+        
+        if self.moments == True:
+            self.running_moments = self._collect(results)
+        if self._sketched():
+            self.quantile_sketch = self._collect_quantiles(results)
+        if self.barriers is not None:
+            self.first_passage = FirstPassage(self.samples)
+            for result in results:
+                self.first_passage.merge(result["first_passage"])
+        if is_vector_space(self.sample_space):
+            self.radial = RadialDistribution()
+            for result in results:
+                self.radial.merge(result["endpoints"])
+        
+        if manifest is not None:
+            manifest.remove()
+        if use_cache:
+            if in_memory:
+                self.persist(self.cache.prepare(self._cache_params()))
+            self.cache.put(self._cache_params(), self.entropy, self.running_moments, self.quantile_sketch)
+        
+        if in_memory:
+            # The workers are done with the name, the mapping stays alive in this process until release().
+            self.shm.unlink()
+            return self._shared_array()
+        if use_cache:
+            return concat_simulations(path_=self.cache.run_path(self.cache.key(self._cache_params())))
+    
+    def _manifest_params(self) -> dict[str, Any]:
+        """
+        Everything a resumed run must share with the run that was killed: the trajectories (see _cache_params)
+        and what the units store and return.
+        """
+        return {
+            **self._cache_params(), "keep_data": self.keep_data, "moments": self.moments,
+            "higher_moments": self.higher_moments, "codec": self.codec, "quantiles": self.quantiles
+        }
+    
+    def _resumed(self, run_path: PosixPath) -> Optional[RunManifest]:
+        """
+        Manifest of a killed run with the same parameters in run_path. Its entropy is restored, the files left half
+        written are deleted and the units whose shards are missing are marked as not done.
+        Returns:
+            Optional[RunManifest]: The manifest, None if there is no run to resume.
+        """
+        manifest: Optional[RunManifest] = RunManifest.load(run_path, self._manifest_params())
+        if manifest is None:
+            return None
+        
+        self.entropy = manifest.entropy
+        bin_manager: BinManager = BinManager(run_path)
+        bin_manager.clear_partials()
+        for index in sorted(manifest.done):
+            if self.keep_data == True and bin_manager.bin_exists(shard_name(index)) == False:
+                manifest.forget(index)
+        return manifest
+    
+    def level_of_detail(self) -> Optional[LevelOfDetail]:
+        """
+        Level-of-detail summaries of the stored last run, memory-mapped (see bin/lod_store.py), for the plots of
+        long horizons.
+        Returns:
+            Optional[LevelOfDetail]: The summaries, None if the run has none (short walks, step vectors, in-memory
+                                     runs that were not persisted, runs extended in time).
+        """
+        if self.in_memory == True and self._cached() == False:
+            return None
+        return LevelOfDetail.open(self._run_path(), self.simulations)
+    
+    def _run_path(self) -> PosixPath:
+        """
+        Directory of the shards of the last run: its cache directory for a seeded run with a cache, self.path_
+        otherwise.
+        """
+        if self._cached():
+            return self.cache.run_path(self.cache.key(self._cache_params()))
+        return self.path_
+    
+    def extend(self, simulations: Optional[int] = None, samples: Optional[int] = None) -> ShardedArray:
+        """
+        Extends the stored last run instead of running everything again. Longer horizons continue every stored
+        walk from its final position: each unit only writes a new column segment drawn from the (unit, segment)
+        child of the root seed, so no generator state has to be stored. More simulations are new units appended
+        after the stored ones (a last partial unit is completed, rewriting at most unit_size simulations). The
+        moments are extended from the new units only.
+        An extended run is reproducible: the same seed and the same sequence of horizons give the same dataset,
+        and a run extended in simulations only is bit-identical to a fresh run with the total.
+        Args:
+            simulations (Optional[int]): New total number of simulations. Defaults to the current one.
+            samples (Optional[int]): New horizon (time steps). Defaults to the current one.
+        Returns:
+            ShardedArray: The memory-mapped extended dataset.
+        """
+        simulations = self.simulations if simulations is None else simulations
+        samples     = self.samples if samples is None else samples
+        if self.barriers is not None:
+            raise ValueError("runs with barriers cannot be extended")
+        if simulations < self.simulations or samples < self.samples:
+            raise ValueError(
+                f"cannot shrink a run of {self.simulations}x{self.samples} to {simulations}x{samples}, "
+                f"only extend it"
+            )
+        if samples > self.samples and len(self.segments) > MAX_SEGMENT:
+            raise ValueError(f"a run holds at most {MAX_SEGMENT} time extensions, store it again with run()")
+        path_: PosixPath = self._run_path()
+        if self.entropy is None or self.keep_data == False or BinManager(path_).bin_exists(shard_name(0)) == False:
+            raise ValueError(
+                "extend() needs a stored run: run() with keep_data=True first, on disk, with a cache or persist()"
+            )
+        
+        old_params: dict[str, Any] = self._cache_params()
+        moments: Optional[RunningMoments] = self.running_moments if self.moments == True else None
+        sketch: Optional[QuantileSketch] = self.quantile_sketch if self._sketched() else None
+        METRICS.event("extend", state="start", simulations=simulations, samples=samples, workers=self.on_cpu)
+        
+        if samples > self.samples:
+            # The summaries of the stored walks end at the old horizon
+            shutil.rmtree(Path(path_, "lod"), ignore_errors=True)
+            # The tracked time steps change with the horizon, the sketch is rebuilt from the stored walks
+            sketch = None
+            new_columns: int = samples - self.samples
+            self.segments.append(samples)
+            self.samples = samples
+            results: list[dict[str, Any]] = self._run_units(self._units(False, path_, len(self.segments) - 1))
+            if moments is not None:
+                moments.append_columns(self._collect(results, new_columns))
+        
+        if simulations > self.simulations:
+            stored: int = self.simulations
+            self.simulations = simulations
+            units: list[dict[str, Any]] = [u for u in self._units(False, path_) if u["start"] + u["count"] > stored]
+            for unit in units:
+                unit["moments_from"] = max(stored - unit["start"], 0)
+            results: list[dict[str, Any]] = self._run_units(units)
+            if moments is not None:
+                moments.merge(self._collect(results))
+            if sketch is not None:
+                sketch.merge(self._collect_quantiles(results))
+        
+        METRICS.event("extend", state="end", simulations=self.simulations, samples=self.samples)
+        if self._cached():
+            path_ = self.cache.move(old_params, self._cache_params())
+        data: ShardedArray = concat_simulations(path_=path_)
+        
+        if self.moments == True:
+            self.running_moments = self._moments_of(data) if moments is None else moments
+        if self._sketched():
+            self.quantile_sketch = self._quantiles_of(data) if sketch is None else sketch
+        if is_vector_space(self.sample_space):
+            self.radial = self._radial_of(data)
+        if self._cached():
+            self.cache.put(self._cache_params(), self.entropy, self.running_moments, self.quantile_sketch)
+        return data
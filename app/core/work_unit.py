@@ -0,0 +1,472 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                           app/core/work_unit.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from generator.coinflip_chunk   import coinflip_simulations, barrier_simulations
+from generator.barriers         import Barriers, BarrierRandomWalk
+from generator.dtypes           import path_dtype
+from generator.lattice          import is_vector_space
+from bin.binary_manager         import BinManager
+from bin.array_format           import ArrayWriter
+from bin.background_writer      import BackgroundWriter
+from bin.packed_format          import PackedCodec, PackedWriter
+from bin.lod_store              import CHANNELS, bucket_summary, lod_params, lod_path, lod_widths, post_lod
+from bin.lod_store              import summary_dtype
+from analysis.moments           import RunningMoments
+from analysis.quantiles         import QuantileSketch
+from analysis.streaming         import EndpointHistogram
+from analysis.first_passage     import FirstPassage
+from analysis.lattice           import RadialDistribution
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.queues     import SimpleQueue
+from typing                     import Any, Optional, Union
+import numpy                    as np
+import time
+import os
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# A work unit is a plain dict so it can be sent to any worker of the pool:
+#   index, start, count                         -> position of the unit in the run
+#   entropy                                     -> root seed of the run, the unit stream is derived from it
+#   samples, sample_space, prob, cumulative     -> simulation parameters (sample_space may hold step vectors, the
+#                                                  simulations are then (count, samples, dim) arrays)
+#   segments, first_segment, moments_from       -> horizons of the column segments (see segment_bounds), first
+#                                                  segment generated by the unit, first row of its statistics
+#   keep_data, moments, higher_moments, moments_batch
+#   quantiles                                   -> the unit also sketches the quantiles per time step
+#   write_batch                                 -> simulations generated at a time when the trajectories are kept
+#   codec                                       -> "raw" shards or "packed" (bit-packed steps, see bin/packed_format.py)
+#   barriers                                    -> Barriers.to_dict() of walks between barriers, None otherwise
+#   lod                                         -> shards also get their level-of-detail summaries (bin/lod_store.py)
+#   shm_name, shm_shape, shm_dtype              -> in-memory runs, rows [start, start+count) of the shared block
+#   shard, params, bin_path                     -> disk runs, name, header and directory of the posted shard
+#   submitted                                   -> time.time() when the unit was queued (queue wait metric)
+#   task                                        -> set by the dispatcher (MultiCore._dispatch), announced on start
+
+# Sub-chunks of a unit waiting for the background writer. With the one being written and the one being generated,
+# a worker holds at most WRITE_QUEUE_DEPTH + 2 sub-chunks of write_batch simulations.
+WRITE_QUEUE_DEPTH: int = 2
+
+# Last column segment of a run extended in time: the suffix of segment_name has three digits
+MAX_SEGMENT: int = 999
+
+# Channel of the worker processes to the parent (see init_worker). A SimpleQueue writes to the pipe before put()
+# returns, so the announcement of a unit survives the worker being killed right after.
+_STARTED: Optional[SimpleQueue] = None
+
+
+def init_worker(started: SimpleQueue) -> None:
+    """
+    Initializer of the pool processes: run_unit announces (task, pid) on `started` before running a unit, so the
+    parent knows which units a dead worker was holding.
+    """
+    global _STARTED
+    _STARTED = started
+
+
+def split_units(simulations: int, unit_size: int) -> list[tuple[int, int, int]]:
+    """
+    Splits a run into work units of unit_size simulations. The last unit takes the remainder, so the units
+    always add up to the requested number of simulations.
+    Args:
+        simulations (int): The number of simulations to be run.
+        unit_size (int): The number of simulations of each work unit.
+    Returns:
+        list[tuple[int, int, int]]: (index, start, count) of every unit.
+    """
+    if unit_size < 1:
+        raise ValueError("unit_size must be at least 1")
+    return [(n, start, min(unit_size, simulations - start)) for n, start in enumerate(range(0, simulations, unit_size))]
+
+
+def shard_name(index: int) -> str:
+    """
+    Name of the binary file of a work unit. Zero padded, so sorting the names gives the unit order.
+    """
+    return f"Shard{index:06d}"
+
+
+def unit_rng(entropy: int, index: int) -> np.random.Generator:
+    """
+    Independent random stream of a work unit. It is the index-th child of SeedSequence(entropy).spawn(), so
+    any unit can be regenerated on its own and a run does not depend on the number of cores.
+    Args:
+        entropy (int): Root seed of the run.
+        index (int): Index of the work unit.
+    Returns:
+        np.random.Generator: The stream of the unit.
+    """
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(index,)))
+
+
+def segment_name(index: int, segment: int) -> str:
+    """
+    Name of the binary file of one column segment of a work unit. The first segment keeps the plain shard name
+    and the later ones are suffixed, so sorting the names gives the unit order and then the segment order (up to
+    MAX_SEGMENT, beyond it "_1000" would sort before "_999").
+    """
+    if segment > MAX_SEGMENT:
+        raise ValueError(f"a run holds at most {MAX_SEGMENT} time extensions, store it again with run()")
+    return shard_name(index) if segment == 0 else f"{shard_name(index)}_{segment:03d}"
+
+
+def segment_bounds(segments: list[int]) -> list[tuple[int, int]]:
+    """
+    Columns of every segment of a run extended in time. segments holds the horizon reached after each extension,
+    so [200, 1000] means columns [0, 200) and [200, 1000).
+    Args:
+        segments (list[int]): Horizons of the segments, increasing.
+    Returns:
+        list[tuple[int, int]]: (first column, last column + 1) of every segment.
+    """
+    return list(zip([0] + list(segments[:-1]), segments))
+
+
+def segment_rngs(entropy: int, index: int, segments: int) -> list[np.random.Generator]:
+    """
+    Random streams of the column segments of a work unit. The first one is unit_rng(), so a run that was never
+    extended is unchanged, and segment j draws from the (index, j) child of the root seed. A walk continued in
+    time therefore needs no stored generator state, only its final position.
+    Args:
+        entropy (int): Root seed of the run.
+        index (int): Index of the work unit.
+        segments (int): Number of segments.
+    Returns:
+        list[np.random.Generator]: One stream per segment.
+    """
+    return [unit_rng(entropy, index)] + [
+        np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(index, j))) for j in range(1, segments)
+    ]
+
+
+def generate_segments(unit: dict[str, Any], count: int, rngs: list[np.random.Generator], first: int = 0,
+                      start: Optional[np.ndarray] = None) -> list[np.ndarray]:
+    """
+    Generates the column segments [first, len(unit["segments"])) of count simulations of a work unit. In
+    cumulative runs every segment continues the walks from the last column of the previous one.
+    Args:
+        unit (dict[str, Any]): The work unit.
+        count (int): Simulations to generate (the streams advance row by row, so the rows are the same for any
+                     count).
+        rngs (list[np.random.Generator]): Streams of the segments (see segment_rngs).
+        first (int): First segment to generate.
+        start (Optional[np.ndarray]): Positions reached at the end of segment first-1, required in cumulative
+                                      runs when first > 0.
+    Returns:
+        list[np.ndarray]: The (count, columns) block of every generated segment.
+    """
+    parts: list[np.ndarray] = []
+    for j, (lo, hi) in enumerate(segment_bounds(unit["segments"])[first:], first):
+        data: np.ndarray = coinflip_simulations(
+            hi - lo, unit["prob"], count, unit["cumulative"], unit["sample_space"], rng=rngs[j]
+        )
+        if unit["cumulative"] == True and start is not None:
+            data = data.astype(path_dtype(unit["sample_space"], hi), copy=False)
+            data += start.astype(data.dtype)[:, None]
+        parts.append(data)
+        start = data[:, -1] if unit["cumulative"] == True else None
+    return parts
+
+
+def join_segments(parts: list[np.ndarray]) -> np.ndarray:
+    """
+    Joins the column segments of a unit into its (count, samples) simulations.
+    """
+    return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=1)
+
+
+def generate_unit(unit: dict[str, Any]) -> np.ndarray:
+    """
+    Generates the (count, samples) simulations of a work unit from its own random stream.
+    Args:
+        unit (dict[str, Any]): The work unit.
+    Returns:
+        np.ndarray: The simulations of the unit.
+    """
+    if unit["barriers"] is not None:
+        return _barrier_unit(unit)[0]
+    rngs: list[np.random.Generator] = segment_rngs(unit["entropy"], unit["index"], len(unit["segments"]))
+    return join_segments(generate_segments(unit, unit["count"], rngs))
+
+
+def _endpoints(unit: dict[str, Any]) -> EndpointHistogram:
+    """
+    Empty histogram of the endpoints of the unit: of their values for scalar walks, of their distance to the
+    origin for walks over step vectors.
+    """
+    return RadialDistribution() if is_vector_space(unit["sample_space"]) else EndpointHistogram()
+
+
+def _sketch(unit: dict[str, Any]) -> Optional[QuantileSketch]:
+    """
+    Empty quantile sketch of the unit, None if it is not requested, for step vectors and for the units continuing
+    a run in time (the parent sketches the stored walks again, the tracked time steps change with the horizon).
+    """
+    if unit["quantiles"] == False or is_vector_space(unit["sample_space"]) or unit["first_segment"] > 0:
+        return None
+    return QuantileSketch(unit["samples"])
+
+
+def _unit_moments(unit: dict[str, Any]) -> tuple[RunningMoments, EndpointHistogram, Optional[QuantileSketch]]:
+    """
+    Generates the unit in batches of unit["moments_batch"] simulations keeping only their running moments, the
+    histogram of their endpoints and their quantile sketch (if requested).
+    """
+    rngs: list[np.random.Generator] = segment_rngs(unit["entropy"], unit["index"], len(unit["segments"]))
+    moments: RunningMoments = RunningMoments(unit["samples"], unit["higher_moments"])
+    endpoints: EndpointHistogram = _endpoints(unit)
+    sketch: Optional[QuantileSketch] = _sketch(unit)
+    for start in range(0, unit["count"], unit["moments_batch"]):
+        count: int = min(unit["moments_batch"], unit["count"] - start)
+        data: np.ndarray = join_segments(generate_segments(unit, count, rngs))
+        moments.update(data)
+        endpoints.update(data[:, -1])
+        if sketch is not None:
+            sketch.update(data)
+    return moments, endpoints, sketch
+
+
+def _barrier_unit(unit: dict[str, Any]) -> tuple[Optional[np.ndarray], FirstPassage, EndpointHistogram, int]:
+    """
+    Runs the walks of the unit between its barriers. The positions are only kept if they are stored or their
+    moments or quantiles are requested, the first passages and the endpoints always are.
+    Returns:
+        tuple[Optional[np.ndarray], FirstPassage, EndpointHistogram, int]: positions, first passage counts, final
+                                                                           positions and random steps drawn.
+    """
+    keep_paths: bool = unit["keep_data"] == True or unit["moments"] == True or unit["quantiles"] == True
+    walk: BarrierRandomWalk = barrier_simulations(
+        unit["samples"], unit["prob"], unit["count"], unit["sample_space"], Barriers.from_dict(unit["barriers"]),
+        keep_paths, rng=unit_rng(unit["entropy"], unit["index"])
+    )
+    endpoints: EndpointHistogram = EndpointHistogram()
+    endpoints.update(walk.final)
+    passage: FirstPassage = FirstPassage.from_hits(walk.hit_time, walk.hit_side, unit["samples"])
+    return walk.data, passage, endpoints, walk.steps_drawn
+
+
+def _final_positions(unit: dict[str, Any]) -> Optional[np.ndarray]:
+    """
+    Positions reached by the stored walks of the unit before its first_segment, read from the last column of the
+    previous segment shard (None for step runs, which do not carry a position over).
+    """
+    if unit["cumulative"] == False:
+        return None
+    previous: np.ndarray = BinManager(unit["bin_path"]).get(segment_name(unit["index"], unit["first_segment"] - 1))
+    return np.array(previous[:, -1])
+
+
+def _write_shared(unit: dict[str, Any], data: np.ndarray, row: int = 0) -> None:
+    """
+    Writes rows of the unit, from its row-th one, into the shared memory block of the run.
+    """
+    shm: SharedMemory = SharedMemory(name=unit["shm_name"])
+    try:
+        block: np.ndarray = np.ndarray(unit["shm_shape"], dtype=unit["shm_dtype"], buffer=shm.buf)
+        block[unit["start"] + row:unit["start"] + row + data.shape[0]] = data
+        del block
+    finally:
+        shm.close()
+
+
+def _store(unit: dict[str, Any], parts: list[np.ndarray]) -> int:
+    """
+    Writes the column segments generated by the unit into the shared memory block or posts them as shards.
+    Returns:
+        int: Bytes written.
+    """
+    if unit["shm_name"] is not None:
+        _write_shared(unit, join_segments(parts))
+        return sum(part.nbytes for part in parts)
+    
+    bin_manager: BinManager = BinManager(unit["bin_path"])
+    bytes_written: int = 0
+    for j, part in enumerate(parts, unit["first_segment"]):
+        bin_manager.post(segment_name(unit["index"], j), part, unit["params"])
+        bytes_written += bin_manager.bin_size(segment_name(unit["index"], j))
+    if len(_unit_widths(unit)) > 0:
+        post_lod(unit["bin_path"], unit["shard"], parts[0], unit["params"])
+    return bytes_written
+
+
+def _unit_widths(unit: dict[str, Any]) -> list[int]:
+    """
+    Levels of detail written with the shard of the unit: none in memory, for step vectors and for the units of a
+    run extended in time (its summaries are rebuilt from the stored walks, see LevelOfDetail.build).
+    """
+    if unit["lod"] == False or unit["shm_name"] is not None or is_vector_space(unit["sample_space"]):
+        return []
+    return lod_widths(unit["samples"]) if len(unit["segments"]) == 1 else []
+
+
+def _write_lod(files: list[ArrayWriter], widths: list[int], block: np.ndarray) -> None:
+    """
+    Appends the summaries of the rows of a sub-chunk to the file of each level (in the background writer, so the
+    reductions also overlap the generation of the next sub-chunk).
+    """
+    for file, level in zip(files, bucket_summary(block, widths)):
+        file.write(level)
+
+
+def unit_codec(unit: dict[str, Any]) -> Optional[PackedCodec]:
+    """
+    Codec of the shards of the unit, None for raw shards.
+    """
+    return PackedCodec(unit["sample_space"], unit["cumulative"]) if unit["codec"] == "packed" else None
+
+
+def segment_origins(parts: list[np.ndarray], start: Optional[np.ndarray]) -> list[Optional[np.ndarray]]:
+    """
+    Position of the walks before the first column of each segment: start (None for 0) for the first one, the last
+    column of the previous segment for the others. Bit-packed shards only store the steps after it.
+    """
+    return [start] + [part[:, -1] for part in parts[:-1]]
+
+
+def _write_rows(writers: list[Union[ArrayWriter, PackedWriter]], parts: list[np.ndarray],
+                start: Optional[np.ndarray]) -> None:
+    """
+    Appends the rows of a sub-chunk to the shard of each column segment.
+    """
+    for writer, part, origin in zip(writers, parts, segment_origins(parts, start)):
+        writer.write(part, origin)
+
+
+def _lod_writer(unit: dict[str, Any], width: int, dtype: np.dtype) -> ArrayWriter:
+    """
+    Opens the summary file of one level of the shard of the unit.
+    """
+    lod_path(unit["bin_path"], width).mkdir(parents=True, exist_ok=True)
+    return BinManager(lod_path(unit["bin_path"], width)).post_stream(
+        unit["shard"], (unit["count"], -(-unit["samples"] // width), len(CHANNELS)), summary_dtype(dtype),
+        lod_params(unit["params"], unit["samples"], width, dtype)
+    )
+
+
+def _pipelined_unit(unit: dict[str, Any]) -> tuple[Optional[RunningMoments], EndpointHistogram,
+                                                   Optional[QuantileSketch], int, float]:
+    """
+    Generates the column segments of the unit in sub-chunks of unit["write_batch"] simulations and hands each
+    one to a background writer (shared memory block or shards appended row block by row block), so the next
+    sub-chunk is computed while the previous one is written. The streams advance row by row, so the data is the
+    same as a single draw of the whole unit.
+    Returns:
+        tuple[Optional[RunningMoments], EndpointHistogram, Optional[QuantileSketch], int, float]: moments and
+            quantile sketch (None if not requested) and endpoints of the rows from moments_from, bytes written and
+            seconds the compute waited for the writer.
+    """
+    rngs        : list[np.random.Generator] = segment_rngs(unit["entropy"], unit["index"], len(unit["segments"]))
+    first       : int                       = unit["first_segment"]
+    start       : Optional[np.ndarray]      = _final_positions(unit) if first > 0 else None
+    moments     : Optional[RunningMoments]  = None
+    endpoints   : EndpointHistogram         = _endpoints(unit)
+    sketch      : Optional[QuantileSketch]  = _sketch(unit)
+    bin_manager : BinManager                = BinManager(unit["bin_path"])
+    files       : list[Union[ArrayWriter, PackedWriter]] = []
+    widths      : list[int]                 = _unit_widths(unit)
+    writer      : BackgroundWriter          = BackgroundWriter(WRITE_QUEUE_DEPTH)
+    
+    try:
+        try:
+            for row in range(0, unit["count"], unit["write_batch"]):
+                count: int = min(unit["write_batch"], unit["count"] - row)
+                parts: list[np.ndarray] = generate_segments(
+                    unit, count, rngs, first, None if start is None else start[row:row + count]
+                )
+                if unit["shm_name"] is not None:
+                    writer.submit(_write_shared, unit, join_segments(parts), row)
+                else:
+                    if row == 0:
+                        files = [
+                            bin_manager.post_stream(
+                                segment_name(unit["index"], j), (unit["count"],) + part.shape[1:], part.dtype,
+                                unit["params"], unit_codec(unit)
+                            ) for j, part in enumerate(parts, first)
+                        ]
+                        files += [_lod_writer(unit, width, parts[0].dtype) for width in widths]
+                    writer.submit(
+                        _write_rows, files[:len(parts)], parts, None if start is None else start[row:row + count]
+                    )
+                    if len(widths) > 0:
+                        writer.submit(_write_lod, files[len(parts):], widths, parts[0])
+                
+                skip: int = max(unit["moments_from"] - row, 0)
+                if unit["moments"] == True:
+                    chunk: RunningMoments = RunningMoments.from_chunk(
+                        join_segments(parts)[skip:], unit["higher_moments"]
+                    )
+                    moments = chunk if moments is None else moments.merge(chunk)
+                if sketch is not None:
+                    sketch.update(join_segments(parts)[skip:])
+                endpoints.update(parts[-1][skip:, -1])
+        finally:
+            writer.close()
+    except BaseException:
+        # The partial shards are dropped, the unit is run again from the start
+        for file in files:
+            file.abort()
+        raise
+    
+    bytes_written: int = 0
+    for file in files:
+        file.close()
+        bytes_written += os.path.getsize(file.path_)
+    if unit["shm_name"] is not None:
+        bytes_written = unit["count"] * int(np.prod(unit["shm_shape"][1:])) * np.dtype(unit["shm_dtype"]).itemsize
+    return moments, endpoints, sketch, bytes_written, writer.waited
+
+
+def run_unit(unit: dict[str, Any]) -> dict[str, Any]:
+    """
+    Runs one work unit in a worker process.
+    Args:
+        unit (dict[str, Any]): The work unit (see the layout at the top of this module).
+    Returns:
+        dict[str, Any]: index, count and pid of the unit, its moments and quantile sketch (None if not
+                        requested), the histogram of its endpoints (a RadialDistribution for step vectors), its
+                        first passages (None without barriers) and its metrics: wall and cpu seconds,
+                        bytes_written, random steps drawn, queue_wait seconds and write_wait seconds (compute
+                        blocked on the background writer).
+    """
+    if _STARTED is not None and "task" in unit:
+        _STARTED.put((unit["task"], os.getpid()))
+    queue_wait  : float = time.time() - unit["submitted"]
+    wall        : float = time.perf_counter()
+    cpu         : float = time.process_time()
+    
+    moments         : Optional[RunningMoments]  = None
+    sketch          : Optional[QuantileSketch]  = None
+    endpoints       : EndpointHistogram         = _endpoints(unit)
+    first_passage   : Optional[FirstPassage]    = None
+    bytes_written   : int                       = 0
+    write_wait      : float                     = 0.0
+    first           : int                       = unit["first_segment"]
+    steps           : int                       = unit["count"] * (
+        unit["segments"][-1] - segment_bounds(unit["segments"])[first][0]
+    )
+    
+    if unit["barriers"] is not None:
+        data, first_passage, endpoints, steps = _barrier_unit(unit)
+        if unit["keep_data"] == True:
+            bytes_written = _store(unit, [data])
+        if unit["moments"] == True:
+            moments = RunningMoments.from_chunk(data, unit["higher_moments"])
+        if unit["quantiles"] == True:
+            sketch = QuantileSketch.from_chunk(data)
+    elif unit["keep_data"] == False:
+        moments, endpoints, sketch = _unit_moments(unit)
+    else:
+        moments, endpoints, sketch, bytes_written, write_wait = _pipelined_unit(unit)
+    
+    return {
+        "index": unit["index"], "count": unit["count"], "pid": os.getpid(), "moments": moments, "endpoints": endpoints,
+        "quantiles": sketch,
+        "first_passage": first_passage, "wall": time.perf_counter() - wall, "cpu": time.process_time() - cpu,
+        "bytes_written": bytes_written, "steps": steps, "queue_wait": max(queue_wait, 0.0), "write_wait": write_wait
+    }
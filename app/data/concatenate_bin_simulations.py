@@ -7,21 +7,36 @@
 
 # | Internal Imports |-------------------------------------------------------------------------------------------------|
 from bin.binary_manager import BinManager
+from data.sharded_array import ShardedArray, ColumnStackedArray
 
 # | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib import PosixPath
+from typing import Union, Optional
 import numpy as np
 # |--------------------------------------------------------------------------------------------------------------------|
 
-def concat_simulations() -> np.ndarray:
+def concat_simulations(lazy: bool = True, path_: Optional[PosixPath] = None) -> Union[ShardedArray, np.ndarray]:
     """
-    Concatenates binary data from multiple files into a single NumPy array.
+    Concatenates binary data from multiple files.
+    Args:
+        lazy (bool): Whether a virtual concatenated view over the memory-mapped shards is returned instead of
+                     one NumPy array loaded in RAM.
+        path_ (Optional[PosixPath]): Directory of the binary files. Defaults to app/bin.
     Returns:
-        np.ndarray: Concatenated binary data.
+        Union[ShardedArray, np.ndarray]: Concatenated binary data.
     """
-    bin_manager: BinManager = BinManager()
+    bin_manager: BinManager = BinManager(path_)
     bin_data: list[np.ndarray] = []
-    # Iterate over the list of binary files and retrieve their data
-    for filename in bin_manager.bin_files_list():
-        bin_data.append(bin_manager.get(filename))
+    # Iterate over the binary files in name order (shard order) and retrieve their data (memory-mapped for native
+    # array files). The column segments of a run extended in time (Shard000000_001, ...) follow their shard and
+    # are joined to it column-wise.
+    segments: dict[str, list[np.ndarray]] = {}
+    for filename in sorted(bin_manager.bin_files_list()):
+        segments.setdefault(filename.split("_")[0], []).append(bin_manager.get(filename))
+    for parts in segments.values():
+        bin_data.append(parts[0] if len(parts) == 1 else ColumnStackedArray(parts))
+    
+    if lazy == True:
+        return ShardedArray(bin_data)
     # Concatenate the binary data into a single NumPy array
     return np.concatenate(bin_data)
\ No newline at end of file
@@ -0,0 +1,171 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                         app/data/sharded_array.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from typing import Any, Iterator, Optional
+import numpy as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+class ShardedArray(object):
+    def __init__(self, shards: list[np.ndarray]) -> None:
+        """
+        Virtual concatenation (along axis 0) of a list of arrays, usually np.memmap shards. Nothing is copied
+        until the array is indexed, and indexing only reads the selected part of each shard.
+        Args:
+            shards (list[np.ndarray]): Arrays with the same shape except for the first axis.
+        """
+        if len(shards) == 0:
+            raise ValueError("ShardedArray needs at least one shard")
+        
+        self.shards     : list[np.ndarray]  = shards
+        self.offsets    : np.ndarray        = np.cumsum([0] + [s.shape[0] for s in shards])
+        self.shape      : tuple[int, ...]   = (int(self.offsets[-1]),) + tuple(shards[0].shape[1:])
+        self.dtype      : np.dtype          = np.result_type(*[s.dtype for s in shards])
+    
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+    
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+    
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+    
+    def __len__(self) -> int:
+        return self.shape[0]
+    
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for shard in self.shards:
+            yield from shard
+    
+    def iter_shards(self) -> Iterator[np.ndarray]:
+        """
+        Iterates over the shards in order, without copying them.
+        """
+        yield from self.shards
+    
+    def __array__(self, dtype: Optional[np.dtype] = None, copy: Optional[bool] = None) -> np.ndarray:
+        data: np.ndarray = np.concatenate(self.shards).astype(self.dtype, copy=False)
+        return data if dtype is None else data.astype(dtype, copy=False)
+    
+    def _locate(self, row: int) -> tuple[int, int]:
+        """
+        Converts a global row index to (shard index, local row index).
+        """
+        if row < 0:
+            row += self.shape[0]
+        if not 0 <= row < self.shape[0]:
+            raise IndexError(f"index {row} is out of bounds for axis 0 with size {self.shape[0]}")
+        shard: int = int(np.searchsorted(self.offsets, row, side="right")) - 1
+        return shard, row - int(self.offsets[shard])
+    
+    def __getitem__(self, key: Any) -> np.ndarray:
+        key     : tuple = key if isinstance(key, tuple) else (key,)
+        rows    : Any   = key[0] if len(key) > 0 else slice(None)
+        rest    : tuple = key[1:]
+        
+        if isinstance(rows, (int, np.integer)):
+            shard, local = self._locate(int(rows))
+            return self.shards[shard][(local,) + rest]
+        
+        if isinstance(rows, slice) and rows.step in (None, 1):
+            start, stop, _ = rows.indices(self.shape[0])
+            pieces: list[np.ndarray] = []
+            for n, shard in enumerate(self.shards):
+                lo, hi = int(self.offsets[n]), int(self.offsets[n+1])
+                if hi > start and lo < stop:
+                    pieces.append(np.asarray(shard[(slice(max(start, lo) - lo, min(stop, hi) - lo),) + rest]))
+            if len(pieces) == 0:
+                return np.asarray(self.shards[0][(slice(0, 0),) + rest])
+            return np.concatenate(pieces)
+        
+        # Fancy/strided row selection: gather shard by shard and restore the requested order.
+        index: np.ndarray = np.arange(self.shape[0])[rows]
+        shard_ids: np.ndarray = np.searchsorted(self.offsets, index, side="right") - 1
+        order: np.ndarray = np.argsort(shard_ids, kind="stable")
+        pieces: list[np.ndarray] = []
+        for n in np.unique(shard_ids):
+            local: np.ndarray = index[order][shard_ids[order] == n] - self.offsets[n]
+            pieces.append(np.asarray(self.shards[n][(local,) + rest]))
+        if len(pieces) == 0:
+            return np.asarray(self.shards[0][(index,) + rest])
+        gathered: np.ndarray = np.concatenate(pieces)
+        result: np.ndarray = np.empty_like(gathered)
+        result[order] = gathered
+        return result
+
+
+class ColumnStackedArray(object):
+    def __init__(self, parts: list[np.ndarray]) -> None:
+        """
+        Virtual concatenation (along axis 1) of the column segments of a shard, written when a run is extended in
+        time. Like ShardedArray, only the selected columns of each segment are read when it is indexed.
+        Args:
+            parts (list[np.ndarray]): Arrays with the same number of rows (and the same trailing axes, e.g. the
+                                      coordinates of walks over step vectors).
+        """
+        if len(parts) == 0:
+            raise ValueError("ColumnStackedArray needs at least one part")
+        
+        self.parts      : list[np.ndarray]  = parts
+        self.offsets    : np.ndarray        = np.cumsum([0] + [p.shape[1] for p in parts])
+        self.shape      : tuple[int, ...]   = (parts[0].shape[0], int(self.offsets[-1])) + tuple(parts[0].shape[2:])
+        self.dtype      : np.dtype          = np.result_type(*[p.dtype for p in parts])
+    
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+    
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+    
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+    
+    def __len__(self) -> int:
+        return self.shape[0]
+    
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for row in range(self.shape[0]):
+            yield self[row]
+    
+    def __array__(self, dtype: Optional[np.dtype] = None, copy: Optional[bool] = None) -> np.ndarray:
+        data: np.ndarray = np.concatenate(self.parts, axis=1).astype(self.dtype, copy=False)
+        return data if dtype is None else data.astype(dtype, copy=False)
+    
+    def __getitem__(self, key: Any) -> np.ndarray:
+        key     : tuple = key if isinstance(key, tuple) else (key,)
+        rows    : Any   = key[0] if len(key) > 0 else slice(None)
+        cols    : Any   = key[1] if len(key) > 1 else slice(None)
+        
+        # Rows and columns are selected independently (outer indexing), each segment only for its own columns.
+        index   : np.ndarray = np.arange(self.shape[1])[cols]
+        flat    : np.ndarray = np.atleast_1d(index)
+        part_ids: np.ndarray = np.searchsorted(self.offsets, flat, side="right") - 1
+        remap   : np.ndarray = np.empty(flat.size, dtype=np.intp)
+        pieces  : list[np.ndarray] = []
+        width   : int = 0
+        for n in np.unique(part_ids):
+            local: np.ndarray = flat[part_ids == n] - self.offsets[n]
+            lo, hi = int(local.min()), int(local.max()) + 1
+            pieces.append(np.asarray(self.parts[n][rows, lo:hi]).astype(self.dtype, copy=False))
+            remap[part_ids == n] = local - lo + width
+            width += hi - lo
+        if len(pieces) == 0:
+            return np.asarray(self.parts[0][rows, 0:0]).astype(self.dtype, copy=False)
+        
+        # The columns are the first axis after the rows (the last one of 2D parts)
+        axis: int = pieces[0].ndim - (len(self.shape) - 1)
+        block: np.ndarray = pieces[0] if len(pieces) == 1 else np.concatenate(pieces, axis=axis)
+        result: np.ndarray = np.take(block, remap, axis=axis)
+        return np.take(result, 0, axis=axis) if index.ndim == 0 else result
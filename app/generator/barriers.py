@@ -0,0 +1,220 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                          app/generator/barriers.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+import  numpy       as np
+from    typing      import Any, Optional, Union
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from    generator.coinflip  import GeneratorRandomWalk
+# |--------------------------------------------------------------------------------------------------------------------|
+
+BARRIER_KINDS: tuple[str, ...] = ("absorbing", "reflecting")
+
+
+class Barriers(object):
+    def __init__(self, lower: Optional[float] = None, upper: Optional[float] = None,
+                 kind: Union[str, tuple[str, str]] = "absorbing") -> None:
+        """
+        Bounds of the walks of a run. The walks start at 0, which must lie strictly between the absorbing bounds
+        (a walk starting on one would be recorded as absorbed at t=1) and between the reflecting ones.
+        Args:
+            lower (Optional[float]): Lower bound, None for no bound.
+            upper (Optional[float]): Upper bound, None for no bound.
+            kind (Union[str, tuple[str, str]]): "absorbing" (the walk stops the first time it reaches the bound)
+                                                or "reflecting" (a step beyond the bound is mirrored back),
+                                                for both bounds or as (lower kind, upper kind).
+        """
+        kinds: tuple[str, str] = (kind, kind) if isinstance(kind, str) else tuple(kind)
+        for k in kinds:
+            if k not in BARRIER_KINDS:
+                raise ValueError(f"kind must be one of {BARRIER_KINDS}")
+        if lower is not None and upper is not None and lower >= upper:
+            raise ValueError(f"the lower bound {lower} must be below the upper bound {upper}")
+        for side, bound, k in (("lower", lower, kinds[0]), ("upper", upper, kinds[1])):
+            if bound is None:
+                continue
+            inside: bool = (bound < 0 if side == "lower" else bound > 0) if k == "absorbing" else \
+                (bound <= 0 if side == "lower" else bound >= 0)
+            if inside == False:
+                where: str = "on or beyond" if k == "absorbing" else "beyond"
+                raise ValueError(f"the walks start at 0, {where} the {k} {side} bound {bound}")
+        
+        self.lower      : Optional[float]   = lower
+        self.upper      : Optional[float]   = upper
+        self.lower_kind : str               = kinds[0]
+        self.upper_kind : str               = kinds[1]
+    
+    def to_dict(self) -> dict[str, Any]:
+        """
+        JSON serializable form, for the work units and the cache keys.
+        """
+        return {"lower": self.lower, "upper": self.upper, "kind": [self.lower_kind, self.upper_kind]}
+    
+    @classmethod
+    def from_dict(cls, params: dict[str, Any]) -> "Barriers":
+        return cls(params["lower"], params["upper"], tuple(params["kind"]))
+    
+    def _bound(self, side: str, kind: str) -> Optional[float]:
+        bound: Optional[float] = self.lower if side == "lower" else self.upper
+        kind_: str = self.lower_kind if side == "lower" else self.upper_kind
+        return bound if kind_ == kind else None
+    
+    @property
+    def absorbing(self) -> bool:
+        return self._bound("lower", "absorbing") is not None or self._bound("upper", "absorbing") is not None
+    
+    @property
+    def reflecting(self) -> bool:
+        return self._bound("lower", "reflecting") is not None or self._bound("upper", "reflecting") is not None
+    
+    def crosses_reflecting(self, walk: np.ndarray) -> np.ndarray:
+        """
+        Rows of a block of free positions that go beyond a reflecting bound.
+        """
+        lower, upper = self._bound("lower", "reflecting"), self._bound("upper", "reflecting")
+        out: np.ndarray = np.zeros(walk.shape[0], dtype=bool)
+        if lower is not None:
+            out |= (walk < lower).any(axis=-1)
+        if upper is not None:
+            out |= (walk > upper).any(axis=-1)
+        return out
+    
+    def reflect(self, position: np.ndarray) -> np.ndarray:
+        """
+        Mirrors positions beyond the reflecting bounds back inside (repeatedly, for steps wider than the corridor).
+        """
+        lower, upper = self._bound("lower", "reflecting"), self._bound("upper", "reflecting")
+        position: np.ndarray = position.copy()
+        while True:
+            below: np.ndarray = position < lower if lower is not None else np.zeros(position.shape, dtype=bool)
+            above: np.ndarray = position > upper if upper is not None else np.zeros(position.shape, dtype=bool)
+            if not (below.any() or above.any()):
+                return position
+            if below.any():
+                position[below] = 2 * lower - position[below]
+            if above.any():
+                position[above] = 2 * upper - position[above]
+    
+    def absorbed(self, walk: np.ndarray) -> np.ndarray:
+        """
+        Side of the absorbing bound reached by each position: -1 lower, 1 upper, 0 none.
+        """
+        lower, upper = self._bound("lower", "absorbing"), self._bound("upper", "absorbing")
+        side: np.ndarray = np.zeros(walk.shape, dtype=np.int8)
+        if lower is not None:
+            side[walk <= lower] = -1
+        if upper is not None:
+            side[walk >= upper] = 1
+        return side
+
+
+class BarrierRandomWalk(GeneratorRandomWalk):
+    def __init__(self, samples: int, prob: list[float], sample_space: list[Union[float, int]], barriers: Barriers,
+                 rng: Optional[np.random.Generator] = None, block: int = 64) -> None:
+        """
+        Random walks between barriers, started at 0. The steps are drawn in blocks of `block` time steps for the
+        walks that are still running only: an absorbed walk stops consuming random numbers and compute, so a run
+        gets faster as the walks terminate.
+        Args:
+            samples (int): Horizon of the walks.
+            prob (list[float]): Probability of each value of the sample space.
+            sample_space (list[Union[float, int]]): Possible values for each step.
+            barriers (Barriers): Bounds of the walks.
+            rng (Optional[np.random.Generator]): Independent random stream. If None, the global np.random state
+                                                 is used.
+            block (int): Time steps drawn at a time.
+        """
+        super().__init__(samples, prob, sample_space, rng)
+        if self.time_axis != -1:
+            raise ValueError("barriers bound scalar walks, the sample space must not hold step vectors")
+        self.barriers   : Barriers  = barriers
+        self.block      : int       = block
+    
+    def _reflected(self, start: np.ndarray, steps: np.ndarray) -> np.ndarray:
+        """
+        Positions of walks that hit a reflecting bound in a block, step by step (vectorized over the walks).
+        """
+        walk: np.ndarray = np.empty(steps.shape, dtype=start.dtype)
+        position: np.ndarray = start
+        for j in range(steps.shape[1]):
+            position = self.barriers.reflect(position + steps[:, j])
+            walk[:, j] = position
+        return walk
+    
+    def run_batch(self, simulations: int, keep_paths: bool = True) -> None:
+        """
+        Runs `simulations` walks. Sets self.hit_time (steps until absorption, -1 for the walks that survive the
+        horizon), self.hit_side (-1 lower, 1 upper, 0 survived), self.final (last position) and, with keep_paths,
+        self.data: the (simulations, samples) positions, held at the absorption position after the hit.
+        self.steps_drawn counts the random steps actually drawn.
+        Args:
+            simulations (int): The number of walks.
+            keep_paths (bool): Whether the positions are kept (the first passage statistics are always kept).
+        """
+        work        : np.dtype      = np.dtype(np.int64) if self.path_dtype.kind == "i" else np.dtype(np.float64)
+        position    : np.ndarray    = np.zeros(simulations, dtype=work)
+        active      : np.ndarray    = np.arange(simulations)
+        
+        self.hit_time   : np.ndarray            = np.full(simulations, -1, dtype=np.int64)
+        self.hit_side   : np.ndarray            = np.zeros(simulations, dtype=np.int8)
+        self.data       : Optional[np.ndarray]  = (
+            np.empty((simulations, self.samples), dtype=self.path_dtype) if keep_paths else None
+        )
+        self.steps_drawn: int                   = 0
+        
+        t: int = 0
+        while t < self.samples and active.size > 0:
+            width: int = min(self.block, self.samples - t)
+            steps: np.ndarray = self.rng.choice(self.space_array, size=(active.size, width), p=self.prob).astype(work)
+            self.steps_drawn += steps.size
+            walk: np.ndarray = position[active][:, None] + np.cumsum(steps, axis=1)
+            
+            if self.barriers.reflecting:
+                rows: np.ndarray = np.flatnonzero(self.barriers.crosses_reflecting(walk))
+                if rows.size > 0:
+                    walk[rows] = self._reflected(position[active[rows]], steps[rows])
+            
+            hit: np.ndarray = np.zeros(active.size, dtype=bool)
+            if self.barriers.absorbing:
+                side: np.ndarray = self.barriers.absorbed(walk)
+                hit = (side != 0).any(axis=1)
+                rows: np.ndarray = np.flatnonzero(hit)
+                first: np.ndarray = np.argmax(side[rows] != 0, axis=1)
+                self.hit_time[active[rows]] = t + first + 1
+                self.hit_side[active[rows]] = side[rows, first]
+                # Hold the absorbed walks at their absorption position until the end of the block
+                stop: np.ndarray = walk[rows, first]
+                walk[rows] = np.where(np.arange(width) >= first[:, None], stop[:, None], walk[rows])
+            
+            if self.data is not None:
+                self.data[active, t:t + width] = walk
+                if hit.any():
+                    self.data[active[hit], t + width:] = walk[hit, -1:]
+            position[active] = walk[:, -1]
+            active = active[~hit]
+            t += width
+        
+        self.final: np.ndarray = position.astype(self.path_dtype)
+    
+    def run(self) -> None:
+        """
+        Runs a single walk (self.data holds its positions).
+        """
+        self.run_batch(1)
+        self.data = self.data[0]
+    
+    def get_array(self) -> np.ndarray:
+        """
+        Steps of the walks (0 after the absorption).
+        """
+        return np.diff(self.data, axis=-1, prepend=0).astype(self.step_dtype)
+    
+    def get_cum_array(self) -> np.ndarray:
+        """
+        Positions of the walks.
+        """
+        return self.data
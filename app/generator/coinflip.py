@@ -7,23 +7,40 @@
 
 # | External Imports |-------------------------------------------------------------------------------------------------|
 import  numpy       as np
-from    typing      import Union
+from    typing      import Union, Optional
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from    generator.dtypes    import step_dtype, path_dtype
+from    generator.lattice   import step_dim, is_vector_space
 # |--------------------------------------------------------------------------------------------------------------------|
 
 class GeneratorRandomWalk(object):
-    def __init__(self, samples: int, prob: list[float], sample_space: list[Union[float, int]]) -> None:
+    def __init__(self, samples: int, prob: list[float], sample_space: list[Union[float, int]],
+                 rng: Optional[np.random.Generator] = None) -> None:
         """
         Initialize the GeneratorRandomWalk instance.
         Args:
             samples (int): Quantity of samples in the simulation.
-            sample_space: (list[Union[float, int]]): Possible values for each random sample
+            sample_space: (list[Union[float, int]]): Possible values for each random sample, or a list of step
+                                                     vectors for walks in several dimensions (e.g. the 4 moves of
+                                                     the square lattice, see generator/lattice.py).
             prob (list[float]): if sample_space = [-1, 1] -> probability of each sample 
                                 being -1 or 1. In the list [p(-1), p(1)]
+            rng (Optional[np.random.Generator]): Independent random stream. If None, a fresh generator
+                                                 (np.random.default_rng()) is used: the legacy global state
+                                                 cannot draw rows of a vector sample space.
 
         """
         self.sample_space   : list[Union[float, int]]   = sample_space
         self.samples        : int                       = samples
         self.prob           : list[float]               = prob
+        self.rng            : np.random.Generator       = np.random.default_rng() if rng is None else rng
+        
+        self.step_dtype     : np.dtype                  = step_dtype(sample_space)
+        self.path_dtype     : np.dtype                  = path_dtype(sample_space, samples)
+        self.space_array    : np.ndarray                = np.asarray(sample_space, dtype=self.step_dtype)
+        self.dim            : int                       = step_dim(sample_space)
+        # Time is the last axis of scalar walks and the one before the coordinates of vector walks
+        self.time_axis      : int                       = -2 if is_vector_space(sample_space) else -1
         
     def run(self) -> None:
         """
@@ -32,8 +49,19 @@ class GeneratorRandomWalk(object):
         """
         self.data: list[np.float64] = []
         for _ in range(self.samples):
-            self.data.append(np.random.choice(self.sample_space, p=self.prob))
-        self.data: np.ndarray = np.array(self.data)
+            self.data.append(self.rng.choice(self.space_array, p=self.prob))
+        self.data: np.ndarray = np.array(self.data, dtype=self.step_dtype)
+    
+    def run_batch(self, simulations: int) -> None:
+        """
+        Creates a (simulations, self.samples) array in a single vectorized draw. Each row is an
+        independent simulation, equivalent to calling self.run() simulations times. The array has the
+        narrowest dtype of the sample space (int8 for [-1, 1]). Vector steps are drawn as whole rows of the
+        sample space, giving a (simulations, self.samples, dim) array.
+        Args:
+            simulations (int): The number of simulations (rows) to be drawn.
+        """
+        self.data: np.ndarray = self.rng.choice(self.space_array, size=(simulations, self.samples), p=self.prob)
     
     def get_array(self) -> np.ndarray:
         """
@@ -46,8 +74,9 @@ class GeneratorRandomWalk(object):
     def get_cum_array(self) -> np.ndarray:
         """
         returns the accumulated simulation array. Example: if sample_space = [-1, 1] [-1, 1, 1, -1, ..., -1]
+        The accumulation is done along the time axis, so batched arrays are accumulated per simulation (and per
+        coordinate for vector steps), in the narrowest dtype that holds every position (see generator/dtypes.py).
         Returns:
             np.ndarray: The accumulated simulation array
         """
-        return np.cumsum(self.data)
-    
\ No newline at end of file
+        return np.cumsum(self.data, axis=self.time_axis, dtype=self.path_dtype)
@@ -7,13 +7,15 @@
 
 # | Internal Imports |-------------------------------------------------------------------------------------------------|
 from generator.coinflip import GeneratorRandomWalk
+from generator.barriers import Barriers, BarrierRandomWalk
 # | External Imports |-------------------------------------------------------------------------------------------------|
 import numpy as np
-from typing import Union
+from typing import Union, Optional
 # |--------------------------------------------------------------------------------------------------------------------|
 
 def coinflip_simulations(samples: int, prob: list[float], simulations: int, cum: bool,
-                         sample_space: Union[float, int]) -> list[np.ndarray]:
+                         sample_space: Union[float, int], batch: bool = True,
+                         rng: Optional[np.random.Generator] = None) -> np.ndarray:
     """
     Generate the coin flip simulation using the GeneratorRandomWalk object n times.
     (n times is provided by the input of the "simulation" function.) 
@@ -24,15 +26,43 @@ def coinflip_simulations(samples: int, prob: list[float], simulations: int, cum:
                             being -1 or 1. In the list [p(-1), p(1)]
         simulations (int): The number of simulations to be run.
         cumulative (bool): Whether the simulation results will be accumulated or not.
+        batch (bool): Whether the whole chunk is drawn with a single vectorized call (GeneratorRandomWalk.run_batch)
+                      or one simulation at a time (GeneratorRandomWalk.run).
+        rng (Optional[np.random.Generator]): Independent random stream. If None, the global np.random state is used.
 
     Returns:
         np.ndarray: The chunk of simulations
     """
-    generator: GeneratorRandomWalk = GeneratorRandomWalk(samples, prob, sample_space)
+    generator: GeneratorRandomWalk = GeneratorRandomWalk(samples, prob, sample_space, rng)
+    
+    if batch == True:
+        generator.run_batch(simulations)
+        return generator.get_cum_array() if cum == True else generator.get_array()
     
     sim_chunk: list[np.ndarray] = []
     for _ in range(simulations):
         generator.run()
         sim_chunk.append(generator.get_cum_array()) if cum == True else sim_chunk.append(generator.get_array())
     
-    return np.array(sim_chunk)
\ No newline at end of file
+    return np.array(sim_chunk)
+
+def barrier_simulations(samples: int, prob: list[float], simulations: int, sample_space: Union[float, int],
+                        barriers: Barriers, keep_paths: bool = True,
+                        rng: Optional[np.random.Generator] = None) -> BarrierRandomWalk:
+    """
+    Runs a chunk of walks between barriers, stopping the absorbed walks early (see BarrierRandomWalk).
+    Args:
+        samples (int): Horizon of the walks.
+        prob (list[float]): Probability of each value of the sample space.
+        simulations (int): The number of walks.
+        sample_space (Union[float, int]): Possible values for each step.
+        barriers (Barriers): Bounds of the walks.
+        keep_paths (bool): Whether the positions are kept, or only the first passage statistics.
+        rng (Optional[np.random.Generator]): Independent random stream. If None, the global np.random state is used.
+
+    Returns:
+        BarrierRandomWalk: The generator holding the positions (data), hit_time, hit_side and final positions.
+    """
+    generator: BarrierRandomWalk = BarrierRandomWalk(samples, prob, sample_space, barriers, rng)
+    generator.run_batch(simulations, keep_paths)
+    return generator
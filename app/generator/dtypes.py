@@ -0,0 +1,75 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                            app/generator/dtypes.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from typing import Union
+import numpy as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+INT_DTYPES: tuple[np.dtype, ...] = (np.dtype(np.int8), np.dtype(np.int16), np.dtype(np.int32), np.dtype(np.int64))
+
+
+def is_integer_space(sample_space: list[Union[float, int]]) -> bool:
+    """
+    Checks if every value of the sample space is an integer (even if given as float, e.g. 1.0).
+    Args:
+        sample_space (list[Union[float, int]]): Possible values for each random sample.
+    Returns:
+        bool: True if all values are integers.
+    """
+    values: np.ndarray = np.asarray(sample_space)
+    if values.dtype.kind in "iub":
+        return True
+    return bool(np.all(np.isfinite(values)) and np.all(values == np.round(values)))
+
+
+def smallest_int_dtype(bound: int) -> np.dtype:
+    """
+    Smallest signed integer dtype that holds every value in [-bound, bound].
+    Args:
+        bound (int): Largest absolute value to be represented.
+    Returns:
+        np.dtype: int8, int16, int32 or int64.
+    """
+    for dtype in INT_DTYPES:
+        if bound <= np.iinfo(dtype).max:
+            return dtype
+    raise OverflowError(f"{bound} does not fit in a 64-bit integer")
+
+
+def step_dtype(sample_space: list[Union[float, int]]) -> np.dtype:
+    """
+    Narrowest dtype that holds every value of the sample space exactly: int8 for ±1 steps, float32 only if the
+    values round-trip through float32, float64 otherwise.
+    Args:
+        sample_space (list[Union[float, int]]): Possible values for each random sample.
+    Returns:
+        np.dtype: The dtype of the step arrays.
+    """
+    values: np.ndarray = np.asarray(sample_space)
+    if is_integer_space(sample_space):
+        return smallest_int_dtype(int(np.max(np.abs(values))) if values.size else 0)
+    values = values.astype(np.float64)
+    return np.dtype(np.float32) if np.all(values.astype(np.float32) == values) else np.dtype(np.float64)
+
+
+def path_dtype(sample_space: list[Union[float, int]], samples: int) -> np.dtype:
+    """
+    Narrowest dtype that holds every cumulative position exactly: the smallest int type for
+    max|sample_space| x samples, float64 for non-integer sample spaces (float32 sums drift after a few thousand
+    steps). With step vectors the bound holds for each coordinate, so every axis is stored in the same
+    narrow dtype.
+    Args:
+        sample_space (list[Union[float, int]]): Possible values for each random sample.
+        samples (int): Quantity of samples in the simulation.
+    Returns:
+        np.dtype: The dtype of the accumulated arrays.
+    """
+    values: np.ndarray = np.asarray(sample_space)
+    if is_integer_space(sample_space):
+        return smallest_int_dtype((int(np.max(np.abs(values))) if values.size else 0) * max(samples, 1))
+    return np.dtype(np.float64)
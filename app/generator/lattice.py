@@ -0,0 +1,58 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                           app/generator/lattice.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from typing import Union
+import numpy as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# A sample space is either a list of scalar steps ([-1, 1]) or a list of step vectors of the same length
+# ([[1, 0], [-1, 0], [0, 1], [0, -1]]). Walks over vector steps are stored as (simulations, samples, dim) arrays.
+
+
+def step_dim(sample_space: list[Union[float, int, list[Union[float, int]]]]) -> int:
+    """
+    Dimension of the walks of a sample space: 1 for scalar steps, the length of the vectors otherwise.
+    Args:
+        sample_space (list[Union[float, int, list[Union[float, int]]]]): Possible values for each step.
+    Returns:
+        int: The dimension.
+    """
+    values: np.ndarray = np.asarray(sample_space)
+    if values.ndim == 1:
+        return 1
+    if values.ndim != 2:
+        raise ValueError("the sample space must be a list of scalars or a list of vectors of the same length")
+    return values.shape[1]
+
+
+def is_vector_space(sample_space: list[Union[float, int, list[Union[float, int]]]]) -> bool:
+    """
+    Checks if the steps are vectors, even 1-dimensional ones ([[-1], [1]]): their walks keep the last axis.
+    """
+    return np.asarray(sample_space).ndim == 2
+
+
+def lattice_steps(dim: int) -> list[list[int]]:
+    """
+    Nearest neighbor moves of the hypercubic lattice Z^dim: +-1 along each axis (4 moves in 2D, 6 in 3D).
+    Args:
+        dim (int): Dimension of the lattice.
+    Returns:
+        list[list[int]]: The 2*dim step vectors.
+    """
+    if dim < 1:
+        raise ValueError("dim must be at least 1")
+    eye: np.ndarray = np.eye(dim, dtype=int)
+    return np.concatenate([eye, -eye]).tolist()
+
+
+def uniform_prob(sample_space: list[Union[float, int, list[Union[float, int]]]]) -> list[float]:
+    """
+    Same probability for every step of the sample space (the symmetric walk).
+    """
+    return [1 / len(sample_space)] * len(sample_space)
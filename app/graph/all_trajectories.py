@@ -9,25 +9,44 @@
 import numpy as np
 import json
 
+from typing             import Optional, Union
+
 import matplotlib.pyplot as plt
 
 from matplotlib.axes    import Axes
 from matplotlib.figure  import Figure
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis.moments   import RunningMoments
+from analysis.context   import AnalysisContext, as_context
+from graph.trajectories import plot_lines, plot_density, plot_lod_lines, plot_fan, axes_pixels, TRAJECTORY_MODES
 # |--------------------------------------------------------------------------------------------------------------------|
 
 class Graph_AllTrajectories(object):
-    def __init__(self, data: np.ndarray, sample_space: list[int], prob: list[float]) -> None:
+    def __init__(self, data: Union[np.ndarray, AnalysisContext], sample_space: Optional[list[int]] = None,
+                 prob: Optional[list[float]] = None, moments: Optional[RunningMoments] = None,
+                 mode: str = "lines") -> None:
         """
         Initialize Graph_AllTrajectories object.
 
         Args:
-            data (np.ndarray): Data array containing trajectories.
+            data (Union[np.ndarray, AnalysisContext]): Data array containing trajectories, or an analysis context
+                                                       shared with the other graphs (then the other data
+                                                       arguments are taken from it and must not be given).
             sample_space (List[int]): List of sample space values.
             prob (List[float]): List of probabilities.
+            moments (Optional[RunningMoments]): Precomputed moments per time step. If None, they are
+                                                computed from data.
+            mode (str): "lines" draws up to variable_ram_controller trajectories as one collection, "density"
+                        draws every trajectory as a (t, position) histogram. Horizons longer than the axes are
+                        wide in pixels are drawn from the level of detail of the context that matches the width.
         """
-        self.data           : np.ndarray    = data
-        self.sample_space   : list[int]     = sample_space
-        self.prob           : list[float]   = prob
+        if mode not in TRAJECTORY_MODES:
+            raise ValueError(f"mode must be one of {TRAJECTORY_MODES}")
+        self.context        : AnalysisContext           = as_context(data, sample_space, prob, moments)
+        self.data           : np.ndarray                = self.context.data
+        self.sample_space   : list[int]                 = self.context.sample_space
+        self.prob           : list[float]               = self.context.prob
+        self.mode           : str                       = mode
         self.FIG            : tuple[Figure, tuple[Axes, Axes]] = plt.subplots(1, 2, figsize=(12, 6))
 
         self.variable_ram_controller: int = 5000
@@ -36,11 +55,19 @@ class Graph_AllTrajectories(object):
         """
         Plot data for the first figure.
         """
-        x: np.ndarray = np.arange(self.data.shape[1])
-        for i in range(self.data.shape[0]):
-            if i == self.variable_ram_controller:
-                break
-            self.FIG[1][0].plot(x, self.data[i, :], alpha=0.01, color="b")
+        width: Optional[int] = self.context.lod_width(axes_pixels(self.FIG[1][0]))
+        if width is not None and self.mode == "density":
+            plot_density(
+                self.FIG[1][0], self.data, histogram=self.context.lod_histogram(width), samples=self.context.samples
+            )
+        elif width is not None:
+            plot_lod_lines(
+                self.FIG[1][0], self.context.lod, width, self.variable_ram_controller, alpha=0.01, color="b"
+            )
+        elif self.mode == "density":
+            plot_density(self.FIG[1][0], self.data, histogram=self.context.trajectory_histogram)
+        else:
+            plot_lines(self.FIG[1][0], self.context.trajectories, self.variable_ram_controller, alpha=0.01, color="b")
     
     def _fig1_infos(self) -> None:
         """
@@ -52,8 +79,8 @@ class Graph_AllTrajectories(object):
         sample_space_string : str = json.dumps(self.sample_space)
         prob_string         : str = json.dumps(self.prob)
         
-        sim_string  : str = f"Sim: [{self.data.shape[0]}]"
-        t_string    : str = f"{r'$t$'}: [{self.data.shape[1]}]"
+        sim_string  : str = f"Sim: [{self.context.shape[0]}]"
+        t_string    : str = f"{r'$t$'}: [{self.context.shape[1]}]"
         E_string    : str = f"{r'$E$'}: {sample_space_string}"
         P_string    : str = f"{r'$P$'}: {prob_string}"
         
@@ -64,20 +91,27 @@ class Graph_AllTrajectories(object):
         """
         Calculate data for the second figure.
         """
-        self.std    : np.ndarray = np.std(self.data, axis=0)
-        self.mean   : np.ndarray = np.mean(self.data, axis=0)
+        self.std    : np.ndarray = self.context.std
+        self.mean   : np.ndarray = self.context.mean
     
     def _fig2_data(self) -> None:
         """
         Plot data for the second figure.
         """
-        x: np.ndarray = np.arange(self.data.shape[1])
+        # One point per bucket of the level of detail on long horizons, the moments are exact at these steps
+        width: Optional[int] = self.context.lod_width(axes_pixels(self.FIG[1][1]))
+        x: np.ndarray = np.arange(self.context.shape[1]) if width is None else self.context.lod.columns(width)
         label1: str = r"$\mu(t) + \sigma(t)$"
         label2: str = r"$\mu(t) + 3\sigma(t)$"
         label3: str = r"$\mu(t)$"
-        self.FIG[1][1].plot(x, self.mean+self.std, '-o', color="red", markersize=0.5, alpha=0.5, label=label1)
-        self.FIG[1][1].plot(x, self.mean+3*self.std, '-o', color="orange", markersize=0.5, alpha=0.5, label=label2)
-        self.FIG[1][1].plot(x, self.mean, color="r", alpha=0.5, linestyle="dashed", label=label3)
+        mean, std = self.mean[x], self.std[x]
+        self.FIG[1][1].plot(x, mean+std, '-o', color="red", markersize=0.5, alpha=0.5, label=label1)
+        self.FIG[1][1].plot(x, mean+3*std, '-o', color="orange", markersize=0.5, alpha=0.5, label=label2)
+        self.FIG[1][1].plot(x, mean, color="r", alpha=0.5, linestyle="dashed", label=label3)
+        # Quantile bands of the positions, without the Gaussian assumption of the sigma lines
+        if self.context.quantile_sketch is not None:
+            sketch = self.context.quantile_sketch
+            plot_fan(self.FIG[1][1], sketch.columns, sketch.bands(), color="b", label="q ")
     
     def _fig2_infos(self) -> None:
         """
@@ -91,7 +125,7 @@ class Graph_AllTrajectories(object):
         eq2: str = r'$\mu(t)=$'
         eq3: str = r'$\sigma(t)=$'
         
-        st1: str = f"{eq1}{self.data.shape[1]}"
+        st1: str = f"{eq1}{self.context.shape[1]}"
         st2: str = f"{eq2}{round(self.mean[-1], 4)}"
         st3: str = f"{eq3}{round(self.std[-1], 4)}"
         
@@ -12,26 +12,52 @@ import json
 
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
-from scipy.stats import gaussian_kde, norm
 
 from matplotlib.axes    import Axes
 from matplotlib.figure  import Figure
+
+from typing             import Optional, Union
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis.moments   import RunningMoments
+from analysis.exact     import ExactDistribution
+from graph.trajectories import plot_lines, plot_density, plot_lod_lines, axes_pixels, TRAJECTORY_MODES
+from analysis.context   import AnalysisContext, as_context
 # |--------------------------------------------------------------------------------------------------------------------|
 
 
 class Distribution(object):
-    def __init__(self, data: np.ndarray, sample_space: list[str], prob: list[float]) -> None:
+    def __init__(self, data: Union[np.ndarray, AnalysisContext], sample_space: Optional[list[int]] = None,
+                 prob: Optional[list[float]] = None, moments: Optional[RunningMoments] = None,
+                 exact: Optional[ExactDistribution] = None,
+                 mode: str = "lines", bw_method: Optional[Union[str, float]] = None) -> None:
         """
         Initialize Distribution object.
 
         Args:
-            data (np.ndarray): Data array containing trajectories.
+            data (Union[np.ndarray, AnalysisContext]): Data array containing trajectories, or an analysis context
+                                                       shared with the other graphs (then the other data
+                                                       arguments are taken from it and must not be given).
             sample_space (List[int]): List of sample space values.
             prob (List[float]): List of probabilities.
-        """
-        self.data           : np.ndarray    = data
-        self.sample_space   : list[int]     = sample_space
-        self.prob           : list[float]   = prob
+            moments (Optional[RunningMoments]): Precomputed moments per time step. If None, they are
+                                                computed from data.
+            exact (Optional[ExactDistribution]): If given, the exact P(E, t) is overlaid on the numerical pdf.
+            mode (str): "lines" draws up to variable_ram_controller trajectories as one collection, "density"
+                        draws every trajectory as a (t, position) histogram. Horizons longer than the axes are
+                        wide in pixels are drawn from the level of detail of the context that matches the width.
+            bw_method (Optional[Union[str, float]]): KDE bandwidth, "scott", "silverman" or a fixed factor
+                                                     (0.25 if None). Set it on the analysis context when one
+                                                     is given.
+        """
+        if mode not in TRAJECTORY_MODES:
+            raise ValueError(f"mode must be one of {TRAJECTORY_MODES}")
+        self.context        : AnalysisContext               = as_context(
+            data, sample_space, prob, moments, exact, bw_method
+        )
+        self.data           : np.ndarray                    = self.context.data
+        self.sample_space   : list[int]                     = self.context.sample_space
+        self.prob           : list[float]                   = self.context.prob
+        self.mode           : str                           = mode
         
         self.fig1_ax1, self.fig1_ax2v, self.fig1 = self._define_fig1()
         
@@ -56,24 +82,30 @@ class Distribution(object):
         """
         Plot graph 1 data.
         """
-        x: np.ndarray = np.arange(self.data.shape[1])
-        for i in range(self.data.shape[0]):
-            if i == self.variable_ram_controller:
-                break
-            self.fig1_ax1.plot(x, self.data[i, :], alpha=0.01, color="b")
+        width: Optional[int] = self.context.lod_width(axes_pixels(self.fig1_ax1))
+        if width is not None and self.mode == "density":
+            plot_density(
+                self.fig1_ax1, self.data, histogram=self.context.lod_histogram(width), samples=self.context.samples
+            )
+        elif width is not None:
+            plot_lod_lines(self.fig1_ax1, self.context.lod, width, self.variable_ram_controller, alpha=0.01, color="b")
+        elif self.mode == "density":
+            plot_density(self.fig1_ax1, self.data, histogram=self.context.trajectory_histogram)
+        else:
+            plot_lines(self.fig1_ax1, self.context.trajectories, self.variable_ram_controller, alpha=0.01, color="b")
     
     @staticmethod
-    def norm(x: float, mean: float, std: float) -> float:
+    def norm(x: Union[float, np.ndarray], mean: float, std: float) -> Union[float, np.ndarray]:
         """
-        Compute the normal distribution probability density function.
+        Compute the normal distribution probability density function (vectorized over x).
 
         Args:
-            x (float): Input value.
+            x (Union[float, np.ndarray]): Input value(s).
             mean (float): Mean of the distribution.
             std (float): Standard deviation of the distribution.
 
         Returns:
-            float: Probability density function value.
+            Union[float, np.ndarray]: Probability density function value(s).
         """
         exp = (1 / (std * np.sqrt(2 * np.pi))) * np.exp(-((x - mean) ** 2) / (2 * std ** 2))
         return exp
@@ -82,17 +114,15 @@ class Distribution(object):
         """
         Plot graph 2 data.
         """
-        y: np.ndarray = self.data[:, -1]
-        x: np.ndarray = np.arange(min(y), max(y))
-        
-        # Compute Gaussian KDE
-        density: gaussian_kde = gaussian_kde(y)
-        density.covariance_factor = lambda : .25
-        density._compute_covariance()
-        y_gauss: np.ndarray = np.array([self.norm(xt, self.mean[-1], self.std[-1]) for xt in x])
+        x       : np.ndarray = self.context.x
+        y_kde   : np.ndarray = self.context.kde
+        y_gauss : np.ndarray = self.context.gaussian
         
-        self.fig1_ax2v.plot(density(x), x, color="b", alpha=0.5, label="pdf numerical")
+        self.fig1_ax2v.plot(y_kde, x, color="b", alpha=0.5, label="pdf numerical")
         self.fig1_ax2v.plot(y_gauss, x, color="red", linestyle="dashed", alpha=0.5, label=r"$pdf(\mu, \sigma)$")
+        if self.context.exact_density is not None:
+            x_exact, y_exact = self.context.exact_density
+            self.fig1_ax2v.plot(y_exact, x_exact, color="g", alpha=0.5, label="pdf exact")
         
         plt.setp(self.fig1_ax2v.get_yticklabels(), visible=False)
     
@@ -100,8 +130,8 @@ class Distribution(object):
         """
         Calculate data for the second figure.
         """
-        self.std    : np.ndarray = np.std(self.data, axis=0)
-        self.mean   : np.ndarray = np.mean(self.data, axis=0)
+        self.std    : np.ndarray = self.context.std
+        self.mean   : np.ndarray = self.context.mean
     
     def graph1_info(self) -> None:
         """
@@ -111,7 +141,7 @@ class Distribution(object):
         eq2: str = r'$\mu(t)=$'
         eq3: str = r'$\sigma(t)=$'
         
-        st1: str = f"{eq1}{self.data.shape[1]}"
+        st1: str = f"{eq1}{self.context.shape[1]}"
         st2: str = f"{eq2}{round(self.mean[-1], 4)}"
         st3: str = f"{eq3}{round(self.std[-1], 4)}"
         
@@ -131,7 +161,7 @@ class Distribution(object):
         self.fig1_ax2v.grid(True, "both")
         
         xlabel_str: str = r"$P(E, t) \rightarrow P(E,$"
-        self.fig1_ax2v.set_xlabel(f"{xlabel_str}{self.data.shape[1]})")
+        self.fig1_ax2v.set_xlabel(f"{xlabel_str}{self.context.shape[1]})")
         self.fig1_ax2v.legend()
         
     def plot(self) -> None:
@@ -148,35 +178,49 @@ class Distribution(object):
 
 
 class DistAnalysis(object):
-    def __init__(self, data: np.ndarray, sample_space: list[str], prob: list[float]) -> None:
+    def __init__(self, data: Union[np.ndarray, AnalysisContext], sample_space: Optional[list[int]] = None,
+                 prob: Optional[list[float]] = None, moments: Optional[RunningMoments] = None,
+                 exact: Optional[ExactDistribution] = None,
+                 bw_method: Optional[Union[str, float]] = None) -> None:
         """
         Initialize Distribution Analysis object.
 
         Args:
-            data (np.ndarray): Data array containing trajectories.
+            data (Union[np.ndarray, AnalysisContext]): Data array containing trajectories, or an analysis context
+                                                       shared with the other graphs (then the other data
+                                                       arguments are taken from it and must not be given).
             sample_space (List[int]): List of sample space values.
             prob (List[float]): List of probabilities.
-        """
-        self.data           : np.ndarray    = data
-        self.sample_space   : list[int]     = sample_space
-        self.prob           : list[float]   = prob
+            moments (Optional[RunningMoments]): Precomputed moments per time step. If None, they are
+                                                computed from data.
+            exact (Optional[ExactDistribution]): If given, the exact P(E, t) is overlaid on the numerical pdf.
+            bw_method (Optional[Union[str, float]]): KDE bandwidth, "scott", "silverman" or a fixed factor
+                                                     (0.25 if None). Set it on the analysis context when one
+                                                     is given.
+        """
+        self.context        : AnalysisContext               = as_context(
+            data, sample_space, prob, moments, exact, bw_method
+        )
+        self.data           : np.ndarray                    = self.context.data
+        self.sample_space   : list[int]                     = self.context.sample_space
+        self.prob           : list[float]                   = self.context.prob
 
         self.mean_std()
         self.xy()
         self.define_fig()
         
     @staticmethod
-    def norm(x: float, mean: float, std: float) -> float:
+    def norm(x: Union[float, np.ndarray], mean: float, std: float) -> Union[float, np.ndarray]:
         """
-        Compute the normal distribution probability density function.
+        Compute the normal distribution probability density function (vectorized over x).
 
         Args:
-            x (float): Input value.
+            x (Union[float, np.ndarray]): Input value(s).
             mean (float): Mean of the distribution.
             std (float): Standard deviation of the distribution.
 
         Returns:
-            float: Probability density function value.
+            Union[float, np.ndarray]: Probability density function value(s).
         """
         exp = (1 / (std * np.sqrt(2 * np.pi))) * np.exp(-((x - mean) ** 2) / (2 * std ** 2))
         return exp
@@ -185,23 +229,20 @@ class DistAnalysis(object):
         """
         Calculate mean and standard deviation of the data.
         """
-        self.std    : np.ndarray = np.std(self.data, axis=0)
-        self.mean   : np.ndarray = np.mean(self.data, axis=0)
+        self.std    : np.ndarray = self.context.std
+        self.mean   : np.ndarray = self.context.mean
     
     def xy(self) -> None:
         """
         Compute x and y values for plotting.
         """
-        self.y: np.ndarray = self.data[:, -1]
-        self.x: np.ndarray = np.arange(min(self.y), max(self.y))
-        
-        # Compute Gaussian KDE
-        density: gaussian_kde = gaussian_kde(self.y)
-        density.covariance_factor = lambda : .25
-        density._compute_covariance()
+        self.y, self.y_counts = self.context.endpoint_histogram
+        self.x      : np.ndarray = self.context.x
+        self.y_kde  : np.ndarray = self.context.kde
+        self.y_gauss: np.ndarray = self.context.gaussian
         
-        self.y_kde  : np.ndarray = density(self.x)
-        self.y_gauss: np.ndarray = np.array([self.norm(xt, self.mean[-1], self.std[-1]) for xt in self.x])
+        if self.context.exact_density is not None:
+            self.x_exact, self.y_exact = self.context.exact_density
     
     def define_fig(self) -> None:
         """
@@ -213,10 +254,10 @@ class DistAnalysis(object):
         """
         Plot raw data histogram.
         """
-        self.FIG[1][0].hist(self.y, bins=100, color="b", alpha=0.5, label="raw data")
+        self.FIG[1][0].hist(self.y, bins=100, weights=self.y_counts, color="b", alpha=0.5, label="raw data")
         self.FIG[1][0].grid(True, "both")
         self.FIG[1][0].legend()
-        self.FIG[1][0].set_xlabel(f"t = {self.data.shape[1]}")
+        self.FIG[1][0].set_xlabel(f"t = {self.context.shape[1]}")
     
     def plot2(self) -> None:
         """
@@ -224,9 +265,11 @@ class DistAnalysis(object):
         """
         self.FIG[1][1].plot(self.x, self.y_kde, color="b", alpha=0.5, label="pdf numerical")
         self.FIG[1][1].plot(self.x, self.y_gauss, color="r", alpha=0.5, linestyle="dashed", label=r"$pdf(\mu, \sigma)$")
+        if self.context.exact_density is not None:
+            self.FIG[1][1].plot(self.x_exact, self.y_exact, color="g", alpha=0.5, label="pdf exact")
         self.FIG[1][1].grid(True, "both")
         self.FIG[1][1].legend()
-        self.FIG[1][1].set_xlabel(f"t = {self.data.shape[1]}")
+        self.FIG[1][1].set_xlabel(f"t = {self.context.shape[1]}")
         
     def plot3(self) -> None:
         """
@@ -234,9 +277,13 @@ class DistAnalysis(object):
         """
         self.FIG[1][2].plot(self.x, np.cumsum(self.y_kde), color="b", alpha=0.5, label=r"$\int pdf$ numerical")
         self.FIG[1][2].plot(self.x, np.cumsum(self.y_gauss), color="r", alpha=0.5, linestyle="dashed", label=r"$\int pdf(\mu, \sigma)$")
+        if self.context.exact_density is not None:
+            self.FIG[1][2].plot(
+                self.x_exact, np.cumsum(self.y_exact) * self.context.exact.lattice, color="g", alpha=0.5, label=r"$\int pdf$ exact"
+            )
         self.FIG[1][2].grid(True, "both")
         self.FIG[1][2].legend()
-        self.FIG[1][2].set_xlabel(f"t = {self.data.shape[1]}")
+        self.FIG[1][2].set_xlabel(f"t = {self.context.shape[1]}")
     
     def plot(self) -> None:
         """
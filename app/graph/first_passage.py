@@ -0,0 +1,73 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                        app/graph/first_passage.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+import numpy as np
+
+from typing             import Optional
+
+import matplotlib.pyplot as plt
+
+from matplotlib.axes    import Axes
+from matplotlib.figure  import Figure
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis.first_passage import FirstPassage
+from generator.barriers     import Barriers
+# |--------------------------------------------------------------------------------------------------------------------|
+
+class Graph_FirstPassage(object):
+    def __init__(self, passage: FirstPassage, barriers: Optional[Barriers] = None) -> None:
+        """
+        Initialize Graph_FirstPassage object.
+        
+        Args:
+            passage (FirstPassage): First passage counts of a run (MultiCore.first_passage).
+            barriers (Optional[Barriers]): Bounds of the run, used in the labels.
+        """
+        self.passage    : FirstPassage                      = passage
+        self.barriers   : Optional[Barriers]                = barriers
+        self.FIG        : tuple[Figure, tuple[Axes, Axes]]  = plt.subplots(1, 2, figsize=(12, 4))
+    
+    def _side_label(self, side: int) -> str:
+        if self.barriers is None:
+            return "lower" if side == -1 else "upper"
+        return f"{self.barriers.lower}" if side == -1 else f"{self.barriers.upper}"
+    
+    def _fig1(self) -> None:
+        """
+        First-passage-time distribution of each side.
+        """
+        t: np.ndarray = np.arange(self.passage.samples + 1)
+        for side, color in ((-1, "b"), (1, "r")):
+            if self.passage.hits(side).sum() > 0:
+                label: str = r"$P(\tau = t)$" + f" at {self._side_label(side)}"
+                self.FIG[1][0].plot(t, self.passage.pdf(side), color=color, alpha=0.5, label=label)
+        self.FIG[1][0].grid(True, "both")
+        self.FIG[1][0].set_xlabel(r"$t$ (iterations)")
+        self.FIG[1][0].set_title(
+            f"absorbed: {self.passage.absorbed}/{self.passage.count} | "
+            + r"$E[\tau]$" + f" = {round(self.passage.mean_time(), 4)}"
+        )
+        self.FIG[1][0].legend()
+    
+    def _fig2(self) -> None:
+        """
+        Survival curve.
+        """
+        t: np.ndarray = np.arange(self.passage.samples + 1)
+        self.FIG[1][1].plot(t, self.passage.survival, color="g", alpha=0.7, label=r"$S(t) = P(\tau > t)$")
+        self.FIG[1][1].grid(True, "both")
+        self.FIG[1][1].set_xlabel(r"$t$ (iterations)")
+        self.FIG[1][1].set_ylim(0, 1.05)
+        self.FIG[1][1].legend()
+    
+    def plot(self) -> None:
+        """
+        Plot the first-passage-time distributions and the survival curve.
+        """
+        self._fig1()
+        self._fig2()
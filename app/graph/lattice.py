@@ -0,0 +1,90 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                               app/graph/lattice.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+import numpy as np
+
+from typing             import Any, Union
+
+import matplotlib.pyplot as plt
+
+from matplotlib.axes    import Axes
+from matplotlib.figure  import Figure
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis.moments   import RunningMoments
+from analysis.lattice   import RadialDistribution, msd
+# |--------------------------------------------------------------------------------------------------------------------|
+
+class Graph_Lattice(object):
+    def __init__(self, data: Any, sample_space: list[list[Union[float, int]]], prob: list[float],
+                 moments: RunningMoments, radial: RadialDistribution, trajectories: int = 20) -> None:
+        """
+        Initialize Graph_Lattice object.
+        
+        Args:
+            data (Any): (simulations, samples, dim) walks (ndarray or ShardedArray), only the first
+                        `trajectories` rows are read.
+            sample_space (list[list[Union[float, int]]]): Step vectors.
+            prob (list[float]): Probability of each step.
+            moments (RunningMoments): Per-coordinate moments of the run (MultiCore.running_moments).
+            radial (RadialDistribution): Distances of the endpoints to the origin (MultiCore.radial).
+            trajectories (int): Walks drawn in the plane of the first two coordinates.
+        """
+        self.data           : Any                               = data
+        self.sample_space   : np.ndarray                        = np.asarray(sample_space, dtype=np.float64)
+        self.prob           : np.ndarray                        = np.asarray(prob, dtype=np.float64)
+        self.moments        : RunningMoments                    = moments
+        self.radial         : RadialDistribution                = radial
+        self.trajectories   : int                               = trajectories
+        self.FIG            : tuple[Figure, tuple[Axes, ...]]   = plt.subplots(1, 3, figsize=(18, 6))
+    
+    def _fig1(self) -> None:
+        """
+        A few walks in the plane of the first two coordinates.
+        """
+        walks: np.ndarray = np.asarray(self.data[:self.trajectories])
+        for walk in walks:
+            y: np.ndarray = walk[:, 1] if walk.shape[1] > 1 else np.zeros(walk.shape[0])
+            self.FIG[1][0].plot(np.r_[0, walk[:, 0]], np.r_[0, y], linewidth=0.7, alpha=0.7)
+        self.FIG[1][0].plot(0, 0, "ko", markersize=3)
+        self.FIG[1][0].set_aspect("equal", adjustable="datalim")
+        self.FIG[1][0].grid(True, "both")
+        self.FIG[1][0].set_xlabel(r"$x_1$")
+        self.FIG[1][0].set_ylabel(r"$x_2$")
+        self.FIG[1][0].set_title(f"{walks.shape[0]} walks | dim: {self.sample_space.shape[1]}")
+    
+    def _fig2(self) -> None:
+        """
+        Mean squared displacement against the diffusive reference t * E[|step|^2] (exact for zero-mean steps).
+        """
+        t: np.ndarray = np.arange(1, self.moments.samples + 1)
+        step_sq: float = float(self.prob @ (self.sample_space**2).sum(axis=1))
+        self.FIG[1][1].plot(t, msd(self.moments), color="b", alpha=0.7, label=r"$MSD(t) = E[|r(t)|^2]$")
+        self.FIG[1][1].plot(t, t * step_sq, color="r", linestyle="dashed", alpha=0.5, label=r"$t\,E[|s|^2]$")
+        self.FIG[1][1].grid(True, "both")
+        self.FIG[1][1].set_xlabel(r"$t$ (iterations)")
+        self.FIG[1][1].set_title(f"MSD({self.moments.samples}) = {round(float(msd(self.moments)[-1]), 4)}")
+        self.FIG[1][1].legend()
+    
+    def _fig3(self) -> None:
+        """
+        Distribution of the distance of the endpoints to the origin.
+        """
+        edges, density = self.radial.shell_density()
+        self.FIG[1][2].stairs(density, edges, fill=True, alpha=0.5, color="g", label=r"$P(|r| \in [k, k+1))$")
+        self.FIG[1][2].grid(True, "both")
+        self.FIG[1][2].set_xlabel(r"$|r|$")
+        self.FIG[1][2].set_title(f"{r'$E[|r|^2]$'} = {round(self.radial.mean_squared, 4)}")
+        self.FIG[1][2].legend()
+    
+    def plot(self) -> None:
+        """
+        Plot the walks, the mean squared displacement and the radial distribution.
+        """
+        self._fig1()
+        self._fig2()
+        self._fig3()
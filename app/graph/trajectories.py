@@ -0,0 +1,157 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                        app/graph/trajectories.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from bin.lod_store          import LevelOfDetail
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+import numpy as np
+
+from typing                 import Optional
+
+from matplotlib.axes        import Axes
+from matplotlib.collections import LineCollection
+from matplotlib.colors      import LogNorm
+# |--------------------------------------------------------------------------------------------------------------------|
+
+TRAJECTORY_MODES: tuple[str, ...] = ("lines", "density")
+
+
+def _row_blocks(data: np.ndarray, block: int):
+    """
+    Yields (rows, samples) blocks of the data, so memory-mapped or sharded data is never loaded as a whole.
+    """
+    for start in range(0, data.shape[0], block):
+        yield np.asarray(data[start:start + block])
+
+
+def trajectory_histogram(data: np.ndarray, bins: int = 200, block: int = 10000) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Counts the trajectories that go through each (position, t) cell. Integer data gets one bin per position
+    (up to `bins` positions, wider bins beyond that).
+    Args:
+        data (np.ndarray): (simulations, samples) trajectories.
+        bins (int): Maximum number of position bins.
+        block (int): Rows processed at a time.
+    Returns:
+        tuple[np.ndarray, np.ndarray]: counts of shape (n_bins, samples) and the n_bins+1 position edges.
+    """
+    samples : int   = data.shape[1]
+    low     : float = np.inf
+    high    : float = -np.inf
+    # Both bounds in one pass: memory-mapped shards are then read twice in all, with the counting pass
+    for rows in _row_blocks(data, block):
+        low, high = min(low, float(rows.min())), max(high, float(rows.max()))
+    
+    if np.issubdtype(data.dtype, np.integer) and high - low + 1 <= bins:
+        edges: np.ndarray = np.arange(low, high + 2) - 0.5
+    else:
+        edges: np.ndarray = np.linspace(low, high if high > low else low + 1, bins + 1)
+    n_bins: int = edges.size - 1
+    
+    counts  : np.ndarray = np.zeros(n_bins * samples, dtype=np.int64)
+    t       : np.ndarray = np.arange(samples)
+    for rows in _row_blocks(data, block):
+        index: np.ndarray = np.clip(np.searchsorted(edges, rows, side="right") - 1, 0, n_bins - 1)
+        counts += np.bincount((index * samples + t).ravel(), minlength=n_bins * samples)
+    return counts.reshape(n_bins, samples), edges
+
+
+def plot_lines(ax: Axes, data: np.ndarray, max_lines: int, **kwargs) -> int:
+    """
+    Draws the trajectories as one LineCollection (a single artist). Above max_lines, evenly spaced
+    trajectories are drawn instead of the first ones.
+    Args:
+        ax (Axes): Target axes.
+        data (np.ndarray): (simulations, samples) trajectories.
+        max_lines (int): Maximum number of trajectories drawn.
+        **kwargs: LineCollection style (color, alpha, ...).
+    Returns:
+        int: Number of trajectories drawn.
+    """
+    rows: np.ndarray = np.unique(np.linspace(0, data.shape[0] - 1, min(max_lines, data.shape[0])).astype(np.int64))
+    y: np.ndarray = np.asarray(data[rows])
+    x: np.ndarray = np.broadcast_to(np.arange(data.shape[1]), y.shape)
+    
+    ax.add_collection(LineCollection(np.stack([x, y], axis=-1), **kwargs))
+    ax.autoscale_view()
+    return rows.size
+
+
+def plot_density(ax: Axes, data: np.ndarray, bins: int = 200, cmap: str = "Blues",
+                 histogram: Optional[tuple[np.ndarray, np.ndarray]] = None, samples: Optional[int] = None) -> None:
+    """
+    Draws every trajectory as one (t, position) 2D histogram image, log-scaled. The cost does not depend on the
+    number of simulations.
+    Args:
+        ax (Axes): Target axes.
+        data (np.ndarray): (simulations, samples) trajectories.
+        bins (int): Maximum number of position bins.
+        cmap (str): Colormap of the image.
+        histogram (Optional[tuple[np.ndarray, np.ndarray]]): Precomputed trajectory_histogram(data).
+        samples (Optional[int]): Time steps spanned by the columns of data, when they are a subsample of the
+                                 trajectories (a level of detail). Defaults to data.shape[1].
+    """
+    counts, edges = trajectory_histogram(data, bins) if histogram is None else histogram
+    samples = data.shape[1] if samples is None else samples
+    ax.imshow(
+        np.ma.masked_equal(counts, 0), origin="lower", aspect="auto", interpolation="nearest", cmap=cmap,
+        norm=LogNorm(vmin=1, vmax=max(int(counts.max()), 1)), extent=(-0.5, samples - 0.5, edges[0], edges[-1])
+    )
+
+
+def axes_pixels(ax: Axes) -> int:
+    """
+    Width of the axes in pixels at the dpi of the figure: the most time steps a plot can tell apart.
+    """
+    return max(int(np.ceil(ax.get_window_extent().width)), 1)
+
+
+def plot_lod_lines(ax: Axes, lod: LevelOfDetail, width: int, max_lines: int, **kwargs) -> int:
+    """
+    plot_lines() from a level of detail: every trajectory goes through the min and the max of each bucket of
+    `width` time steps, which lights the same pixels as the full trajectory once a bucket is narrower than a pixel,
+    and the ensemble min and max over every trajectory are drawn as an envelope.
+    Args:
+        ax (Axes): Target axes.
+        lod (LevelOfDetail): Summaries of the trajectories.
+        width (int): Bucket width of the level (see LevelOfDetail.level).
+        max_lines (int): Maximum number of trajectories drawn.
+        **kwargs: LineCollection style (color, alpha, ...).
+    Returns:
+        int: Number of trajectories drawn.
+    """
+    rows: np.ndarray = np.unique(np.linspace(0, len(lod) - 1, min(max_lines, len(lod))).astype(np.int64))
+    x, y = lod.lines(width, rows)
+    ax.add_collection(LineCollection(np.stack([x, y], axis=-1), **kwargs))
+    
+    envelope: dict[str, np.ndarray] = lod.envelope(width)
+    ax.plot(lod.centers(width), envelope["min"], color="k", linewidth=0.5, alpha=0.5)
+    ax.plot(lod.centers(width), envelope["max"], color="k", linewidth=0.5, alpha=0.5)
+    ax.autoscale_view()
+    return rows.size
+
+
+def plot_fan(ax: Axes, x: np.ndarray, bands: dict[float, np.ndarray], color: str = "b", label: str = "") -> None:
+    """
+    Fan chart of quantile bands: the bands of symmetric levels (q, 1 - q) are filled from the outermost to the
+    innermost, darker towards the median, which is drawn as a line.
+    Args:
+        ax (Axes): Target axes.
+        x (np.ndarray): Time steps of the bands.
+        bands (dict[float, np.ndarray]): Quantiles by level over x (see QuantileSketch.bands).
+        color (str): Color of the fan.
+        label (str): Legend prefix, the levels are appended.
+    """
+    lows: list[float] = sorted(q for q in bands if q < 0.5 and 1 - q in bands)
+    for n, q in enumerate(lows):
+        ax.fill_between(
+            x, bands[q], bands[1 - q], color=color, alpha=0.15 + 0.1 * n, linewidth=0,
+            label=f"{label}{round(100 * q)}-{round(100 * (1 - q))}%"
+        )
+    if 0.5 in bands:
+        ax.plot(x, bands[0.5], color=color, linewidth=1, label=f"{label}median")
@@ -7,10 +7,17 @@
 
 # | Imports |----------------------------------------------------------------------------------------------------------|
 from colorama import Fore, Style
+from typing import Any
 import datetime
+import os
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from log.metrics import METRICS
 # |--------------------------------------------------------------------------------------------------------------------|
 
 def subprocess_log(process_n: int, pid: int, start_close: str) -> None:
+    METRICS.event("process", worker=process_n, pid=pid, state=start_close)
+    if not METRICS.echo:
+        return
     datetime_string: str = f"{Fore.CYAN}{datetime.datetime.now()}{Style.RESET_ALL}"
     info: str = f"[{Fore.GREEN if start_close == 'start' else Fore.MAGENTA}{start_close.upper()}]{Style.RESET_ALL}"
     dt_info: str = f"Core[{process_n}] -> PID:{Fore.MAGENTA}[{pid}]{Style.RESET_ALL}"
@@ -18,6 +25,10 @@ def subprocess_log(process_n: int, pid: int, start_close: str) -> None:
 
 
 def bin_manager_log(path_: str, CRUD: str) -> None:
+    if METRICS.enabled:
+        METRICS.event("bin", op=CRUD, path=str(path_), bytes=os.path.getsize(path_) if CRUD != "delete" else 0)
+    if not METRICS.echo:
+        return
     datetime_string: str = f"{Fore.CYAN}{datetime.datetime.now()}{Style.RESET_ALL}"
     info_color: dict[str, str] = {
         "post": f"{Fore.GREEN}", "get": f"{Fore.CYAN}", "delete": f"{Fore.RED}"
@@ -25,4 +36,13 @@ def bin_manager_log(path_: str, CRUD: str) -> None:
     info_class: str = f"{Fore.YELLOW}[BIN DUMP]{Style.RESET_ALL}"
     method: str = f"{info_color[CRUD]}[{CRUD.upper()}]{Style.RESET_ALL}"
     
-    print(f"{datetime_string} | {info_class} | {method} -> {path_}")
\ No newline at end of file
+    print(f"{datetime_string} | {info_class} | {method} -> {path_}")
+
+
+def unit_log(result: dict[str, Any], done: int, total: int) -> None:
+    METRICS.event(
+        "unit", unit=result["index"], pid=result["pid"], simulations=result["count"], wall=result["wall"],
+        cpu=result["cpu"], bytes_written=result["bytes_written"], steps=result["steps"],
+        queue_wait=result["queue_wait"], write_wait=result["write_wait"]
+    )
+    METRICS.progress(done, total)
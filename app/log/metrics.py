@@ -0,0 +1,138 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                                 app/log/metrics.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Imports |----------------------------------------------------------------------------------------------------------|
+from pathlib    import Path, PosixPath
+from typing     import Any, Optional, TextIO
+import time
+import json
+import os
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+class Metrics(object):
+    def __init__(self) -> None:
+        """
+        Process-wide instrumentation: structured events (JSON lines), an end-of-run summary per worker and a
+        rate-limited progress line. Disabled by default, event() then returns before building anything.
+        Only the process that called enable() records events, the workers send their figures back with the
+        results of their work units.
+        """
+        self.enabled            : bool                      = False
+        self.echo               : bool                      = True
+        self.progress_interval  : float                     = 1.0
+        self.events             : list[dict[str, Any]]      = []
+        self.stream             : Optional[TextIO]          = None
+        self.owner              : Optional[int]             = None
+        self._last_progress     : float                     = 0.0
+    
+    def enable(self, path_: Optional[PosixPath] = None, echo: bool = True, progress_interval: float = 1.0) -> None:
+        """
+        Starts recording events.
+        Args:
+            path_ (Optional[PosixPath]): JSON lines file receiving every event as it is recorded.
+            echo (bool): Whether the colored logs are still printed.
+            progress_interval (float): Minimum seconds between two progress lines.
+        """
+        self.disable()
+        self.enabled, self.echo, self.progress_interval = True, echo, progress_interval
+        self.events, self.owner = [], os.getpid()
+        if path_ is not None:
+            Path(path_).parent.mkdir(parents=True, exist_ok=True)
+            self.stream = open(path_, "a", buffering=1)
+    
+    def disable(self) -> None:
+        """
+        Stops recording events and closes the JSON lines file. The recorded events are kept for summary().
+        """
+        self.enabled = False
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+    
+    def event(self, kind: str, **fields: Any) -> None:
+        """
+        Records one event.
+        Args:
+            kind (str): Event type (process, bin, unit, run, ...).
+            **fields (Any): JSON serializable fields of the event.
+        """
+        if not self.enabled or os.getpid() != self.owner:
+            return
+        record: dict[str, Any] = {"ts": time.time(), "event": kind, **fields}
+        self.events.append(record)
+        if self.stream is not None:
+            self.stream.write(json.dumps(record) + "\n")
+    
+    def progress(self, done: int, total: int, label: str = "simulations") -> None:
+        """
+        Prints the progress of a run, at most once every progress_interval seconds (and always at the end).
+        Args:
+            done (int): Completed amount.
+            total (int): Total amount.
+            label (str): Unit of the amounts.
+        """
+        if not self.echo:
+            return
+        now: float = time.monotonic()
+        if done < total and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        print(f"[PROGRESS] {done}/{total} {label} ({100 * done / max(total, 1):5.1f}%)", flush=True)
+    
+    def summary(self) -> str:
+        """
+        Table of the recorded work units aggregated per worker: units, simulations, wall time, CPU time, bytes
+        written, queue wait and the time the compute waited for the background writer.
+        Returns:
+            str: The summary table.
+        """
+        workers: dict[int, dict[str, float]] = {}
+        for e in self.events:
+            if e["event"] != "unit":
+                continue
+            w: dict[str, float] = workers.setdefault(e["pid"], {
+                "units": 0, "simulations": 0, "wall": 0.0, "cpu": 0.0, "bytes_written": 0, "queue_wait": 0.0,
+                "write_wait": 0.0
+            })
+            w["units"]          += 1
+            w["simulations"]    += e["simulations"]
+            w["wall"]           += e["wall"]
+            w["cpu"]            += e["cpu"]
+            w["bytes_written"]  += e["bytes_written"]
+            w["queue_wait"]     += e["queue_wait"]
+            w["write_wait"]     += e.get("write_wait", 0.0)
+        
+        bytes_read: int = sum(e.get("bytes", 0) for e in self.events if e["event"] == "bin" and e["op"] == "get")
+        
+        header: str = (
+            f"{'PID':>8} {'units':>6} {'sims':>10} {'wall s':>9} {'cpu s':>9} {'cpu %':>6} {'MB out':>9} "
+            f"{'wait s':>8} {'io s':>8}"
+        )
+        lines: list[str] = [header, "-" * len(header)]
+        total: dict[str, float] = {
+            "units": 0, "simulations": 0, "wall": 0.0, "cpu": 0.0, "bytes_written": 0, "write_wait": 0.0
+        }
+        for pid, w in sorted(workers.items()):
+            for k in total:
+                total[k] += w[k]
+            lines.append(
+                f"{pid:>8} {w['units']:>6.0f} {w['simulations']:>10.0f} {w['wall']:>9.3f} {w['cpu']:>9.3f} "
+                f"{100 * w['cpu'] / max(w['wall'], 1e-9):>6.1f} {w['bytes_written'] / 1024**2:>9.2f} "
+                f"{w['queue_wait'] / max(w['units'], 1):>8.3f} {w['write_wait']:>8.3f}"
+            )
+        lines.append("-" * len(header))
+        lines.append(
+            f"{'total':>8} {total['units']:>6.0f} {total['simulations']:>10.0f} {total['wall']:>9.3f} "
+            f"{total['cpu']:>9.3f} {100 * total['cpu'] / max(total['wall'], 1e-9):>6.1f} "
+            f"{total['bytes_written'] / 1024**2:>9.2f} {'':>8} {total['write_wait']:>8.3f}"
+        )
+        lines.append(f"bytes read: {bytes_read / 1024**2:.2f} MB")
+        return "\n".join(lines)
+
+
+METRICS: Metrics = Metrics()
@@ -0,0 +1,66 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                              app/sweep/__main__.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib import Path
+import argparse
+import sys
+
+# "python app/sweep" only puts app/sweep on the path, the app modules live one level up.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from sweep.engine import Sweep, parameter_grid, summary_table
+from bin.run_cache import RunCache
+from log.metrics import METRICS
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+# VARS |-------------------------------------------------------|
+SAMPlES     : list[int]     = [200]
+STATES      : str           = "-1,1"
+PROB        : str           = "0.5,0.5"
+SIMULATIONS : int           = 10000
+STORE       : Path          = Path("app", "bin", "sweep.jsonl")
+# |------------------------------------------------------------|
+
+
+def _floats(text: str) -> list[float]:
+    return [float(v) for v in text.split(",")]
+
+
+def _ints(text: str) -> list[int]:
+    return [int(v) for v in text.split(",")]
+
+
+parser = argparse.ArgumentParser(prog="python app/sweep", description="Random walk parameter sweep")
+parser.add_argument("--prob", type=_floats, nargs="+", default=[_floats(PROB)], help="e.g. 0.5,0.5 0.4,0.6")
+parser.add_argument("--samples", type=int, nargs="+", default=SAMPlES)
+parser.add_argument("--sample-space", type=_ints, nargs="+", default=[_ints(STATES)], help="e.g. -1,1 -1,0,1")
+parser.add_argument("--simulations", type=int, default=SIMULATIONS)
+parser.add_argument("--steps", action="store_true", help="sweep the steps instead of the cumulative walks")
+parser.add_argument("--seed", type=int, default=None)
+parser.add_argument("--unit-size", type=int, default=1000)
+parser.add_argument("--cpu-offs", type=int, default=1)
+parser.add_argument("--store", type=Path, default=STORE, help="summaries (JSON lines), stored configs are skipped")
+parser.add_argument("--keep-data", action="store_true", help="also store the trajectories in the run cache")
+parser.add_argument("--quiet", action="store_true", help="no per-process and per-file logs")
+args = parser.parse_args()
+
+if args.quiet:
+    METRICS.enable(echo=False)
+
+sweep = Sweep(
+    parameter_grid(args.prob, args.samples, args.sample_space), args.simulations, args.cpu_offs,
+    cumulative=not args.steps, unit_size=args.unit_size, seed=args.seed, keep_data=args.keep_data,
+    cache=RunCache() if args.keep_data else None, store_path=args.store
+)
+try:
+    records = sweep.run()
+finally:
+    sweep.close()
+print(summary_table(records))
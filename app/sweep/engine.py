@@ -0,0 +1,230 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                              app/sweep/engine.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from core.multicore_simulation  import MultiCore
+from analysis.streaming         import EndpointHistogram
+from bin.run_cache              import RunCache
+from data.sharded_array         import ShardedArray
+from log.genlog                 import unit_log
+from log.metrics                import METRICS
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                    import Path, PosixPath
+from typing                     import Any, Optional
+import itertools
+import json
+import os
+import numpy                    as np
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+def parameter_grid(probs: list[list[float]], samples: list[int],
+                   sample_spaces: list[list[int]]) -> list[dict[str, Any]]:
+    """
+    Every (prob, samples, sample_space) combination of the grid.
+    Args:
+        probs (list[list[float]]): Probability lists, one per value of the sample space.
+        samples (list[int]): Horizons.
+        sample_spaces (list[list[int]]): Sample spaces.
+    Returns:
+        list[dict[str, Any]]: One config per combination: samples, sample_space and prob.
+    """
+    configs: list[dict[str, Any]] = []
+    for prob, n, sample_space in itertools.product(probs, samples, sample_spaces):
+        if len(prob) != len(sample_space):
+            raise ValueError(f"prob {prob} does not match the sample space {sample_space}")
+        configs.append({"samples": n, "sample_space": list(sample_space), "prob": list(prob)})
+    return configs
+
+
+class Sweep(object):
+    def __init__(self, configs: list[dict[str, Any]], simulations: int, cpu_offs: int, cumulative: bool = True,
+                 unit_size: int = 1000, moments_batch: int = 1000, seed: Optional[int] = None,
+                 keep_data: bool = False, cache: Optional[RunCache] = None,
+                 store_path: Optional[PosixPath] = None) -> None:
+        """
+        Runs a grid of configs on one persistent pool. The work units of every config are queued in a single
+        stream, so the workers move from one config to the next without waiting for the slowest unit.
+        Args:
+            configs (list[dict[str, Any]]): samples, sample_space and prob of each config (see parameter_grid).
+            simulations (int): Simulations of each config.
+            cpu_offs (int): Number of CPU cores to offset from the total available cores.
+            cumulative (bool): Whether the simulation results are accumulated (walks) or not (steps).
+            unit_size (int): Simulations of each work unit.
+            moments_batch (int): Simulations generated at a time when the trajectories are not kept.
+            seed (Optional[int]): Root seed shared by every config (common random numbers: the configs differ
+                                  by their parameters, not by their noise). Fresh entropy per config if None.
+            keep_data (bool): Whether the trajectories are stored, in the cache. Only the summaries otherwise.
+            cache (Optional[RunCache]): Cache of the trajectories, required with keep_data=True. Seeded configs
+                                        already in it are summarized from the stored run.
+            store_path (Optional[PosixPath]): JSON lines file of the summaries. Seeded configs already in it are
+                                              skipped, so an interrupted seeded sweep resumes where it stopped.
+                                              Unseeded configs draw new walks on every run.
+        """
+        if keep_data == True and cache is None:
+            raise ValueError("keep_data=True stores the trajectories of every config in the cache, give a RunCache")
+        
+        self.configs    : list[dict[str, Any]]  = configs
+        self.simulations: int                   = simulations
+        self.cache      : Optional[RunCache]    = cache
+        self.store_path : Optional[PosixPath]   = None if store_path is None else Path(store_path)
+        self.engine     : MultiCore             = MultiCore(cpu_offs)
+        
+        self.runs: list[MultiCore] = []
+        for config in configs:
+            multicore: MultiCore = MultiCore(
+                cpu_offs, moments=True, keep_data=keep_data, moments_batch=moments_batch, unit_size=unit_size,
+                seed=seed, cache=cache
+            )
+            multicore.coinflip_args(config["samples"], config["sample_space"], config["prob"], simulations, cumulative)
+            self.runs.append(multicore)
+    
+    def _stored(self) -> dict[str, dict[str, Any]]:
+        """
+        Summaries already in the store, by key.
+        """
+        if self.store_path is None or not os.path.exists(self.store_path):
+            return {}
+        with open(self.store_path) as f:
+            records: list[dict[str, Any]] = [json.loads(line) for line in f if line.strip()]
+        return {record["key"]: record for record in records}
+    
+    def _save(self, record: dict[str, Any]) -> None:
+        """
+        Appends a summary to the store as soon as its config is done.
+        """
+        if self.store_path is None:
+            return
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.store_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    
+    @staticmethod
+    def _summary(multicore: MultiCore, endpoints: EndpointHistogram) -> dict[str, Any]:
+        """
+        Compact summary of a finished config: final mean and sigma and the histogram of the endpoints.
+        """
+        params: dict[str, Any] = multicore._cache_params()
+        return {
+            "key": RunCache.key(params), "params": params, "entropy": multicore.entropy,
+            "mean": float(multicore.running_moments.mean[-1]), "std": float(multicore.running_moments.std[-1]),
+            "values": np.asarray(endpoints.values).tolist(), "counts": endpoints.counts.tolist()
+        }
+    
+    def _from_cache(self, multicore: MultiCore) -> Optional[dict[str, Any]]:
+        """
+        Summary of a config whose trajectories are already in the cache, None if they are not.
+        """
+        data: Optional[ShardedArray] = multicore._from_cache()
+        if data is None:
+            return None
+        endpoints: EndpointHistogram = EndpointHistogram()
+        for shard in data.iter_shards():
+            endpoints.update(np.asarray(shard[:, -1]))
+        return self._summary(multicore, endpoints)
+    
+    def run(self) -> list[dict[str, Any]]:
+        """
+        Runs every config that is not stored yet. Only seeded configs are looked up in the store and the cache:
+        an unseeded config has the same key on every sweep but not the same walks.
+        Returns:
+            list[dict[str, Any]]: The summary of every config, in config order (see summary_table).
+        """
+        stored  : dict[str, dict[str, Any]]         = self._stored()
+        records : list[Optional[dict[str, Any]]]    = [None] * len(self.runs)
+        units   : list[dict[str, Any]]              = []
+        
+        for n, multicore in enumerate(self.runs):
+            key: str = RunCache.key(multicore._cache_params())
+            if multicore.seed is not None and key in stored:
+                records[n] = stored[key]
+            elif multicore.seed is not None and self.cache is not None and multicore.keep_data == True:
+                records[n] = self._from_cache(multicore)
+                if records[n] is not None:
+                    self._save(records[n])
+            if records[n] is not None:
+                METRICS.event("sweep", config=n, state="stored")
+                continue
+            
+            multicore.entropy = np.random.SeedSequence(multicore.seed).entropy
+            bin_path: Optional[PosixPath] = (
+                self.cache.prepare(multicore._cache_params()) if multicore.keep_data == True else None
+            )
+            for unit in multicore._units(False, bin_path):
+                unit["config"] = n
+                units.append(unit)
+        
+        pending     : dict[int, list[dict[str, Any]]]   = {}
+        remaining   : dict[int, int]                    = {}
+        for unit in units:
+            pending.setdefault(unit["config"], [])
+            remaining[unit["config"]] = remaining.get(unit["config"], 0) + 1
+        
+        METRICS.event("sweep", state="start", configs=len(pending), units=len(units), workers=self.engine.on_cpu)
+        done: int = 0
+        total: int = sum(unit["count"] for unit in units)
+        for position, result in self.engine._dispatch(units):
+            n: int = units[position]["config"]
+            done += result["count"]
+            unit_log(result, done, total)
+            pending[n].append(result)
+            remaining[n] -= 1
+            if remaining[n] == 0:
+                records[n] = self._finish(n, sorted(pending.pop(n), key=lambda result: result["index"]))
+        METRICS.event("sweep", state="end", configs=len(self.runs))
+        return records
+    
+    def _finish(self, n: int, results: list[dict[str, Any]]) -> dict[str, Any]:
+        """
+        Merges the unit results of a config, stores its trajectories and its summary.
+        """
+        multicore: MultiCore = self.runs[n]
+        multicore.running_moments = multicore._collect(results)
+        endpoints: EndpointHistogram = EndpointHistogram()
+        for result in results:
+            endpoints.merge(result["endpoints"])
+        if multicore.keep_data == True:
+            self.cache.put(multicore._cache_params(), multicore.entropy, multicore.running_moments)
+        
+        record: dict[str, Any] = self._summary(multicore, endpoints)
+        self._save(record)
+        METRICS.event("sweep", config=n, state="done")
+        return record
+    
+    def close(self) -> None:
+        """
+        Stops the worker pool.
+        """
+        self.engine.close()
+
+
+def summary_table(records: list[dict[str, Any]], quantiles: tuple[float, ...] = (0.05, 0.5, 0.95)) -> str:
+    """
+    One line per config: parameters, final mean and sigma, and quantiles of the endpoint histogram.
+    Args:
+        records (list[dict[str, Any]]): Summaries from Sweep.run().
+        quantiles (tuple[float, ...]): Endpoint quantiles shown.
+    Returns:
+        str: The table.
+    """
+    head: str = (
+        f"{'samples':>8} {'sample_space':<16} {'prob':<22} {'simulations':>11} {'mean':>10} {'sigma':>10} "
+        + " ".join(f"{'q' + format(q, 'g'):>8}" for q in quantiles)
+    )
+    lines: list[str] = [head, "-" * len(head)]
+    for record in records:
+        params: dict[str, Any] = record["params"]
+        endpoints: EndpointHistogram = EndpointHistogram().add(
+            np.asarray(record["values"]), np.asarray(record["counts"])
+        )
+        lines.append(
+            f"{params['samples']:>8} {json.dumps(params['sample_space']):<16} {json.dumps(params['prob']):<22} "
+            f"{params['simulations']:>11} {record['mean']:>10.4f} {record['std']:>10.4f} "
+            + " ".join(f"{float(endpoints.quantile(q)):>8g}" for q in quantiles)
+        )
+    return "\n".join(lines)
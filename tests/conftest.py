@@ -0,0 +1,14 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                                 tests/conftest.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib import Path
+import sys
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# The app modules import each other relative to app/, as when run with "python app"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
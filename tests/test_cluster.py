@@ -0,0 +1,84 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                             tests/test_cluster.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from cluster.coordinator        import ClusterCore
+from cluster.worker             import serve_processes
+from core.multicore_simulation  import MultiCore
+from bin.run_cache              import RunCache
+from log.metrics                import METRICS
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                    import PosixPath
+import multiprocessing          as mp
+import numpy                    as np
+import threading
+import signal
+import time
+import os
+# |--------------------------------------------------------------------------------------------------------------------|
+
+AUTHKEY     : bytes = b"test-cluster"
+SEED        : int   = 11
+UNIT_SIZE   : int   = 500
+SAMPLES     : int   = 2000
+SIMULATIONS : int   = 12000
+
+
+def _kill_one_worker_mid_run(cluster: ClusterCore, run_path: PosixPath, killed: list[mp.Process]) -> None:
+    """
+    Waits for the first shard of the run (both workers are then busy with the next units) and kills a worker.
+    """
+    deadline: float = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        if cluster.on_cpu >= 2 and run_path.exists() and any(run_path.glob("Shard*")):
+            worker: mp.Process = mp.active_children()[0]
+            os.kill(worker.pid, signal.SIGKILL)
+            killed.append(worker)
+            return
+        time.sleep(0.01)
+
+
+def test_cluster_on_localhost_matches_local_run(tmp_path: PosixPath) -> None:
+    cluster: ClusterCore = ClusterCore(
+        ("127.0.0.1", 0), AUTHKEY, moments=True, seed=SEED, unit_size=UNIT_SIZE, cache=RunCache(tmp_path),
+        heartbeat=0.5
+    )
+    cluster.coinflip_args(SAMPLES, [-1, 1], [0.5, 0.5], SIMULATIONS, True)
+    address: tuple[str, int] = cluster.start()
+    workers: threading.Thread = threading.Thread(target=serve_processes, args=(address, AUTHKEY, 3), daemon=True)
+    workers.start()
+    
+    killed: list[mp.Process] = []
+    killer: threading.Thread = threading.Thread(
+        target=_kill_one_worker_mid_run, args=(cluster, cluster._run_path(), killed), daemon=True
+    )
+    killer.start()
+    METRICS.enable(echo=False)
+    try:
+        data: np.ndarray = np.asarray(cluster.run())
+    finally:
+        METRICS.disable()
+        cluster.close()
+    killer.join()
+    workers.join(30)
+    
+    # The unit of the killed worker was requeued and run by the others
+    assert len(killed) == 1 and killed[0].exitcode == -signal.SIGKILL
+    assert any(event["event"] == "requeue" for event in METRICS.events)
+    
+    local: MultiCore = MultiCore(cpu_offs=0, in_memory=True, moments=True, seed=SEED, unit_size=UNIT_SIZE)
+    local.coinflip_args(SAMPLES, [-1, 1], [0.5, 0.5], SIMULATIONS, True)
+    try:
+        expected: np.ndarray = np.array(local.run())
+    finally:
+        local.close()
+        local.release()
+    
+    np.testing.assert_array_equal(data, expected)
+    np.testing.assert_array_equal(cluster.running_moments.mean, local.running_moments.mean)
+    np.testing.assert_array_equal(cluster.running_moments.var, local.running_moments.var)
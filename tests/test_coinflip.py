@@ -0,0 +1,39 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                             tests/test_coinflip.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from generator.coinflip import GeneratorRandomWalk
+from generator.lattice  import lattice_steps, uniform_prob
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+import numpy                as np
+import pytest
+# |--------------------------------------------------------------------------------------------------------------------|
+
+SAMPLES: int = 10
+
+
+@pytest.mark.parametrize("dim", [1, 2, 3])
+def test_lattice_without_rng(dim: int) -> None:
+    steps: list[list[int]] = lattice_steps(dim)
+    walk: GeneratorRandomWalk = GeneratorRandomWalk(SAMPLES, uniform_prob(steps), steps)
+    walk.run_batch(3)
+    assert walk.get_array().shape == (3, SAMPLES, dim)
+    # every step is one move of the lattice: a single coordinate changes by 1
+    assert (np.abs(walk.get_array()).sum(axis=-1) == 1).all()
+    assert walk.get_cum_array().shape == (3, SAMPLES, dim)
+    
+    walk.run()
+    assert walk.get_array().shape == (SAMPLES, dim)
+
+
+def test_scalar_without_rng() -> None:
+    walk: GeneratorRandomWalk = GeneratorRandomWalk(SAMPLES, [0.5, 0.5], [-1, 1])
+    walk.run_batch(4)
+    assert walk.get_array().shape == (4, SAMPLES)
+    assert np.isin(walk.get_array(), [-1, 1]).all()
+    assert (walk.get_cum_array()[:, -1] == walk.get_array().sum(axis=1)).all()
@@ -0,0 +1,51 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                               tests/test_exact.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis.exact import ExactDistribution
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+import numpy as np
+import pytest
+import time
+# |--------------------------------------------------------------------------------------------------------------------|
+
+
+@pytest.mark.parametrize("sample_space, prob", [
+    ([-1, 1], [0.5, 0.5]),
+    ([-1, 0, 1], [0.25, 0.5, 0.25]),
+    ([1, 2], [0.3, 0.7]),
+    ([-2, 2], [0.4, 0.6]),
+])
+@pytest.mark.parametrize("samples", [1, 2, 3, 8])
+def test_table_matches_pmf(sample_space: list[int], prob: list[float], samples: int) -> None:
+    exact: ExactDistribution = ExactDistribution(sample_space, prob)
+    x, table = exact.table(samples)
+    assert table.shape == (samples, x.size)
+    np.testing.assert_array_equal(np.diff(x), 1)
+    for t in range(1, samples + 1):
+        positions, p = exact.pmf(t)
+        # Every probability at its position, zeros at the unreachable ones
+        row: np.ndarray = np.zeros(x.size)
+        row[positions - x[0]] = p
+        np.testing.assert_allclose(table[t - 1], row, atol=1e-12)
+
+
+def test_table_is_limited() -> None:
+    exact: ExactDistribution = ExactDistribution([-1, 1], [0.5, 0.5])
+    with pytest.raises(ValueError):
+        exact.table(10**5)
+
+
+def test_pmf_of_long_horizons() -> None:
+    for sample_space, prob in (([-1, 1], [0.5, 0.5]), ([-1, 0, 1], [0.25, 0.5, 0.25])):
+        exact: ExactDistribution = ExactDistribution(sample_space, prob)
+        start: float = time.perf_counter()
+        positions, p = exact.pmf(10**5)
+        assert time.perf_counter() - start < 1.0
+        assert abs(p.sum() - 1) < 1e-9
+        assert abs(positions @ p - exact.mean(10**5)) < 1e-6
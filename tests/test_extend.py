@@ -0,0 +1,94 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                               tests/test_extend.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from core.multicore_simulation  import MultiCore
+from bin.run_cache              import RunCache
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                    import PosixPath
+import numpy                    as np
+import pytest
+# |--------------------------------------------------------------------------------------------------------------------|
+
+SEED        : int           = 15
+UNIT_SIZE   : int           = 500
+SPACE       : list[int]     = [-1, 0, 1]
+PROB        : list[float]   = [0.3, 0.3, 0.4]
+
+
+def _multicore(cache_path: PosixPath, samples: int, simulations: int, codec: str = "raw") -> MultiCore:
+    multicore: MultiCore = MultiCore(
+        cpu_offs=0, moments=True, seed=SEED, unit_size=UNIT_SIZE, write_batch=200, codec=codec,
+        cache=RunCache(cache_path)
+    )
+    multicore.coinflip_args(samples, SPACE, PROB, simulations, True)
+    return multicore
+
+
+def _assert_moments(multicore: MultiCore, data: np.ndarray) -> None:
+    np.testing.assert_allclose(multicore.running_moments.mean, data.mean(axis=0), rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(multicore.running_moments.var, data.var(axis=0), rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize("codec", ["raw", "packed"])
+def test_simulations_match_a_fresh_run(tmp_path: PosixPath, codec: str) -> None:
+    # 1250 leaves a partial last unit, completed by the extension
+    extended: MultiCore = _multicore(tmp_path / "extended", 300, 1250, codec)
+    extended.run()
+    data: np.ndarray = np.asarray(extended.extend(simulations=2600))
+    
+    fresh: MultiCore = _multicore(tmp_path / "fresh", 300, 2600, codec)
+    np.testing.assert_array_equal(data, np.asarray(fresh.run()))
+    np.testing.assert_allclose(extended.running_moments.mean, fresh.running_moments.mean, rtol=1e-12)
+    np.testing.assert_allclose(extended.running_moments.var, fresh.running_moments.var, rtol=1e-12)
+    _assert_moments(extended, data)
+    extended.close()
+    fresh.close()
+
+
+@pytest.mark.parametrize("codec", ["raw", "packed"])
+def test_time_continues_every_walk(tmp_path: PosixPath, codec: str) -> None:
+    extended: MultiCore = _multicore(tmp_path / "extended", 300, 1250, codec)
+    stored: np.ndarray = np.asarray(extended.run())
+    extended.extend(samples=520)
+    data: np.ndarray = np.asarray(extended.extend(simulations=1700, samples=700))
+    assert data.shape == (1700, 700)
+    
+    # The stored walks are kept, the new columns continue them with steps of the sample space
+    np.testing.assert_array_equal(data[:1250, :300], stored)
+    assert np.isin(np.diff(data, axis=1, prepend=0), SPACE).all()
+    _assert_moments(extended, data)
+    
+    # The same seed and the same sequence of horizons give the same dataset
+    again: MultiCore = _multicore(tmp_path / "again", 300, 1250, codec)
+    again.run()
+    again.extend(samples=520)
+    np.testing.assert_array_equal(np.asarray(again.extend(simulations=1700, samples=700)), data)
+    
+    # A fresh run with the total draws other walks (the draws of a unit depend on its horizon), with the same
+    # distribution of the endpoints
+    fresh: MultiCore = _multicore(tmp_path / "fresh", 700, 1700, codec)
+    reference: np.ndarray = np.asarray(fresh.run())
+    drift   : float = float(np.dot(SPACE, PROB))
+    spread  : float = float(np.dot(np.square(SPACE), PROB)) - drift**2
+    for walks in (data, reference):
+        assert abs(walks[:, -1].mean() / 700 - drift) < 0.01
+        assert abs(walks[:, -1].var() / 700 / spread - 1) < 0.15
+    extended.close()
+    again.close()
+    fresh.close()
+
+
+def test_extend_refuses_to_shrink(tmp_path: PosixPath) -> None:
+    multicore: MultiCore = _multicore(tmp_path, 100, 600)
+    multicore.run()
+    with pytest.raises(ValueError):
+        multicore.extend(simulations=500)
+    with pytest.raises(ValueError):
+        multicore.extend(samples=50)
+    multicore.close()
@@ -0,0 +1,94 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                            tests/test_lod_store.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from bin.lod_store              import CHANNELS, LevelOfDetail, bucket_summary, lod_widths, summary_dtype
+from bin.run_cache              import RunCache
+from core.multicore_simulation  import MultiCore
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                    import PosixPath
+from typing                     import Any
+import numpy                    as np
+import pytest
+# |--------------------------------------------------------------------------------------------------------------------|
+
+SEED    : int = 24
+SAMPLES : int = 5003
+
+
+def walks(steps: list[int], dtype: np.dtype, rows: int = 40, samples: int = SAMPLES) -> np.ndarray:
+    rng: np.random.Generator = np.random.default_rng(SEED)
+    return np.cumsum(rng.choice(np.asarray(steps, dtype=dtype), size=(rows, samples)), axis=1, dtype=dtype)
+
+
+def buckets(data: np.ndarray, width: int) -> list[np.ndarray]:
+    return [data[:, start:start + width] for start in range(0, data.shape[1], width)]
+
+
+def assert_exact(level: Any, data: np.ndarray, width: int) -> None:
+    level: np.ndarray = np.asarray(level)
+    parts: list[np.ndarray] = buckets(data, width)
+    assert level.shape == (data.shape[0], len(parts), len(CHANNELS))
+    assert level.dtype == summary_dtype(data.dtype)
+    # min, max and last hold the values of the walks, with no rounding
+    for channel, reduce in [("min", np.min), ("max", np.max), ("last", lambda part, axis: part[:, -1])]:
+        exact: np.ndarray = np.stack([reduce(part, axis=1) for part in parts], axis=1)
+        np.testing.assert_array_equal(level[..., CHANNELS.index(channel)].astype(data.dtype), exact)
+    mean: np.ndarray = np.stack([part.mean(axis=1) for part in parts], axis=1)
+    np.testing.assert_allclose(level[..., CHANNELS.index("mean")], mean, rtol=1e-6)
+
+
+@pytest.mark.parametrize("steps, dtype", [
+    ([-1, 1], np.int8),
+    ([-1, 0, 1], np.int16),
+    # Positions up to ~5 * 10**8, where float32 would round
+    ([-100000, 300001], np.int32),
+    ([-7, 9], np.int64),
+])
+def test_bucket_summary_is_exact(steps: list[int], dtype: np.dtype) -> None:
+    data: np.ndarray = walks(steps, dtype)
+    if dtype == np.int32:
+        assert np.abs(data).max() > 2**24
+    widths: list[int] = lod_widths(SAMPLES)
+    assert widths == [4, 16, 64]
+    for width, level in zip(widths, bucket_summary(data, widths)):
+        assert_exact(level, data, width)
+
+
+def test_summary_dtype() -> None:
+    assert summary_dtype(np.int8) == summary_dtype(np.int16) == summary_dtype(np.float32) == np.float32
+    assert summary_dtype(np.int32) == summary_dtype(np.int64) == summary_dtype(np.float64) == np.float64
+
+
+def test_short_walks_have_no_levels() -> None:
+    assert lod_widths(4096) == []
+    assert LevelOfDetail.build(walks([-1, 1], np.int8, samples=4096)) is None
+
+
+@pytest.mark.parametrize("codec", ["raw", "packed"])
+def test_run_levels_are_exact(tmp_path: PosixPath, codec: str) -> None:
+    # Units written in several sub-chunks, and a last partial unit
+    multicore: MultiCore = MultiCore(
+        cpu_offs=0, seed=SEED, unit_size=100, write_batch=30, codec=codec, cache=RunCache(tmp_path)
+    )
+    multicore.coinflip_args(SAMPLES, [-1, 0, 1], [0.3, 0.3, 0.4], 250, True)
+    data: np.ndarray = np.asarray(multicore.run())
+    multicore.close()
+    
+    lod: LevelOfDetail = multicore.level_of_detail()
+    built: LevelOfDetail = LevelOfDetail.build(data, block=64)
+    assert lod.widths == built.widths == lod_widths(SAMPLES) and len(lod) == len(data)
+    for width in lod.widths:
+        assert_exact(lod.levels[width], data, width)
+        np.testing.assert_array_equal(np.asarray(built.levels[width]), np.asarray(lod.levels[width]))
+        np.testing.assert_array_equal(lod.strided(width), data[:, lod.columns(width)])
+        np.testing.assert_array_equal(lod.subsample(width)[7:19], data[7:19, lod.columns(width)])
+        envelope: dict[str, np.ndarray] = lod.envelope(width)
+        np.testing.assert_array_equal(envelope["min"], [part.min() for part in buckets(data, width)])
+        np.testing.assert_array_equal(envelope["max"], [part.max() for part in buckets(data, width)])
+    np.testing.assert_array_equal(np.concatenate(list(lod.endpoints(block=64))), data[:, -1])
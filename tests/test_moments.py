@@ -0,0 +1,99 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                              tests/test_moments.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis.moments           import RunningMoments
+from core.multicore_simulation  import MultiCore
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                    import PosixPath
+from scipy                      import stats
+import numpy                    as np
+import pytest
+# |--------------------------------------------------------------------------------------------------------------------|
+
+SEED        : int = 4
+SIMULATIONS : int = 3001
+SAMPLES     : int = 64
+
+
+def walks(shape: tuple[int, ...] = (SIMULATIONS, SAMPLES)) -> np.ndarray:
+    rng: np.random.Generator = np.random.default_rng(SEED)
+    # Skewed steps with a drift, so every moment is far from 0
+    return np.cumsum(rng.choice([-1, 0, 3], size=shape, p=[0.5, 0.3, 0.2]), axis=1)
+
+
+def assert_matches(moments: RunningMoments, data: np.ndarray) -> None:
+    assert moments.count == data.shape[0]
+    np.testing.assert_allclose(moments.mean, data.mean(axis=0), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(moments.var, data.var(axis=0), rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(moments.std, data.std(axis=0), rtol=1e-10, atol=1e-12)
+    if moments.higher:
+        np.testing.assert_allclose(moments.skew, stats.skew(data, axis=0), rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(moments.kurtosis, stats.kurtosis(data, axis=0), rtol=1e-8, atol=1e-10)
+
+
+@pytest.mark.parametrize("higher", [False, True])
+def test_chunk_matches_numpy_and_scipy(higher: bool) -> None:
+    data: np.ndarray = walks()
+    assert_matches(RunningMoments.from_chunk(data, higher), data)
+
+
+@pytest.mark.parametrize("higher", [False, True])
+@pytest.mark.parametrize("splits", [[1], [1000, 2000], [0, 1, 2, 1500, 1500, 3000], list(range(7, SIMULATIONS, 211))])
+def test_merge_matches_numpy_and_scipy(higher: bool, splits: list[int]) -> None:
+    data: np.ndarray = walks()
+    chunks: list[np.ndarray] = np.split(data, splits)
+    
+    # In order with update(), and as a tree of merges in another order
+    moments: RunningMoments = RunningMoments(SAMPLES, higher)
+    for chunk in chunks:
+        moments.update(chunk)
+    assert_matches(moments, data)
+    
+    parts: list[RunningMoments] = [RunningMoments.from_chunk(chunk, higher) for chunk in chunks[::-1]]
+    while len(parts) > 1:
+        parts = [parts[n].merge(parts[n + 1]) if n + 1 < len(parts) else parts[n] for n in range(0, len(parts), 2)]
+    assert_matches(parts[0], data)
+
+
+def test_vector_walks_and_columns(tmp_path: PosixPath) -> None:
+    data: np.ndarray = walks((SIMULATIONS, SAMPLES, 2))
+    moments: RunningMoments = RunningMoments.from_chunk(data[:1000], True).merge(
+        RunningMoments.from_chunk(data[1000:], True)
+    )
+    np.testing.assert_allclose(moments.mean, data.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(moments.var, data.var(axis=0), rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(moments.kurtosis, stats.kurtosis(data, axis=0), rtol=1e-8, atol=1e-10)
+    
+    flat: np.ndarray = walks()
+    columns: RunningMoments = RunningMoments.from_chunk(flat[:, :20], True).append_columns(
+        RunningMoments.from_chunk(flat[:, 20:], True)
+    )
+    columns.save(tmp_path / "moments.npz")
+    assert_matches(RunningMoments.load(tmp_path / "moments.npz"), flat)
+
+
+@pytest.mark.parametrize("keep_data", [True, False])
+def test_run_matches_numpy_and_scipy(keep_data: bool) -> None:
+    # Uneven units and moment batches: the merges of the workers and of the parent
+    multicore: MultiCore = MultiCore(
+        cpu_offs=0, in_memory=True, moments=True, higher_moments=True, keep_data=keep_data, moments_batch=170,
+        unit_size=700, seed=SEED
+    )
+    multicore.coinflip_args(SAMPLES, [-1, 0, 3], [0.5, 0.3, 0.2], SIMULATIONS, True)
+    reference: MultiCore = MultiCore(cpu_offs=0, in_memory=True, seed=SEED, unit_size=700)
+    reference.coinflip_args(SAMPLES, [-1, 0, 3], [0.5, 0.3, 0.2], SIMULATIONS, True)
+    try:
+        multicore.run()
+        data: np.ndarray = np.array(reference.run(), dtype=np.float64)
+    finally:
+        for run in (multicore, reference):
+            run.close()
+            if run.keep_data == True:
+                run.release()
+    assert_matches(multicore.running_moments, data)
@@ -0,0 +1,129 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                        tests/test_packed_format.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from bin.packed_format          import PackedArray, PackedCodec, PackedWriter, write_packed
+from bin.run_cache              import RunCache
+from core.multicore_simulation  import MultiCore
+from generator.coinflip         import GeneratorRandomWalk
+from generator.lattice          import lattice_steps, uniform_prob
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                    import PosixPath
+from typing                     import Any
+import numpy                    as np
+import pytest
+# |--------------------------------------------------------------------------------------------------------------------|
+
+SEED        : int = 21
+ROWS        : int = 37
+SAMPLES     : int = 101
+CHECKPOINT  : int = 16
+
+# 1, 2, 3 and 4 bits per step, scalar and vector steps
+SPACES: list[list[Any]] = [
+    [-1, 1],
+    [-1, 0, 1],
+    [-2, -1, 0, 1, 2],
+    list(range(-8, 8)),
+    lattice_steps(2),
+    lattice_steps(3),
+]
+
+
+def walks(sample_space: list[Any], cumulative: bool, rows: int = ROWS, samples: int = SAMPLES) -> np.ndarray:
+    walk: GeneratorRandomWalk = GeneratorRandomWalk(
+        samples, uniform_prob(sample_space), sample_space, np.random.default_rng(SEED)
+    )
+    walk.run_batch(rows)
+    return walk.get_cum_array() if cumulative == True else walk.get_array()
+
+
+@pytest.mark.parametrize("sample_space", SPACES)
+@pytest.mark.parametrize("cumulative", [True, False])
+def test_bit_identity(tmp_path: PosixPath, sample_space: list[Any], cumulative: bool) -> None:
+    array: np.ndarray = walks(sample_space, cumulative)
+    codec: PackedCodec = PackedCodec(sample_space, cumulative, CHECKPOINT)
+    write_packed(tmp_path / "walks.bin", array, codec)
+    packed: PackedArray = PackedArray(tmp_path / "walks.bin")
+    
+    assert packed.shape == array.shape and packed.dtype == array.dtype
+    np.testing.assert_array_equal(np.asarray(packed), array)
+    assert packed.packed_nbytes < array.nbytes
+
+
+@pytest.mark.parametrize("sample_space", SPACES)
+def test_block_writes(tmp_path: PosixPath, sample_space: list[Any]) -> None:
+    # Rows written in uneven blocks, and a column segment that starts from the positions of the one before it
+    array: np.ndarray = walks(sample_space, True)
+    codec: PackedCodec = PackedCodec(sample_space, True, CHECKPOINT)
+    writer: PackedWriter = PackedWriter(tmp_path / "rows.bin", array.shape, array.dtype, codec)
+    for first, stop in [(0, 1), (1, 10), (10, ROWS)]:
+        writer.write(array[first:stop])
+    writer.close()
+    np.testing.assert_array_equal(np.asarray(PackedArray(tmp_path / "rows.bin")), array)
+    
+    split: int = 40
+    write_packed(tmp_path / "tail.bin", array[:, split:], codec, origin=array[:, split - 1])
+    np.testing.assert_array_equal(np.asarray(PackedArray(tmp_path / "tail.bin")), array[:, split:])
+
+
+KEYS: list[Any] = [
+    0, -1, 5,
+    (slice(3, 9),),
+    (slice(None, None, 4),),
+    (np.array([30, 2, 2, 17]),),
+    (7, 0), (7, -1), (7, CHECKPOINT), (7, CHECKPOINT - 1),
+    (slice(None), slice(CHECKPOINT - 3, 3 * CHECKPOINT + 2)),
+    (slice(2, 20), slice(50, None, 7)),
+    (np.array([1, 36]), np.array([100, 0, 64, 63])),
+    (slice(None), 2 * CHECKPOINT),
+    (slice(5, 5), slice(None)),
+    (slice(None), slice(10, 10)),
+]
+
+
+@pytest.mark.parametrize("sample_space", [[-1, 1], [-2, -1, 0, 1, 2], lattice_steps(2)])
+@pytest.mark.parametrize("cumulative", [True, False])
+@pytest.mark.parametrize("key", KEYS)
+def test_random_access(tmp_path: PosixPath, sample_space: list[Any], cumulative: bool, key: Any) -> None:
+    array: np.ndarray = walks(sample_space, cumulative)
+    write_packed(tmp_path / "walks.bin", array, PackedCodec(sample_space, cumulative, CHECKPOINT))
+    packed: PackedArray = PackedArray(tmp_path / "walks.bin")
+    
+    key     : tuple         = key if isinstance(key, tuple) else (key,)
+    rows    : np.ndarray    = np.arange(ROWS)[key[0]]
+    cols    : np.ndarray    = np.arange(SAMPLES)[key[1] if len(key) > 1 else slice(None)]
+    # Outer indexing: rows and columns are selected independently
+    expected: np.ndarray = array[np.atleast_1d(rows)][:, np.atleast_1d(cols)]
+    if cols.ndim == 0:
+        expected = expected[:, 0]
+    if rows.ndim == 0:
+        expected = expected[0]
+    np.testing.assert_array_equal(packed[key], expected)
+
+
+def test_rejects_other_steps(tmp_path: PosixPath) -> None:
+    codec: PackedCodec = PackedCodec([-1, 1], False)
+    with pytest.raises(ValueError):
+        codec.encode(np.array([[-1, 0, 1]], dtype=np.int8))
+    with pytest.raises(ValueError):
+        PackedCodec([-0.5, 0.5], True)
+
+
+def test_run_matches_raw(tmp_path: PosixPath) -> None:
+    runs: dict[str, np.ndarray] = {}
+    size: dict[str, int] = {}
+    for codec in ("raw", "packed"):
+        multicore: MultiCore = MultiCore(
+            cpu_offs=0, seed=SEED, unit_size=300, write_batch=100, codec=codec, cache=RunCache(tmp_path / codec)
+        )
+        multicore.coinflip_args(SAMPLES, [-1, 0, 1], [0.25, 0.5, 0.25], 1000, True)
+        runs[codec] = np.asarray(multicore.run())
+        size[codec] = sum(path_.stat().st_size for path_ in (tmp_path / codec).rglob("Shard*"))
+    np.testing.assert_array_equal(runs["packed"], runs["raw"])
+    assert size["packed"] < size["raw"] / 2
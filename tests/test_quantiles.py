@@ -0,0 +1,119 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                            tests/test_quantiles.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from analysis                   import quantiles
+from analysis.quantiles         import QUANTILE_LEVELS, QuantileSketch, quantile_columns
+from bin.run_cache              import RunCache
+from core.multicore_simulation  import MultiCore
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                    import PosixPath
+import numpy                    as np
+import pickle
+import pytest
+# |--------------------------------------------------------------------------------------------------------------------|
+
+SEED    : int           = 25
+LEVELS  : list[float]   = [0.0, *QUANTILE_LEVELS, 1.0]
+
+
+def walks(steps: list[int], simulations: int = 3000, samples: int = 300) -> np.ndarray:
+    rng: np.random.Generator = np.random.default_rng(SEED)
+    return np.cumsum(rng.choice(steps, size=(simulations, samples)), axis=1)
+
+
+def assert_exact(sketch: QuantileSketch, data: np.ndarray) -> None:
+    # The smallest position whose cumulative frequency reaches q, at every tracked time step
+    assert sketch.exact == True and sketch.count == data.shape[0]
+    expected: np.ndarray = np.quantile(data[:, sketch.columns], LEVELS, axis=0, method="inverted_cdf")
+    np.testing.assert_array_equal(sketch.quantile(LEVELS), expected)
+
+
+def assert_same(sketch: QuantileSketch, other: QuantileSketch) -> None:
+    assert sketch.count == other.count
+    np.testing.assert_array_equal(sketch.offset, other.offset)
+    np.testing.assert_array_equal(sketch.counts, other.counts)
+
+
+@pytest.mark.parametrize("steps", [[-1, 1], [-1, 0, 1], [-3, 1, 2], [1, 2]])
+def test_chunk_is_exact(steps: list[int]) -> None:
+    data: np.ndarray = walks(steps)
+    assert_exact(QuantileSketch.from_chunk(data), data)
+
+
+@pytest.mark.parametrize("splits", [[1], [0, 10, 10, 2999], list(range(13, 3000, 397))])
+def test_merge_is_exact(splits: list[int]) -> None:
+    # Chunks of other offsets and widths, merged in another order
+    data: np.ndarray = walks([-3, 1, 2])
+    sketch: QuantileSketch = QuantileSketch(data.shape[1])
+    for chunk in np.split(data, splits)[::-1]:
+        sketch.merge(QuantileSketch.from_chunk(chunk))
+    assert_exact(sketch, data)
+    assert_same(sketch, QuantileSketch.from_chunk(data))
+
+
+def test_buffered_updates(monkeypatch: pytest.MonkeyPatch, tmp_path: PosixPath) -> None:
+    # A flush every few chunks, and a buffer left when the sketch is pickled or saved
+    monkeypatch.setattr(quantiles, "UPDATE_VALUES", 10**5)
+    data: np.ndarray = walks([-1, 0, 1])
+    sketch: QuantileSketch = QuantileSketch(data.shape[1])
+    for start in range(0, data.shape[0], 7):
+        sketch.update(data[start:start + 7])
+    assert len(sketch.pending) > 0
+    
+    pickled: QuantileSketch = pickle.loads(pickle.dumps(sketch))
+    assert len(sketch.pending) == 0
+    assert_exact(pickled, data)
+    sketch.save(tmp_path / "quantiles.npz")
+    assert_same(QuantileSketch.load(tmp_path / "quantiles.npz"), QuantileSketch.from_chunk(data))
+
+
+def test_tracked_columns() -> None:
+    data: np.ndarray = walks([-1, 1], simulations=500, samples=5000)
+    columns: np.ndarray = quantile_columns(5000)
+    assert columns.size <= quantiles.MAX_COLUMNS and columns[0] == 0 and columns[-1] == 4999
+    assert_exact(QuantileSketch.from_chunk(data), data)
+
+
+def test_wide_walks_become_digests() -> None:
+    data: np.ndarray = walks(list(range(-20, 21)))
+    sketch: QuantileSketch = QuantileSketch.from_chunk(data[:1500]).merge(QuantileSketch.from_chunk(data[1500:]))
+    assert sketch.exact == False
+    bands: np.ndarray = sketch.quantile([0.0, 0.5, 1.0])
+    np.testing.assert_array_equal(bands[0], data.min(axis=0))
+    np.testing.assert_array_equal(bands[2], data.max(axis=0))
+    assert (np.abs(bands[1] - np.median(data, axis=0)) <= 0.05 * data.std(axis=0) + 1).all()
+
+
+def _multicore(cache_path: PosixPath, simulations: int, keep_data: bool = True) -> MultiCore:
+    # Units of several write_batch sub-chunks (or moments batches) and a partial last unit
+    multicore: MultiCore = MultiCore(
+        cpu_offs=0, moments=True, quantiles=True, keep_data=keep_data, unit_size=400, write_batch=90,
+        moments_batch=90, seed=SEED, cache=RunCache(cache_path)
+    )
+    multicore.coinflip_args(300, [-1, 0, 1], [0.3, 0.3, 0.4], simulations, True)
+    return multicore
+
+
+def test_run_is_exact(tmp_path: PosixPath) -> None:
+    reference: MultiCore = _multicore(tmp_path / "stored", 1700)
+    data: np.ndarray = np.asarray(reference.run())
+    reference.close()
+    assert_exact(reference.quantile_sketch, data)
+    
+    summary: MultiCore = _multicore(tmp_path / "summary", 1700, keep_data=False)
+    summary.run()
+    summary.close()
+    assert_exact(summary.quantile_sketch, data)
+    
+    # The sketch of the stored walks merged with the one of the new units
+    extended: MultiCore = _multicore(tmp_path / "extended", 1300)
+    extended.run()
+    extended.extend(simulations=1700)
+    extended.close()
+    assert_exact(extended.quantile_sketch, data)
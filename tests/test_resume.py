@@ -0,0 +1,145 @@
+# |--------------------------------------------------------------------------------------------------------------------|
+# |                                                                                               tests/test_resume.py |
+# |                                                                                                    encoding: UTF-8 |
+# |                                                                                                     Python v: 3.10 |
+# |                                                                                                 romulopauliv@bk.ru |
+# |--------------------------------------------------------------------------------------------------------------------|
+
+# | Internal Imports |-------------------------------------------------------------------------------------------------|
+from core.multicore_simulation  import MultiCore
+from bin.run_cache              import RunCache
+from log.metrics                import METRICS
+
+# | External Imports |-------------------------------------------------------------------------------------------------|
+from pathlib                    import Path, PosixPath
+from typing                     import Any
+import numpy                    as np
+import subprocess
+import threading
+import signal
+import json
+import time
+import sys
+import os
+# |--------------------------------------------------------------------------------------------------------------------|
+
+APP         : PosixPath = Path(__file__).resolve().parents[1] / "app"
+SEED        : int       = 22
+UNIT_SIZE   : int       = 500
+SAMPLES     : int       = 2000
+SIMULATIONS : int       = 6000
+
+# The same run in a job of its own, so the whole job (parent and pool) can be killed
+JOB: str = f"""
+from core.multicore_simulation import MultiCore
+from bin.run_cache import RunCache
+multicore = MultiCore(cpu_offs=0, moments=True, seed={SEED}, unit_size={UNIT_SIZE}, cache=RunCache({{cache!r}}))
+multicore.coinflip_args({SAMPLES}, [-1, 1], [0.5, 0.5], {SIMULATIONS}, True)
+multicore.run()
+"""
+
+
+def _multicore(cache_path: PosixPath) -> MultiCore:
+    multicore: MultiCore = MultiCore(
+        cpu_offs=0, moments=True, seed=SEED, unit_size=UNIT_SIZE, cache=RunCache(cache_path)
+    )
+    multicore.coinflip_args(SAMPLES, [-1, 1], [0.5, 0.5], SIMULATIONS, True)
+    return multicore
+
+
+def _expected() -> tuple[np.ndarray, Any]:
+    local: MultiCore = MultiCore(cpu_offs=0, in_memory=True, moments=True, seed=SEED, unit_size=UNIT_SIZE)
+    local.coinflip_args(SAMPLES, [-1, 1], [0.5, 0.5], SIMULATIONS, True)
+    try:
+        return np.array(local.run()), local.running_moments
+    finally:
+        local.close()
+        local.release()
+
+
+def _wait_for(condition: Any, timeout: float = 60) -> bool:
+    deadline: float = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def _kill_writing_worker(run_path: PosixPath, killed: list[int]) -> None:
+    """
+    Kills the worker writing the first shard: the pid of a worker is in the name of the file it is writing.
+    """
+    parts: list[PosixPath] = []
+    if _wait_for(lambda: parts.extend(run_path.glob("Shard*.part")) or len(parts) > 0):
+        pid: int = int(parts[0].suffixes[-2][1:])
+        os.kill(pid, signal.SIGKILL)
+        killed.append(pid)
+
+
+def test_requeue_after_sigkill(tmp_path: PosixPath) -> None:
+    multicore: MultiCore = _multicore(tmp_path)
+    killed: list[int] = []
+    killer: threading.Thread = threading.Thread(
+        target=_kill_writing_worker, args=(multicore._run_path(), killed), daemon=True
+    )
+    killer.start()
+    METRICS.enable(echo=False)
+    try:
+        data: np.ndarray = np.asarray(multicore.run())
+    finally:
+        METRICS.disable()
+        multicore.close()
+    killer.join()
+    
+    # The unit of the killed worker was run again by a new worker, with the same walks
+    assert len(killed) == 1
+    requeued: list[dict[str, Any]] = [event for event in METRICS.events if event["event"] == "requeue"]
+    assert len(requeued) == 1 and requeued[0]["pid"] == killed[0]
+    expected, moments = _expected()
+    np.testing.assert_array_equal(data, expected)
+    np.testing.assert_array_equal(multicore.running_moments.mean, moments.mean)
+    np.testing.assert_array_equal(multicore.running_moments.var, moments.var)
+
+
+def test_resume_after_sigkill(tmp_path: PosixPath) -> None:
+    run_path: PosixPath = _multicore(tmp_path)._run_path()
+    manifest_path: PosixPath = run_path / "manifest" / "manifest.json"
+    
+    def done() -> list[int]:
+        try:
+            with open(manifest_path) as f:
+                return json.load(f)["done"]
+        except (OSError, ValueError):
+            return []
+    
+    job: subprocess.Popen = subprocess.Popen(
+        [sys.executable, "-c", JOB.format(cache=str(tmp_path))], cwd=APP, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        assert _wait_for(lambda: len(done()) >= 2)
+    finally:
+        # The job and its pool, as a scheduler would kill them
+        os.killpg(job.pid, signal.SIGKILL)
+        job.wait()
+    committed: list[int] = done()
+    assert 2 <= len(committed) < SIMULATIONS // UNIT_SIZE
+    
+    # A shard lost after its unit was committed is run again too
+    os.remove(run_path / f"Shard{committed[0]:06d}.bin")
+    multicore: MultiCore = _multicore(tmp_path)
+    METRICS.enable(echo=False)
+    try:
+        data: np.ndarray = np.asarray(multicore.run())
+    finally:
+        METRICS.disable()
+        multicore.close()
+    
+    start: dict[str, Any] = next(e for e in METRICS.events if e["event"] == "run" and e["state"] == "start")
+    assert start["resumed"] == len(committed) - 1
+    assert not list(run_path.glob("*.part")) and not (run_path / "manifest").exists()
+    expected, moments = _expected()
+    np.testing.assert_array_equal(data, expected)
+    np.testing.assert_array_equal(multicore.running_moments.mean, moments.mean)
+    np.testing.assert_array_equal(multicore.running_moments.var, moments.var)